@@ -1,3 +1,4 @@
+import { Prisma } from '@prisma/client';
 import { prisma } from '../index';
 import { AppError } from '../utils/errorHandler';
 import { logger } from '../utils/logger';
@@ -30,82 +31,73 @@ export async function runConsistencyCheck(projectId: string) {
 
   logger.info(`Running consistency check for project ${projectId} with ${readyDocuments.length} documents`);
 
-  // Generate all unique document pairs
-  const pairs: Array<{ doc1: string; doc2: string }> = [];
-  for (let i = 0; i < readyDocuments.length; i++) {
-    for (let j = i + 1; j < readyDocuments.length; j++) {
-      pairs.push({
-        doc1: readyDocuments[i].id,
-        doc2: readyDocuments[j].id
-      });
-    }
-  }
+  // Analyze all document pairs in a single rag-engine request. Incremental mode only
+  // re-analyzes pairs touching changed paragraphs but returns every current finding.
+  const { inconsistencies, documentPairs } = await ragEngineClient.analyzeProject(
+    projectId,
+    readyDocuments.map((doc) => doc.id),
+    true
+  );
 
-  logger.info(`Analyzing ${pairs.length} document pairs`);
+  logger.info(`Analyzed ${documentPairs} document pairs`);
 
-  let totalInconsistencies = 0;
+  const records: Prisma.DocumentInconsistencyCreateManyInput[] = [];
 
-  // Analyze each pair
-  for (const pair of pairs) {
-    const inconsistencies = await ragEngineClient.analyzePair(
-      projectId,
-      pair.doc1,
-      pair.doc2
-    );
-
-    // Store inconsistencies in database
-    for (const inc of inconsistencies) {
-      // Map paragraph_id to paragraph_index
-      const sourceParagraph = await prisma.documentParagraph.findFirst({
-        where: {
-          documentId: inc.source_document_id,
-          paragraphId: inc.source_location.paragraph_id
-        }
-      });
-
-      const targetParagraph = await prisma.documentParagraph.findFirst({
-        where: {
-          documentId: inc.target_document_id,
-          paragraphId: inc.target_location.paragraph_id
-        }
-      });
-
-      if (!sourceParagraph || !targetParagraph) {
-        logger.warn(`Skipping inconsistency: paragraph not found`);
-        continue;
+  for (const inc of inconsistencies) {
+    // Map paragraph_id to paragraph_index
+    const sourceParagraph = await prisma.documentParagraph.findFirst({
+      where: {
+        documentId: inc.source_document_id,
+        paragraphId: inc.source_location.paragraph_id
+      }
+    });
+
+    const targetParagraph = await prisma.documentParagraph.findFirst({
+      where: {
+        documentId: inc.target_document_id,
+        paragraphId: inc.target_location.paragraph_id
       }
+    });
 
-      await prisma.documentInconsistency.create({
-        data: {
-          projectId,
-          sourceDocumentId: inc.source_document_id,
-          targetDocumentId: inc.target_document_id,
-          inconsistencyType: inc.inconsistency_type,
-          severity: inc.severity,
-          description: inc.description,
-          explanation: inc.explanation,
-          recommendation: inc.recommendation,
-          sourceExcerpt: inc.source_excerpt,
-          targetExcerpt: inc.target_excerpt,
-          sourceParagraphIndex: sourceParagraph.index,
-          sourceStartOffset: inc.source_location.start_offset,
-          sourceEndOffset: inc.source_location.end_offset,
-          targetParagraphIndex: targetParagraph.index,
-          targetStartOffset: inc.target_location.start_offset,
-          targetEndOffset: inc.target_location.end_offset
-        }
-      });
-
-      totalInconsistencies++;
+    if (!sourceParagraph || !targetParagraph) {
+      logger.warn(`Skipping inconsistency: paragraph not found`);
+      continue;
     }
+
+    records.push({
+      projectId,
+      sourceDocumentId: inc.source_document_id,
+      targetDocumentId: inc.target_document_id,
+      inconsistencyType: inc.inconsistency_type,
+      severity: inc.severity,
+      description: inc.description,
+      explanation: inc.explanation,
+      recommendation: inc.recommendation,
+      sourceExcerpt: inc.source_excerpt,
+      targetExcerpt: inc.target_excerpt,
+      sourceParagraphIndex: sourceParagraph.index,
+      sourceStartOffset: inc.source_location.start_offset,
+      sourceEndOffset: inc.source_location.end_offset,
+      targetParagraphIndex: targetParagraph.index,
+      targetStartOffset: inc.target_location.start_offset,
+      targetEndOffset: inc.target_location.end_offset
+    });
   }
 
+  // Replace the project's findings with the current set (retired findings disappear)
+  await prisma.$transaction([
+    prisma.documentInconsistency.deleteMany({ where: { projectId } }),
+    prisma.documentInconsistency.createMany({ data: records })
+  ]);
+
+  const totalInconsistencies = records.length;
+
   logger.info(`Consistency check complete. Found ${totalInconsistencies} inconsistencies`);
 
   return {
     success: true,
     message: `Consistency check complete`,
-    pairsAnalyzed: pairs.length,
+    pairsAnalyzed: documentPairs,
     inconsistenciesFound: totalInconsistencies
   };
 }
@@ -57,6 +57,44 @@ class RAGEngineClient {
       );
     }
   }
+
+  async analyzeProject(
+    projectId: string,
+    documentIds?: string[],
+    incremental: boolean = false
+  ): Promise<AnalyzeProjectResult> {
+    try {
+      logger.info(`Analyzing project ${projectId}${incremental ? ' (incremental)' : ''}`);
+      const response = await this.client.post('/consistency/analyze-project', {
+        project_id: projectId,
+        document_ids: documentIds,
+        incremental
+      });
+      logger.info(`Found ${response.data.inconsistencies?.length || 0} inconsistencies`);
+      if (response.data.pairs_failed) {
+        // Failed pairs (e.g. OpenAI rate limits) are re-analyzed by the next incremental run
+        logger.warn(
+          `${response.data.pairs_failed} paragraph pairs could not be analyzed ` +
+            `(${response.data.pairs_rate_limited || 0} rate limited)`
+        );
+      }
+      return {
+        inconsistencies: response.data.inconsistencies || [],
+        documentPairs: response.data.document_pairs || 0
+      };
+    } catch (error: any) {
+      logger.error(`Failed to analyze project:`, error.message);
+      throw new AppError(
+        500,
+        `Failed to analyze project: ${error.response?.data?.message || error.message}`
+      );
+    }
+  }
+}
+
+export interface AnalyzeProjectResult {
+  inconsistencies: Inconsistency[];
+  documentPairs: number;
 }
 
 export interface Inconsistency {
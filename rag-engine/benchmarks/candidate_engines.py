@@ -0,0 +1,128 @@
+"""
+Benchmark the candidate engines used by the consistency analysis.
+
+Compares the Qdrant path (one filtered vector search per source paragraph,
+sent through search_batch) with the in-process NumPy similarity matrix and
+the project-wide k-means clustering on synthetic, clustered vectors, and
+reports time and top-k agreement.
+
+Usage (from rag-engine/):
+    python -m benchmarks.candidate_engines --paragraphs 300 --documents 2
+    python -m benchmarks.candidate_engines --qdrant-url http://localhost:6333 --paragraphs 2000
+    python -m benchmarks.candidate_engines --documents 50 --paragraphs 200 --dimension 256
+"""
+import argparse
+import asyncio
+import os
+import time
+import uuid
+
+# Settings require these; the benchmark never calls OpenAI or PostgreSQL
+os.environ.setdefault("OPENAI_API_KEY", "benchmark")
+os.environ.setdefault("DATABASE_URL", "postgresql://benchmark@localhost/benchmark")
+
+import numpy as np
+from qdrant_client import AsyncQdrantClient
+
+from src.clients.qdrant_client import TENANCY_COLLECTION, qdrant_client
+from src.analysis.candidates import (
+    generate_cluster_candidates,
+    generate_matrix_candidates,
+    generate_project_candidates,
+)
+
+
+def synthetic_project(documents: int, paragraphs: int, dimension: int, seed: int = 7):
+    """Paragraph rows and vectors drawn around shared topic centroids"""
+    rng = np.random.default_rng(seed)
+    topics = rng.normal(size=(max(8, paragraphs // 10), dimension)).astype(np.float32)
+    document_ids = [str(uuid.uuid4()) for _ in range(documents)]
+    rows, vectors = [], []
+    for document_id in document_ids:
+        for index in range(paragraphs):
+            topic = topics[rng.integers(len(topics))]
+            rows.append({
+                "id": str(uuid.uuid4()),
+                "document_id": document_id,
+                "index": index,
+                "paragraph_id": f"p-{index}",
+                "text": f"paragraph {index}"
+            })
+            vectors.append((topic + 0.3 * rng.normal(size=dimension)).tolist())
+    return document_ids, rows, vectors
+
+
+async def timed(fn, *args, repeat: int = 3):
+    """Best wall-clock time of several runs of a coroutine function, with the last result"""
+    best, result = float("inf"), None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = await fn(*args)
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--documents", type=int, default=2)
+    parser.add_argument("--paragraphs", type=int, default=300, help="Paragraphs per document")
+    parser.add_argument("--dimension", type=int, default=1536)
+    parser.add_argument("--top-k", type=int, default=3)
+    parser.add_argument("--threshold", type=float, default=0.8)
+    parser.add_argument("--qdrant-url", default=":memory:", help="Qdrant URL or ':memory:' for local mode")
+    args = parser.parse_args()
+    asyncio.run(run(args))
+
+
+async def run(args: argparse.Namespace):
+    project_id = str(uuid.uuid4())
+    qdrant_client.client = AsyncQdrantClient(location=args.qdrant_url)
+    qdrant_client.collection_name = f"bench_candidates_{uuid.uuid4().hex[:8]}"
+    qdrant_client.vector_size = args.dimension
+
+    document_ids, paragraphs, vectors = synthetic_project(args.documents, args.paragraphs, args.dimension)
+
+    try:
+        await qdrant_client.init_collection()
+        for document_id in document_ids:
+            doc_rows = [(p, v) for p, v in zip(paragraphs, vectors) if p["document_id"] == document_id]
+            await qdrant_client.upsert_paragraph_embeddings(
+                project_id, document_id, [p for p, _ in doc_rows], [v for _, v in doc_rows]
+            )
+
+        print(
+            f"{args.documents} documents x {args.paragraphs} paragraphs, "
+            f"dimension {args.dimension}, top_k {args.top_k}, qdrant {args.qdrant_url}\n"
+        )
+        print(f"{'engine':<22}{'seconds':>10}{'candidates':>12}{'top-k overlap':>16}")
+
+        qdrant_time, qdrant_pairs = await timed(
+            generate_project_candidates, project_id, document_ids, paragraphs, args.top_k
+        )
+        reference = {(c.source["id"], c.target["id"]) for c in qdrant_pairs}
+        print(f"{'qdrant search_batch':<22}{qdrant_time:>10.3f}{len(qdrant_pairs):>12}{'-':>16}")
+
+        for selection in ("top_k", "mutual", "threshold"):
+            matrix_time, matrix_pairs = await timed(
+                generate_matrix_candidates,
+                project_id, document_ids, paragraphs, args.top_k, selection, args.threshold
+            )
+            found = {(c.source["id"], c.target["id"]) for c in matrix_pairs}
+            overlap = len(found & reference) / len(reference) if reference else 0.0
+            print(f"{'matrix ' + selection:<22}{matrix_time:>10.3f}{len(matrix_pairs):>12}{overlap:>16.3f}")
+
+        cluster_time, cluster_pairs = await timed(
+            generate_cluster_candidates, project_id, document_ids, paragraphs, args.top_k
+        )
+        found = {(c.source["id"], c.target["id"]) for c in cluster_pairs}
+        overlap = len(found & reference) / len(reference) if reference else 0.0
+        print(f"{'cluster k-means':<22}{cluster_time:>10.3f}{len(cluster_pairs):>12}{overlap:>16.3f}")
+    finally:
+        await qdrant_client.delete_project(project_id)
+        if qdrant_client.tenancy != TENANCY_COLLECTION:
+            await qdrant_client.client.delete_collection(qdrant_client.collection_name)
+        await qdrant_client.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,243 @@
+"""
+Local stand-in for the OpenAI API used by the offline benchmarks.
+
+Serves /v1/embeddings and /v1/chat/completions with configurable latency,
+and /v1/models for readiness checks and connection warm-up.
+Embeddings are deterministic bag-of-words vectors (paragraphs sharing words
+are similar), and consistency verdicts are a deterministic function of the
+passage texts, so benchmark runs are reproducible. Single-pair and packed
+prompts are both understood. GET /stats returns call and token counters per
+endpoint; POST /stats/reset clears them.
+
+Usage (from rag-engine/):
+    python -m benchmarks.fake_openai --port 8100 --chat-latency 0.5
+    OPENAI_BASE_URL=http://127.0.0.1:8100/v1 uvicorn src.main:app
+"""
+import argparse
+import asyncio
+import base64
+import hashlib
+import json
+import random
+import re
+import threading
+import time
+from functools import lru_cache
+from typing import Dict, Any, List, Optional, Tuple
+
+import numpy as np
+from fastapi import FastAPI, Request
+
+_WORD_RE = re.compile(r"\w+")
+_PAIR_RE = re.compile(r"^### Pair (\d+)$", re.MULTILINE)
+_PASSAGES_RE = re.compile(
+    r"\*\*Document A[^\n]*:\*\*\n(?P<a>.*?)\n\n\*\*Document B[^\n]*:\*\*\n(?P<b>.*?)(?:\n\n|$)",
+    re.DOTALL
+)
+
+
+class FakeOpenAIStats:
+    """Thread-safe call and token counters per endpoint"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.counters: Dict[str, Dict[str, int]] = {}
+
+    def add(self, endpoint: str, **values: int):
+        with self._lock:
+            counters = self.counters.setdefault(endpoint, {})
+            for name, value in values.items():
+                counters[name] = counters.get(name, 0) + value
+
+    def snapshot(self) -> Dict[str, Dict[str, int]]:
+        with self._lock:
+            return {endpoint: dict(values) for endpoint, values in self.counters.items()}
+
+
+def create_app(
+    embedding_latency: float = 0.05,
+    chat_latency: float = 0.05,
+    jitter: float = 0.0,
+    dimension: int = 1536,
+    inconsistency_rate: float = 0.1,
+    seed: int = 7
+) -> FastAPI:
+    """
+    Build the fake OpenAI app.
+
+    Args:
+        embedding_latency: Base seconds per embeddings request
+        chat_latency: Base seconds per chat completion request
+        jitter: Extra random seconds per request (uniform 0..jitter)
+        dimension: Embedding size when the request has no "dimensions"
+        inconsistency_rate: Fraction of passage pairs reported as inconsistent
+        seed: Seed for latency jitter
+    """
+    app = FastAPI(title="Fake OpenAI")
+    app.state.stats = FakeOpenAIStats()
+    rng = random.Random(seed)
+
+    async def _delay(latency: float):
+        await asyncio.sleep(latency + (rng.random() * jitter if jitter else 0.0))
+
+    @app.post("/v1/embeddings")
+    async def embeddings(request: Request):
+        body = await request.json()
+        inputs = body["input"] if isinstance(body["input"], list) else [body["input"]]
+        size = body.get("dimensions") or dimension
+        await _delay(embedding_latency)
+
+        vectors = [_embed(text, size) for text in inputs]
+        tokens = sum(_tokens(text) for text in inputs)
+        app.state.stats.add("embeddings", calls=1, inputs=len(inputs), prompt_tokens=tokens)
+
+        if body.get("encoding_format") == "base64":
+            data = [base64.b64encode(v.astype("<f4").tobytes()).decode("ascii") for v in vectors]
+        else:
+            data = [v.tolist() for v in vectors]
+        return {
+            "object": "list",
+            "data": [{"object": "embedding", "index": i, "embedding": e} for i, e in enumerate(data)],
+            "model": body.get("model", "fake-embedding"),
+            "usage": {"prompt_tokens": tokens, "total_tokens": tokens}
+        }
+
+    @app.post("/v1/chat/completions")
+    async def chat_completions(request: Request):
+        body = await request.json()
+        prompt = "\n".join(message.get("content") or "" for message in body["messages"])
+        user_prompt = body["messages"][-1].get("content") or ""
+        await _delay(chat_latency)
+
+        pairs = _split_pairs(user_prompt)
+        verdicts = [_verdict(a, b, inconsistency_rate) for a, b in pairs]
+        if _PAIR_RE.search(user_prompt):
+            content = json.dumps({
+                "results": [dict(verdict, pair_index=i) for i, verdict in enumerate(verdicts)]
+            })
+        else:
+            content = json.dumps(verdicts[0] if verdicts else {"is_inconsistent": False})
+
+        prompt_tokens, completion_tokens = _tokens(prompt), _tokens(content)
+        app.state.stats.add(
+            "chat", calls=1, pairs=len(pairs),
+            prompt_tokens=prompt_tokens, completion_tokens=completion_tokens
+        )
+        return {
+            "id": f"chatcmpl-{hashlib.sha1(user_prompt.encode()).hexdigest()[:12]}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": body.get("model", "fake-chat"),
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": content},
+                "finish_reason": "stop"
+            }],
+            "usage": {
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": completion_tokens,
+                "total_tokens": prompt_tokens + completion_tokens
+            }
+        }
+
+    @app.get("/v1/models")
+    async def models():
+        return {
+            "object": "list",
+            "data": [
+                {"id": model, "object": "model", "created": 0, "owned_by": "fake"}
+                for model in ("fake-embedding", "fake-chat")
+            ]
+        }
+
+    @app.get("/stats")
+    async def stats():
+        return app.state.stats.snapshot()
+
+    @app.post("/stats/reset")
+    async def reset_stats():
+        app.state.stats.reset()
+        return {"success": True}
+
+    return app
+
+
+def _embed(text: str, dimension: int) -> np.ndarray:
+    """Sum of per-word random unit vectors, normalized"""
+    vector = np.zeros(dimension, dtype=np.float32)
+    for word in _WORD_RE.findall(text.lower()):
+        vector += _word_vector(word, dimension)
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else vector
+
+
+@lru_cache(maxsize=65536)
+def _word_vector(word: str, dimension: int) -> np.ndarray:
+    seed = int.from_bytes(hashlib.sha256(word.encode("utf-8")).digest()[:8], "little")
+    vector = np.random.default_rng(seed).normal(size=dimension).astype(np.float32)
+    return vector / np.linalg.norm(vector)
+
+
+def _split_pairs(prompt: str) -> List[Tuple[str, str]]:
+    """Extract (passage A, passage B) for every pair in a single or packed prompt"""
+    sections = _PAIR_RE.split(prompt)
+    chunks = sections[2::2] if len(sections) > 1 else [prompt]
+    pairs = []
+    for chunk in chunks:
+        match = _PASSAGES_RE.search(chunk)
+        if match:
+            pairs.append((match.group("a"), match.group("b")))
+    return pairs
+
+
+def _verdict(text_a: str, text_b: str, rate: float) -> Dict[str, Any]:
+    """Deterministic verdict for a passage pair"""
+    digest = hashlib.sha256(f"{text_a}\x00{text_b}".encode("utf-8")).digest()
+    if int.from_bytes(digest[:4], "little") / 2 ** 32 >= rate:
+        return {"is_inconsistent": False}
+    return {
+        "is_inconsistent": True,
+        "inconsistency_type": "DATA_MISMATCH",
+        "severity": ("LOW", "MEDIUM", "HIGH", "CRITICAL")[digest[4] % 4],
+        "description": "Synthetic inconsistency",
+        "explanation": "Reported by the fake OpenAI server",
+        "recommendation": "None",
+        "source_excerpt": text_a[:80],
+        "target_excerpt": text_b[:80],
+        "source_start_offset": 0,
+        "source_end_offset": min(len(text_a), 80),
+        "target_start_offset": 0,
+        "target_end_offset": min(len(text_b), 80)
+    }
+
+
+def _tokens(text: str) -> int:
+    """Rough token count (4 characters per token)"""
+    return max(1, len(text) // 4)
+
+
+def main(argv: Optional[List[str]] = None):
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8100)
+    parser.add_argument("--embedding-latency", type=float, default=0.05, help="Seconds per embeddings request")
+    parser.add_argument("--chat-latency", type=float, default=0.05, help="Seconds per chat completion")
+    parser.add_argument("--jitter", type=float, default=0.0, help="Extra random seconds per request")
+    parser.add_argument("--dimension", type=int, default=1536)
+    parser.add_argument("--inconsistency-rate", type=float, default=0.1)
+    args = parser.parse_args(argv)
+
+    app = create_app(
+        args.embedding_latency, args.chat_latency, args.jitter, args.dimension, args.inconsistency_rate
+    )
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
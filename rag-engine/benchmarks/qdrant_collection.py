@@ -0,0 +1,212 @@
+"""
+Benchmark Qdrant collection settings as the collection grows.
+
+Creates one temporary collection per variant through the service's own
+init_collection (so the same HNSW, payload index, quantization and on-disk
+settings are used), fills it with synthetic paragraph vectors spread over
+many projects and documents, and at each size reports:
+
+- estimated RAM for vectors and the HNSW graph (original float32 vectors are
+  not counted when kept on disk; int8 quantized vectors are)
+- p50/p95 latency of a single search filtered by project_id and document_id,
+  as issued by the consistency analysis
+- recall@k of those searches against an exact (brute-force) search
+
+Variants: baseline (no payload indexes), indexed, int8 (indexed + scalar
+quantization) and int8-on-disk (int8 with original vectors on disk). Run
+against a Qdrant server; local mode has no payload indexes or quantization.
+
+Usage (from rag-engine/):
+    python -m benchmarks.qdrant_collection --qdrant-url http://localhost:6333 --sizes 100000,1000000
+    python -m benchmarks.qdrant_collection --dimensions 1536,512 --variants indexed,int8
+"""
+import argparse
+import asyncio
+import os
+import time
+import uuid
+from typing import Any, Dict, List
+
+# Settings require these; the benchmark never calls OpenAI or PostgreSQL
+os.environ.setdefault("OPENAI_API_KEY", "benchmark")
+os.environ.setdefault("DATABASE_URL", "postgresql://benchmark@localhost/benchmark")
+
+import numpy as np
+from qdrant_client import AsyncQdrantClient
+from qdrant_client.models import Batch, CollectionStatus, SearchParams
+
+from src.config import settings
+from src.clients.qdrant_client import qdrant_client
+
+# Settings applied per variant
+VARIANTS: Dict[str, Dict[str, Any]] = {
+    "baseline": {"qdrant_payload_indexes": False, "qdrant_quantization": None, "qdrant_on_disk_vectors": False},
+    "indexed": {"qdrant_payload_indexes": True, "qdrant_quantization": None, "qdrant_on_disk_vectors": False},
+    "int8": {"qdrant_payload_indexes": True, "qdrant_quantization": "int8", "qdrant_on_disk_vectors": False},
+    "int8-on-disk": {"qdrant_payload_indexes": True, "qdrant_quantization": "int8", "qdrant_on_disk_vectors": True},
+}
+
+# Fixed synthetic topic space so every variant sees the same data
+_TOPICS = 2000
+
+
+class SyntheticCorpus:
+    """Deterministic paragraph vectors around shared topics, assigned to projects and documents"""
+
+    def __init__(self, dimension: int, projects: int, documents: int, seed: int = 7):
+        self.dimension = dimension
+        self.projects = [str(uuid.UUID(int=seed * 1_000_003 + i)) for i in range(projects)]
+        self.documents = documents
+        rng = np.random.default_rng(seed)
+        self.topics = rng.normal(size=(_TOPICS, dimension)).astype(np.float32)
+        self.seed = seed
+
+    def document_of(self, point_id: int):
+        """(project_id, document_id) of a point"""
+        project = point_id % len(self.projects)
+        document = (point_id // len(self.projects)) % self.documents
+        return self.projects[project], f"{self.projects[project]}:{document}"
+
+    def vectors(self, start: int, count: int) -> np.ndarray:
+        rng = np.random.default_rng((self.seed, start))
+        topics = self.topics[rng.integers(_TOPICS, size=count)]
+        vectors = topics + 0.5 * rng.normal(size=(count, self.dimension)).astype(np.float32)
+        return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+    def queries(self, count: int, size: int) -> List[Any]:
+        """(vector, project_id, document_id) query tuples targeting existing documents"""
+        rng = np.random.default_rng((self.seed, 1, size))
+        vectors = self.vectors(10 ** 12, count)
+        return [
+            (vector, *self.document_of(int(rng.integers(size))))
+            for vector in vectors
+        ]
+
+
+def estimated_ram_mb(points: int, dimension: int, variant: Dict[str, Any]) -> float:
+    """Vector and HNSW graph memory; payload and index overheads are not included"""
+    m = settings.qdrant_hnsw_m or 16
+    total = points * 2 * m * 4  # Level-0 links (2m neighbours, 4-byte ids)
+    if not variant["qdrant_on_disk_vectors"]:
+        total += points * dimension * 4
+    if variant["qdrant_quantization"] == "int8" and settings.qdrant_quantization_always_ram:
+        total += points * dimension
+    return total / 2 ** 20
+
+
+async def fill(client: AsyncQdrantClient, corpus: SyntheticCorpus, start: int, end: int, parallel: int):
+    """Upload points [start, end) in batches, parallel requests at a time"""
+    semaphore = asyncio.Semaphore(parallel)
+
+    async def _upload(offset: int, count: int):
+        ids = list(range(offset, offset + count))
+        payloads = [
+            dict(zip(("project_id", "document_id"), corpus.document_of(point_id)), paragraph_index=point_id)
+            for point_id in ids
+        ]
+        async with semaphore:
+            await client.upsert(
+                collection_name=qdrant_client.collection_name,
+                points=Batch(ids=ids, vectors=corpus.vectors(offset, count).tolist(), payloads=payloads),
+                wait=True
+            )
+
+    batch = 512
+    await asyncio.gather(*(
+        _upload(offset, min(batch, end - offset)) for offset in range(start, end, batch)
+    ))
+
+
+async def wait_until_indexed(client: AsyncQdrantClient, timeout: float = 3600):
+    """Wait for the optimizers to finish building indexes"""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if (await client.get_collection(qdrant_client.collection_name)).status == CollectionStatus.GREEN:
+            return
+        await asyncio.sleep(1)
+
+
+async def measure(client: AsyncQdrantClient, queries: List[Any], top_k: int) -> Dict[str, float]:
+    """Latency of filtered searches through the service wrapper, and recall vs exact search"""
+    latencies, recalls = [], []
+    for vector, project_id, document_id in queries:
+        query = vector.tolist()
+        start = time.perf_counter()
+        hits = await qdrant_client.query_similar_paragraphs(project_id, query, document_id, top_k)
+        latencies.append(time.perf_counter() - start)
+
+        exact = await client.search(
+            collection_name=qdrant_client.collection_name,
+            query_vector=query,
+            query_filter=qdrant_client._document_filter(project_id, document_id),
+            search_params=SearchParams(exact=True),
+            limit=top_k
+        )
+        expected = {hit.id for hit in exact}
+        if expected:
+            recalls.append(len(expected & {hit["id"] for hit in hits}) / len(expected))
+
+    latencies.sort()
+    return {
+        "p50_ms": 1000 * latencies[len(latencies) // 2],
+        "p95_ms": 1000 * latencies[int(len(latencies) * 0.95)],
+        "recall": sum(recalls) / len(recalls) if recalls else 0.0
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--qdrant-url", default="http://localhost:6333")
+    parser.add_argument("--sizes", default="10000,100000,1000000", help="Collection sizes to measure at")
+    parser.add_argument("--dimensions", default="1536", help="Vector sizes, e.g. 1536,512,256")
+    parser.add_argument("--variants", default=",".join(VARIANTS), help=f"Any of {', '.join(VARIANTS)}")
+    parser.add_argument("--projects", type=int, default=100)
+    parser.add_argument("--documents", type=int, default=20, help="Documents per project")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--top-k", type=int, default=3)
+    parser.add_argument("--parallel", type=int, default=4, help="Upload workers")
+    args = parser.parse_args()
+
+    asyncio.run(run(args))
+
+
+async def run(args: argparse.Namespace):
+    sizes = sorted(int(size) for size in args.sizes.split(","))
+    client = AsyncQdrantClient(location=args.qdrant_url)
+    qdrant_client.client = client
+
+    print(
+        f"{args.projects} projects x {args.documents} documents, top_k {args.top_k}, "
+        f"{args.queries} queries per size, qdrant {args.qdrant_url}\n"
+    )
+    print(f"{'variant':<14}{'dim':>6}{'points':>10}{'est RAM MB':>12}{'p50 ms':>9}{'p95 ms':>9}{'recall':>8}")
+
+    for dimension in (int(d) for d in args.dimensions.split(",")):
+        corpus = SyntheticCorpus(dimension, args.projects, args.documents)
+        for name in args.variants.split(","):
+            variant = VARIANTS[name]
+            for field_name, value in variant.items():
+                setattr(settings, field_name, value)
+            qdrant_client.collection_name = f"bench_collection_{uuid.uuid4().hex[:8]}"
+            qdrant_client.vector_size = dimension
+
+            try:
+                await qdrant_client.init_collection()
+                filled = 0
+                for size in sizes:
+                    await fill(client, corpus, filled, size, args.parallel)
+                    filled = size
+                    await wait_until_indexed(client)
+                    result = await measure(client, corpus.queries(args.queries, size), args.top_k)
+                    print(
+                        f"{name:<14}{dimension:>6}{size:>10}{estimated_ram_mb(size, dimension, variant):>12.0f}"
+                        f"{result['p50_ms']:>9.2f}{result['p95_ms']:>9.2f}{result['recall']:>8.3f}",
+                        flush=True
+                    )
+            finally:
+                await client.delete_collection(qdrant_client.collection_name)
+    await client.close()
+
+
+if __name__ == "__main__":
+    main()
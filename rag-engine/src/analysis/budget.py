@@ -0,0 +1,78 @@
+from typing import Optional
+import time
+
+# AnalysisBudget.exhausted values
+DEADLINE = "deadline"
+LLM_CALLS = "llm_calls"
+TOKENS = "tokens"
+
+
+class BudgetExhausted(Exception):
+    """An LLM call was not made (or was abandoned) because the analysis budget ran out"""
+
+
+class AnalysisBudget:
+    """
+    Wall-clock, LLM call and token limits of one analysis run, and its coverage.
+
+    LLM calls reserve their estimated tokens before they are sent and are
+    corrected with the reported usage afterwards. Once any limit is reached
+    the budget stays exhausted, so no later (lower-scoring) pair is sent even
+    if a smaller call would still fit. Calls in flight at the deadline are
+    abandoned.
+
+    Without limits the budget never runs out and only tracks coverage.
+    """
+
+    def __init__(
+        self,
+        deadline_seconds: Optional[float] = None,
+        max_llm_calls: Optional[int] = None,
+        max_tokens: Optional[int] = None
+    ):
+        self.deadline = time.monotonic() + deadline_seconds if deadline_seconds else None
+        self.max_llm_calls = max_llm_calls
+        self.max_tokens = max_tokens
+        self.llm_calls = 0
+        self.tokens = 0  # Reported usage of finished calls plus estimates of calls in flight
+        self.exhausted: Optional[str] = None  # DEADLINE, LLM_CALLS or TOKENS
+        self.lowest_score: Optional[float] = None  # Lowest candidate score with a verdict
+
+    def remaining_seconds(self) -> Optional[float]:
+        """Seconds until the deadline (None without one)"""
+        if self.deadline is None:
+            return None
+        return max(0.0, self.deadline - time.monotonic())
+
+    def reserve(self, tokens: int):
+        """
+        Take one LLM call and its estimated tokens from the budget.
+
+        Raises:
+            BudgetExhausted: If the call does not fit in the remaining budget
+        """
+        if self.exhausted is None:
+            if self.deadline is not None and time.monotonic() >= self.deadline:
+                self.exhausted = DEADLINE
+            elif self.max_llm_calls is not None and self.llm_calls >= self.max_llm_calls:
+                self.exhausted = LLM_CALLS
+            elif self.max_tokens is not None and self.tokens + tokens > self.max_tokens:
+                self.exhausted = TOKENS
+        if self.exhausted is not None:
+            raise BudgetExhausted(f"Analysis budget exhausted ({self.exhausted})")
+
+        self.llm_calls += 1
+        self.tokens += tokens
+
+    def settle(self, estimated: int, used: int):
+        """Replace a call's estimated tokens with its reported usage"""
+        self.tokens += used - estimated
+
+    def abandon(self):
+        """Mark the deadline as reached (a call in flight was cut off)"""
+        self.exhausted = self.exhausted or DEADLINE
+
+    def record_score(self, score: float):
+        """Record the score of a pair that got a verdict"""
+        if self.lowest_score is None or score < self.lowest_score:
+            self.lowest_score = score
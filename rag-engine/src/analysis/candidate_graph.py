@@ -0,0 +1,254 @@
+from typing import Dict, Any, List, Set, Tuple
+import asyncio
+import logging
+
+from src.config import settings
+from src.clients.database import db_client
+from src.clients.qdrant_client import qdrant_client
+from src.analysis import similarity
+from src.utils.metrics import timed
+
+logger = logging.getLogger(__name__)
+
+# (source paragraph id, source document, target paragraph id, target document, score)
+Edge = Tuple[str, str, str, str, float]
+
+
+class CandidateGraph:
+    """
+    Precomputed nearest-neighbour edges between paragraphs of a project, stored in PostgreSQL.
+
+    When a document is ingested, each of its paragraphs gets an edge to its
+    settings.candidate_graph_top_k most similar paragraphs in every other
+    document of the project, and the paragraphs of the other documents get
+    edges to their closest paragraphs in the new document. Re-ingesting a
+    document replaces all edges touching it. The "precomputed" candidate
+    engine then reads candidates from candidate_edges instead of searching.
+
+    candidate_graph_documents records which documents have had their edges
+    computed; documents ingested before the graph was enabled are backfilled
+    on first use (see generate_precomputed_candidates).
+    """
+
+    def __init__(self):
+        self.enabled = settings.candidate_graph_enabled
+        self.top_k = settings.candidate_graph_top_k
+        self.max_neighbors = settings.candidate_graph_max_neighbors
+
+    async def ensure_schema(self):
+        """Create the edge tables if they don't exist"""
+        pool = await db_client.get_pool()
+        await pool.execute(
+            """
+            CREATE TABLE IF NOT EXISTS candidate_edges (
+                project_id TEXT NOT NULL,
+                source_paragraph_id TEXT NOT NULL,
+                source_document_id TEXT NOT NULL,
+                target_paragraph_id TEXT NOT NULL,
+                target_document_id TEXT NOT NULL,
+                score REAL NOT NULL,
+                PRIMARY KEY (project_id, source_paragraph_id, target_paragraph_id)
+            );
+            CREATE INDEX IF NOT EXISTS candidate_edges_source_document_idx
+                ON candidate_edges (project_id, source_document_id);
+            CREATE INDEX IF NOT EXISTS candidate_edges_target_document_idx
+                ON candidate_edges (project_id, target_document_id);
+            CREATE TABLE IF NOT EXISTS candidate_graph_documents (
+                project_id TEXT NOT NULL,
+                document_id TEXT NOT NULL,
+                updated_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+                PRIMARY KEY (project_id, document_id)
+            );
+            """
+        )
+
+    async def update_document(
+        self,
+        project_id: str,
+        document_id: str,
+        paragraphs: List[Dict[str, Any]],
+        embeddings: List[List[float]]
+    ) -> int:
+        """
+        Compute and store the edges between a document and the rest of its project.
+
+        The other documents' vectors are read from Qdrant, so call this after
+        the document's own points have been stored.
+
+        Args:
+            project_id: Project the document belongs to
+            document_id: Ingested document
+            paragraphs: Its paragraph rows (id)
+            embeddings: Their embedding vectors, aligned with paragraphs
+
+        Returns:
+            Number of edges stored
+        """
+        others = await qdrant_client.get_project_embeddings(project_id, exclude_document_id=document_id)
+        edges = await asyncio.to_thread(
+            _document_edges, document_id, paragraphs, embeddings, others, self.top_k
+        )
+
+        columns = list(zip(*edges)) if edges else [[], [], [], [], []]
+        pool = await db_client.get_pool()
+        with timed("postgres"):
+            async with pool.acquire() as conn:
+                async with conn.transaction():
+                    await conn.execute(
+                        """
+                        DELETE FROM candidate_edges
+                        WHERE project_id = $1 AND (source_document_id = $2 OR target_document_id = $2)
+                        """,
+                        project_id,
+                        document_id
+                    )
+                    await conn.execute(
+                        """
+                        INSERT INTO candidate_edges (
+                            project_id, source_paragraph_id, source_document_id,
+                            target_paragraph_id, target_document_id, score
+                        )
+                        SELECT $1, e.* FROM unnest($2::text[], $3::text[], $4::text[], $5::text[], $6::real[])
+                            AS e(source_paragraph_id, source_document_id, target_paragraph_id, target_document_id, score)
+                        ON CONFLICT (project_id, source_paragraph_id, target_paragraph_id)
+                        DO UPDATE SET score = EXCLUDED.score
+                        """,
+                        project_id,
+                        *[list(column) for column in columns]
+                    )
+                    if self.max_neighbors:
+                        await self._prune(conn, project_id, sorted(set(columns[0])))
+                    await conn.execute(
+                        """
+                        INSERT INTO candidate_graph_documents (project_id, document_id)
+                        VALUES ($1, $2)
+                        ON CONFLICT (project_id, document_id) DO UPDATE SET updated_at = now()
+                        """,
+                        project_id,
+                        document_id
+                    )
+
+        logger.info(
+            f"Candidate graph: stored {len(edges)} edges for document {document_id} "
+            f"({len(paragraphs)} paragraphs vs {len(others)} in other documents)"
+        )
+        return len(edges)
+
+    async def _prune(self, conn, project_id: str, source_ids: List[str]):
+        """Keep only the max_neighbors closest edges of the given source paragraphs"""
+        await conn.execute(
+            """
+            DELETE FROM candidate_edges e
+            USING (
+                SELECT source_paragraph_id, target_paragraph_id,
+                       row_number() OVER (PARTITION BY source_paragraph_id ORDER BY score DESC) AS rank
+                FROM candidate_edges
+                WHERE project_id = $1 AND source_paragraph_id = ANY($2::text[])
+            ) r
+            WHERE e.project_id = $1
+              AND e.source_paragraph_id = r.source_paragraph_id
+              AND e.target_paragraph_id = r.target_paragraph_id
+              AND r.rank > $3
+            """,
+            project_id,
+            source_ids,
+            self.max_neighbors
+        )
+
+    async def covered_documents(self, project_id: str, document_ids: List[str]) -> Set[str]:
+        """Documents whose edges have been computed"""
+        pool = await db_client.get_pool()
+        with timed("postgres"):
+            rows = await pool.fetch(
+                """
+                SELECT document_id FROM candidate_graph_documents
+                WHERE project_id = $1 AND document_id = ANY($2::text[])
+                """,
+                project_id,
+                list(document_ids)
+            )
+        return {row["document_id"] for row in rows}
+
+    async def edges(self, project_id: str, document_ids: List[str]) -> List[Dict[str, Any]]:
+        """Stored edges between the given documents"""
+        pool = await db_client.get_pool()
+        with timed("postgres"):
+            rows = await pool.fetch(
+                """
+                SELECT source_paragraph_id, target_paragraph_id, target_document_id, score
+                FROM candidate_edges
+                WHERE project_id = $1
+                  AND source_document_id = ANY($2::text[])
+                  AND target_document_id = ANY($2::text[])
+                """,
+                project_id,
+                list(document_ids)
+            )
+        return [dict(row) for row in rows]
+
+    async def delete_document(self, project_id: str, document_id: str):
+        """Delete all edges touching a document"""
+        pool = await db_client.get_pool()
+        async with pool.acquire() as conn:
+            async with conn.transaction():
+                await conn.execute(
+                    """
+                    DELETE FROM candidate_edges
+                    WHERE project_id = $1 AND (source_document_id = $2 OR target_document_id = $2)
+                    """,
+                    project_id,
+                    document_id
+                )
+                await conn.execute(
+                    "DELETE FROM candidate_graph_documents WHERE project_id = $1 AND document_id = $2",
+                    project_id,
+                    document_id
+                )
+
+    async def delete_project(self, project_id: str):
+        """Delete all edges of a project"""
+        pool = await db_client.get_pool()
+        async with pool.acquire() as conn:
+            async with conn.transaction():
+                await conn.execute("DELETE FROM candidate_edges WHERE project_id = $1", project_id)
+                await conn.execute("DELETE FROM candidate_graph_documents WHERE project_id = $1", project_id)
+
+
+def _document_edges(
+    document_id: str,
+    paragraphs: List[Dict[str, Any]],
+    embeddings: List[List[float]],
+    others: List[Tuple[str, str, List[float]]],
+    top_k: int
+) -> List[Edge]:
+    """Top-k edges from the document to every other document and back (see CandidateGraph)"""
+    if not paragraphs or not others:
+        return []
+    matrix = similarity.to_unit_matrix(embeddings)
+    ids = [p["id"] for p in paragraphs]
+
+    by_document: Dict[str, List[Tuple[str, List[float]]]] = {}
+    for point_id, other_document_id, vector in others:
+        by_document.setdefault(other_document_id, []).append((point_id, vector))
+
+    edges: List[Edge] = []
+    for other_document_id, points in by_document.items():
+        other_ids = [point_id for point_id, _ in points]
+        other = similarity.to_unit_matrix([vector for _, vector in points])
+
+        rows, cols, scores = similarity.top_k_pairs(matrix, other, top_k)
+        edges.extend(
+            (ids[row], document_id, other_ids[col], other_document_id, score)
+            for row, col, score in zip(rows.tolist(), cols.tolist(), scores.tolist())
+        )
+        rows, cols, scores = similarity.top_k_pairs(other, matrix, top_k)
+        edges.extend(
+            (other_ids[row], other_document_id, ids[col], document_id, score)
+            for row, col, score in zip(rows.tolist(), cols.tolist(), scores.tolist())
+        )
+
+    return edges
+
+
+# Singleton instance
+candidate_graph = CandidateGraph()
@@ -0,0 +1,436 @@
+from dataclasses import dataclass
+from typing import Dict, Any, List, Optional, Set, Tuple
+import asyncio
+import logging
+
+import numpy as np
+
+from src.config import settings
+from src.clients.qdrant_client import qdrant_client
+from src.embeddings.service import generate_embeddings_batch
+from src.analysis import similarity
+from src.analysis.candidate_graph import candidate_graph
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class CandidatePair:
+    """A pair of semantically similar paragraphs to be checked by the LLM"""
+    source: Dict[str, Any]  # Paragraph row (id, document_id, index, paragraph_id, text)
+    target: Dict[str, Any]
+    score: float
+
+
+async def generate_project_candidates(
+    project_id: str,
+    document_ids: List[str],
+    paragraphs: List[Dict[str, Any]],
+    top_k: int,
+    bidirectional: bool = False,
+    source_ids: Optional[Set[str]] = None
+) -> List[CandidatePair]:
+    """
+    Find candidate paragraph pairs across all documents of a project.
+
+    Vectors for every paragraph are retrieved from Qdrant once, and the
+    searches for every ordered document pair (doc i -> doc j, i < j) are sent
+    with Qdrant's batch search API.
+
+    Args:
+        project_id: Project to analyze
+        document_ids: Documents to compare, in comparison order
+        paragraphs: Paragraph rows of all those documents
+        top_k: Similar paragraphs to check per source paragraph
+        bidirectional: Also search doc j -> doc i
+        source_ids: Only keep pairs involving these paragraphs (e.g. changed
+            ones). They are searched towards every other document, and the
+            other paragraphs towards the documents containing them, so every
+            top_k pair a full run would find is kept
+
+    Returns:
+        All search hits as candidate pairs (not yet deduplicated, see select_candidates)
+    """
+    paragraphs_by_id = {p["id"]: p for p in paragraphs}
+    paragraphs_by_doc = _group_by_document(document_ids, paragraphs)
+    changed_documents = (
+        {p["document_id"] for p in paragraphs if p["id"] in source_ids} if source_ids is not None else None
+    )
+
+    # One search per (source paragraph, target document)
+    searches: List[Tuple[Dict[str, Any], str]] = []
+    for source_doc_id, target_doc_id in _document_directions(document_ids, bidirectional or source_ids is not None):
+        for paragraph in paragraphs_by_doc[source_doc_id]:
+            if (
+                source_ids is not None
+                and paragraph["id"] not in source_ids
+                and target_doc_id not in changed_documents
+            ):
+                continue
+            searches.append((paragraph, target_doc_id))
+
+    embeddings = await _load_embeddings(project_id, list({p["id"]: p for p, _ in searches}.values()))
+    queries = [(embeddings[paragraph["id"]], target_doc_id) for paragraph, target_doc_id in searches]
+    sources = [paragraph for paragraph, _ in searches]
+
+    logger.info(f"Running {len(queries)} batched similarity searches")
+    results = await qdrant_client.query_similar_paragraphs_batch(project_id, queries, top_k=top_k)
+
+    candidates = []
+    for source, hits in zip(sources, results):
+        for hit in hits:
+            target = paragraphs_by_id.get(str(hit["id"]))
+            if not target:
+                continue
+            if source_ids is not None and source["id"] not in source_ids and target["id"] not in source_ids:
+                continue
+            candidates.append(CandidatePair(source=source, target=target, score=hit["score"]))
+
+    return candidates
+
+
+async def generate_matrix_candidates(
+    project_id: str,
+    document_ids: List[str],
+    paragraphs: List[Dict[str, Any]],
+    top_k: int,
+    selection: str = "top_k",
+    min_score: float = 0.0,
+    bidirectional: bool = False,
+    source_ids: Optional[Set[str]] = None
+) -> List[CandidatePair]:
+    """
+    Find candidate paragraph pairs in-process with NumPy.
+
+    All vectors are retrieved from Qdrant in bulk, and each document pair is
+    compared with a single cosine-similarity matrix multiply instead of one
+    Qdrant search per paragraph. The matrix math runs in a worker thread.
+
+    Args:
+        project_id: Project to analyze
+        document_ids: Documents to compare, in comparison order
+        paragraphs: Paragraph rows of all those documents
+        top_k: Similar paragraphs per source paragraph ("top_k" selection)
+        selection: "top_k", "mutual" (mutual nearest neighbours) or
+            "threshold" (every pair scoring >= min_score)
+        min_score: Threshold for "threshold" selection
+        bidirectional: With "top_k", also take the top_k sources per target paragraph
+        source_ids: Only keep pairs involving these paragraphs (e.g. changed
+            ones); with "top_k", pairs from either direction are kept
+
+    Returns:
+        Candidate pairs (not yet deduplicated, see select_candidates)
+    """
+    embeddings = await _load_embeddings(project_id, paragraphs)
+    return await asyncio.to_thread(
+        _matrix_candidates,
+        document_ids, paragraphs, embeddings, top_k, selection, min_score, bidirectional, source_ids
+    )
+
+
+def _matrix_candidates(
+    document_ids: List[str],
+    paragraphs: List[Dict[str, Any]],
+    embeddings: Dict[str, List[float]],
+    top_k: int,
+    selection: str,
+    min_score: float,
+    bidirectional: bool,
+    source_ids: Optional[Set[str]]
+) -> List[CandidatePair]:
+    """Compare the documents' vector matrices (see generate_matrix_candidates)"""
+    paragraphs_by_doc = _group_by_document(document_ids, paragraphs)
+    matrices = {
+        doc_id: similarity.to_unit_matrix([embeddings[p["id"]] for p in doc_paragraphs])
+        for doc_id, doc_paragraphs in paragraphs_by_doc.items()
+    }
+
+    candidates = []
+    for i, doc_a in enumerate(document_ids):
+        for doc_b in document_ids[i + 1:]:
+            sources, targets = paragraphs_by_doc[doc_a], paragraphs_by_doc[doc_b]
+            a, b = matrices[doc_a], matrices[doc_b]
+
+            if selection == "mutual":
+                matches = [similarity.mutual_nearest_pairs(a, b)]
+            elif selection == "threshold":
+                matches = [similarity.threshold_pairs(a, b, min_score)]
+            else:
+                # Changed paragraphs can enter the top_k of unchanged ones, so
+                # incremental runs search both directions and filter below
+                matches = [similarity.top_k_pairs(a, b, top_k)]
+                if bidirectional or source_ids is not None:
+                    cols, rows, scores = similarity.top_k_pairs(b, a, top_k)
+                    matches.append((rows, cols, scores))
+
+            for rows, cols, scores in matches:
+                candidates.extend(
+                    CandidatePair(source=sources[row], target=targets[col], score=float(score))
+                    for row, col, score in zip(rows.tolist(), cols.tolist(), scores.tolist())
+                    if source_ids is None
+                    or sources[row]["id"] in source_ids or targets[col]["id"] in source_ids
+                )
+
+    return candidates
+
+
+async def generate_cluster_candidates(
+    project_id: str,
+    document_ids: List[str],
+    paragraphs: List[Dict[str, Any]],
+    top_k: int,
+    bidirectional: bool = False,
+    source_ids: Optional[Set[str]] = None
+) -> List[CandidatePair]:
+    """
+    Find candidate paragraph pairs by clustering the whole project once.
+
+    All vectors are retrieved from Qdrant in bulk and partitioned into
+    clusters of about settings.candidate_cluster_size paragraphs with
+    hierarchical k-means (see similarity.cluster_indices). Paragraphs of
+    different documents are only compared within a cluster, so the cost grows
+    with the number of paragraphs instead of with the number of document
+    pairs. The clustering and matrix math run in a worker thread.
+
+    Args:
+        project_id: Project to analyze
+        document_ids: Documents to compare, in comparison order
+        paragraphs: Paragraph rows of all those documents
+        top_k: Similar paragraphs per source paragraph and other document of its cluster
+        bidirectional: Also take the top_k from later to earlier documents
+        source_ids: Only keep pairs involving these paragraphs (e.g. changed
+            ones), from either direction
+
+    Returns:
+        Candidate pairs (each ordered pair once; see select_candidates)
+    """
+    embeddings = await _load_embeddings(project_id, paragraphs)
+    return await asyncio.to_thread(
+        _cluster_candidates, document_ids, paragraphs, embeddings, top_k, bidirectional, source_ids
+    )
+
+
+def _cluster_candidates(
+    document_ids: List[str],
+    paragraphs: List[Dict[str, Any]],
+    embeddings: Dict[str, List[float]],
+    top_k: int,
+    bidirectional: bool,
+    source_ids: Optional[Set[str]]
+) -> List[CandidatePair]:
+    """Compare paragraphs of different documents within each cluster (see generate_cluster_candidates)"""
+    if not paragraphs:
+        return []
+    matrix = similarity.to_unit_matrix([embeddings[p["id"]] for p in paragraphs])
+    order = {doc_id: position for position, doc_id in enumerate(document_ids)}
+    documents = np.array([order[p["document_id"]] for p in paragraphs])
+
+    clusters = similarity.cluster_indices(
+        matrix,
+        max_size=settings.candidate_cluster_size,
+        branching=settings.candidate_cluster_branching,
+        probes=settings.candidate_cluster_probes,
+        iterations=settings.candidate_cluster_iterations
+    )
+    logger.info(f"Clustered {len(paragraphs)} paragraphs into {len(clusters)} clusters")
+
+    # With probes > 1 a pair can meet in several clusters; keep it once
+    candidates: Dict[Tuple[int, int], CandidatePair] = {}
+    for members in clusters:
+        member_documents = documents[members]
+        for document in np.unique(member_documents):
+            targets = members[member_documents == document]
+            if bidirectional or source_ids is not None:
+                sources = members[member_documents != document]
+            else:
+                sources = members[member_documents < document]
+            if len(sources) == 0:
+                continue
+
+            rows, cols, scores = similarity.top_k_pairs(matrix[sources], matrix[targets], top_k)
+            for source, target, score in zip(sources[rows].tolist(), targets[cols].tolist(), scores.tolist()):
+                candidates[(source, target)] = CandidatePair(
+                    source=paragraphs[source], target=paragraphs[target], score=float(score)
+                )
+
+    # A paragraph in several clusters gets top_k per cluster; keep its best top_k per document
+    best: Dict[Tuple[str, str], List[CandidatePair]] = {}
+    for candidate in candidates.values():
+        best.setdefault((candidate.source["id"], candidate.target["document_id"]), []).append(candidate)
+    return _involving([
+        candidate
+        for group in best.values()
+        for candidate in sorted(group, key=lambda c: c.score, reverse=True)[:top_k]
+    ], source_ids)
+
+
+async def generate_precomputed_candidates(
+    project_id: str,
+    document_ids: List[str],
+    paragraphs: List[Dict[str, Any]],
+    top_k: int,
+    bidirectional: bool = False,
+    source_ids: Optional[Set[str]] = None
+) -> List[CandidatePair]:
+    """
+    Read candidate paragraph pairs from the edges precomputed at ingest time.
+
+    No similarity search runs on the request path. Documents without stored
+    edges (ingested before the candidate graph was enabled) are backfilled
+    first. Edges pointing to paragraphs that no longer exist are ignored, and
+    at most settings.candidate_graph_top_k neighbours per paragraph and
+    document are available.
+
+    Args:
+        project_id: Project to analyze
+        document_ids: Documents to compare, in comparison order
+        paragraphs: Paragraph rows of all those documents
+        top_k: Similar paragraphs per source paragraph and target document
+        bidirectional: Also use edges from later to earlier documents
+        source_ids: Only keep pairs involving these paragraphs (e.g. changed
+            ones), from edges in either direction
+
+    Returns:
+        Candidate pairs (not yet deduplicated, see select_candidates)
+    """
+    covered = await candidate_graph.covered_documents(project_id, document_ids)
+    for document_id in document_ids:
+        if document_id in covered:
+            continue
+        logger.info(f"Candidate graph: backfilling edges of document {document_id}")
+        doc_paragraphs = [p for p in paragraphs if p["document_id"] == document_id]
+        embeddings = await _load_embeddings(project_id, doc_paragraphs)
+        await candidate_graph.update_document(
+            project_id, document_id, doc_paragraphs, [embeddings[p["id"]] for p in doc_paragraphs]
+        )
+
+    paragraphs_by_id = {p["id"]: p for p in paragraphs}
+    order = {doc_id: position for position, doc_id in enumerate(document_ids)}
+
+    # Best top_k edges per (source paragraph, target document)
+    grouped: Dict[Tuple[str, str], List[CandidatePair]] = {}
+    for edge in await candidate_graph.edges(project_id, document_ids):
+        source = paragraphs_by_id.get(edge["source_paragraph_id"])
+        target = paragraphs_by_id.get(edge["target_paragraph_id"])
+        if not source or not target:
+            continue
+        if (
+            source_ids is None
+            and not bidirectional
+            and order[source["document_id"]] > order[target["document_id"]]
+        ):
+            continue
+        grouped.setdefault((source["id"], target["document_id"]), []).append(
+            CandidatePair(source=source, target=target, score=edge["score"])
+        )
+
+    return _involving([
+        candidate
+        for group in grouped.values()
+        for candidate in sorted(group, key=lambda c: c.score, reverse=True)[:top_k]
+    ], source_ids)
+
+
+def select_candidates(
+    candidates: List[CandidatePair],
+    min_score: float = 0.0,
+    max_per_target: Optional[int] = None
+) -> List[CandidatePair]:
+    """
+    Canonicalize, filter and rank candidate pairs before the LLM stage.
+
+    - Pairs are unordered: A->B and B->A collapse into one candidate, oriented
+      so the paragraph that sorts first by (document_id, index) is the source.
+      Mirrored requests therefore produce identical LLM prompts and cache keys.
+    - Candidates below min_score (cosine similarity) are dropped.
+    - Remaining candidates are ranked by score, highest first.
+    - With max_per_target, a target paragraph is paired with at most that many
+      sources (the highest-scoring ones).
+
+    Args:
+        candidates: Raw search hits
+        min_score: Minimum similarity score
+        max_per_target: Optional cap on candidates per target paragraph
+
+    Returns:
+        Deduplicated candidates, highest score first
+    """
+    best: Dict[Tuple[str, str], CandidatePair] = {}
+    for candidate in candidates:
+        if candidate.score < min_score:
+            continue
+        canonical = _canonical(candidate)
+        key = (canonical.source["id"], canonical.target["id"])
+        if key not in best or canonical.score > best[key].score:
+            best[key] = canonical
+
+    ranked = sorted(
+        best.values(),
+        key=lambda c: (
+            -c.score,
+            c.source["document_id"], c.source["index"],
+            c.target["document_id"], c.target["index"]
+        )
+    )
+
+    if not max_per_target:
+        return ranked
+
+    per_target: Dict[str, int] = {}
+    selected = []
+    for candidate in ranked:
+        target_id = candidate.target["id"]
+        if per_target.get(target_id, 0) >= max_per_target:
+            continue
+        per_target[target_id] = per_target.get(target_id, 0) + 1
+        selected.append(candidate)
+    return selected
+
+
+def _canonical(candidate: CandidatePair) -> CandidatePair:
+    """Orient a pair so the paragraph with the smaller (document_id, index) is the source"""
+    source, target = candidate.source, candidate.target
+    if (target["document_id"], target["index"]) < (source["document_id"], source["index"]):
+        return CandidatePair(source=target, target=source, score=candidate.score)
+    return candidate
+
+
+def _involving(candidates: List[CandidatePair], paragraph_ids: Optional[Set[str]]) -> List[CandidatePair]:
+    """Candidates with the source or target among paragraph_ids (all of them for None)"""
+    if paragraph_ids is None:
+        return candidates
+    return [c for c in candidates if c.source["id"] in paragraph_ids or c.target["id"] in paragraph_ids]
+
+
+def _document_directions(document_ids: List[str], bidirectional: bool) -> List[Tuple[str, str]]:
+    """Ordered (source document, target document) pairs to search"""
+    directions = []
+    for i, doc_a in enumerate(document_ids):
+        for doc_b in document_ids[i + 1:]:
+            directions.append((doc_a, doc_b))
+            if bidirectional:
+                directions.append((doc_b, doc_a))
+    return directions
+
+
+def _group_by_document(
+    document_ids: List[str], paragraphs: List[Dict[str, Any]]
+) -> Dict[str, List[Dict[str, Any]]]:
+    """Group paragraph rows by document, keeping their order"""
+    paragraphs_by_doc: Dict[str, List[Dict[str, Any]]] = {doc_id: [] for doc_id in document_ids}
+    for paragraph in paragraphs:
+        paragraphs_by_doc[paragraph["document_id"]].append(paragraph)
+    return paragraphs_by_doc
+
+
+async def _load_embeddings(project_id: str, paragraphs: List[Dict[str, Any]]) -> Dict[str, List[float]]:
+    """Retrieve stored vectors in bulk, embedding any paragraphs missing from Qdrant"""
+    embeddings = await qdrant_client.get_embeddings_by_ids(project_id, [p["id"] for p in paragraphs])
+
+    missing = [p for p in paragraphs if p["id"] not in embeddings]
+    if missing:
+        logger.warning(f"{len(missing)} paragraphs have no stored embedding, generating them")
+        generated = await asyncio.to_thread(generate_embeddings_batch, [p["text"] for p in missing])
+        embeddings.update({p["id"]: embedding for p, embedding in zip(missing, generated)})
+
+    return embeddings
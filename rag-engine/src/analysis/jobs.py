@@ -0,0 +1,248 @@
+from typing import Dict, Any, Coroutine, List, Optional, Set, Tuple
+import asyncio
+import logging
+import uuid
+
+from src.clients.database import db_client
+
+logger = logging.getLogger(__name__)
+
+# Job lifecycle
+JOB_STATUSES = ("queued", "running", "completed", "failed", "cancelled", "interrupted")
+ACTIVE_STATUSES = ("queued", "running")
+
+# Columns that update() may set
+_UPDATABLE_COLUMNS = {
+    "status", "stage", "pairs_total", "pairs_done", "pairs_failed",
+    "inconsistencies_found", "stats", "stage_timings", "error"
+}
+
+
+class JobStore:
+    """
+    Background analysis jobs persisted in PostgreSQL.
+
+    The analysis_jobs table holds one row per job (status, progress, stage
+    timings, counters). Every analyzed candidate pair is checkpointed to
+    analysis_job_pairs, so a resumed job only sends the remaining pairs to the
+    LLM. Running jobs are tracked as asyncio tasks in this process.
+    """
+
+    def __init__(self):
+        self._tasks: Dict[str, asyncio.Task] = {}
+        self._cancel_requested: Set[str] = set()
+
+    async def ensure_schema(self):
+        """Create the job tables if they don't exist"""
+        pool = await db_client.get_pool()
+        await pool.execute(
+            """
+            CREATE TABLE IF NOT EXISTS analysis_jobs (
+                id TEXT PRIMARY KEY,
+                project_id TEXT NOT NULL,
+                request JSONB NOT NULL,
+                status TEXT NOT NULL,
+                stage TEXT,
+                pairs_total INTEGER NOT NULL DEFAULT 0,
+                pairs_done INTEGER NOT NULL DEFAULT 0,
+                pairs_failed INTEGER NOT NULL DEFAULT 0,
+                inconsistencies_found INTEGER NOT NULL DEFAULT 0,
+                stats JSONB NOT NULL DEFAULT '{}'::jsonb,
+                stage_timings JSONB NOT NULL DEFAULT '{}'::jsonb,
+                error TEXT,
+                created_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+                updated_at TIMESTAMPTZ NOT NULL DEFAULT now()
+            );
+            CREATE INDEX IF NOT EXISTS analysis_jobs_project_id_idx
+                ON analysis_jobs (project_id);
+            CREATE TABLE IF NOT EXISTS analysis_job_pairs (
+                job_id TEXT NOT NULL REFERENCES analysis_jobs (id) ON DELETE CASCADE,
+                pair_key TEXT NOT NULL,
+                score REAL NOT NULL,
+                inconsistency JSONB,
+                PRIMARY KEY (job_id, pair_key)
+            );
+            """
+        )
+
+    async def create(self, project_id: str, request: Dict[str, Any]) -> Dict[str, Any]:
+        """Insert a queued job and return its row"""
+        pool = await db_client.get_pool()
+        row = await pool.fetchrow(
+            """
+            INSERT INTO analysis_jobs (id, project_id, request, status)
+            VALUES ($1, $2, $3, 'queued')
+            RETURNING *
+            """,
+            str(uuid.uuid4()),
+            project_id,
+            request
+        )
+        return dict(row)
+
+    async def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Fetch a job row"""
+        pool = await db_client.get_pool()
+        row = await pool.fetchrow("SELECT * FROM analysis_jobs WHERE id = $1", job_id)
+        return dict(row) if row else None
+
+    async def update(self, job_id: str, unless_cancelled: bool = False, **fields: Any) -> bool:
+        """
+        Update job columns (status, stage, progress counters, stats, timings, error).
+
+        Args:
+            job_id: Job to update
+            unless_cancelled: Leave a cancelled job untouched (updates made by
+                the running job, which may have been cancelled by another replica)
+            **fields: Columns to set
+
+        Returns:
+            Whether the job was updated
+        """
+        unknown = set(fields) - _UPDATABLE_COLUMNS
+        if unknown:
+            raise ValueError(f"Unknown job columns: {sorted(unknown)}")
+
+        columns = list(fields)
+        assignments = ", ".join(f"{column} = ${i + 2}" for i, column in enumerate(columns))
+        condition = " AND status <> 'cancelled'" if unless_cancelled else ""
+        pool = await db_client.get_pool()
+        result = await pool.execute(
+            f"UPDATE analysis_jobs SET {assignments}, updated_at = now() WHERE id = $1{condition}",
+            job_id,
+            *(fields[column] for column in columns)
+        )
+        return result != "UPDATE 0"
+
+    async def touch(self, job_id: str) -> Optional[str]:
+        """
+        Heartbeat of the process running a job (see mark_interrupted).
+
+        Returns:
+            The job's stored status (None if the job was deleted)
+        """
+        pool = await db_client.get_pool()
+        return await pool.fetchval(
+            "UPDATE analysis_jobs SET updated_at = now() WHERE id = $1 RETURNING status",
+            job_id
+        )
+
+    async def mark_interrupted(self, stale_seconds: Optional[float] = None) -> List[str]:
+        """
+        Flag jobs left active by a previous process as interrupted.
+
+        Args:
+            stale_seconds: Only flag jobs without an update for this long
+                (with several replicas, jobs of live processes keep their
+                heartbeat); None flags every active job
+        """
+        pool = await db_client.get_pool()
+        rows = await pool.fetch(
+            """
+            UPDATE analysis_jobs
+            SET status = 'interrupted', updated_at = now()
+            WHERE status = ANY($1::text[])
+              AND ($2::float8 IS NULL OR updated_at < now() - make_interval(secs => $2::float8))
+            RETURNING id
+            """,
+            list(ACTIVE_STATUSES),
+            stale_seconds
+        )
+        return [row["id"] for row in rows]
+
+    async def checkpoint_counts(self, job_id: str) -> Tuple[int, int]:
+        """(checkpointed pairs, inconsistencies among them) of a job"""
+        pool = await db_client.get_pool()
+        row = await pool.fetchrow(
+            """
+            SELECT count(*) AS done, count(inconsistency) AS found
+            FROM analysis_job_pairs
+            WHERE job_id = $1
+            """,
+            job_id
+        )
+        return row["done"], row["found"]
+
+    async def completed_pairs(self, job_id: str) -> Dict[str, bool]:
+        """Checkpointed pair keys of a job, mapped to whether an inconsistency was found"""
+        pool = await db_client.get_pool()
+        rows = await pool.fetch(
+            """
+            SELECT pair_key, inconsistency IS NOT NULL AS found
+            FROM analysis_job_pairs
+            WHERE job_id = $1
+            """,
+            job_id
+        )
+        return {row["pair_key"]: row["found"] for row in rows}
+
+    async def checkpoint(
+        self, job_id: str, entries: List[Tuple[str, float, Optional[Dict[str, Any]]]]
+    ):
+        """Store (pair_key, score, inconsistency) verdicts; None records a consistent pair"""
+        if not entries:
+            return
+
+        pool = await db_client.get_pool()
+        await pool.executemany(
+            """
+            INSERT INTO analysis_job_pairs (job_id, pair_key, score, inconsistency)
+            VALUES ($1, $2, $3, $4)
+            ON CONFLICT (job_id, pair_key) DO NOTHING
+            """,
+            [(job_id, pair_key, score, inconsistency) for pair_key, score, inconsistency in entries]
+        )
+
+    async def inconsistencies(self, job_id: str) -> List[Dict[str, Any]]:
+        """Inconsistencies found so far, highest candidate score first"""
+        pool = await db_client.get_pool()
+        rows = await pool.fetch(
+            """
+            SELECT inconsistency
+            FROM analysis_job_pairs
+            WHERE job_id = $1 AND inconsistency IS NOT NULL
+            ORDER BY score DESC, pair_key ASC
+            """,
+            job_id
+        )
+        return [row["inconsistency"] for row in rows]
+
+    def start(self, job_id: str, coro: Coroutine):
+        """Run a job coroutine as a background task of this process"""
+        task = asyncio.create_task(coro)
+        self._tasks[job_id] = task
+        task.add_done_callback(lambda _: self._tasks.pop(job_id, None))
+
+    def is_running(self, job_id: str) -> bool:
+        """Whether the job is running in this process"""
+        return job_id in self._tasks
+
+    def cancel(self, job_id: str) -> bool:
+        """Cancel a job running in this process; returns False if it isn't running here"""
+        task = self._tasks.get(job_id)
+        if task is None:
+            return False
+        self._cancel_requested.add(job_id)
+        task.cancel()
+        return True
+
+    def cancel_requested(self, job_id: str) -> bool:
+        """Whether the job's cancellation came from cancel() rather than shutdown"""
+        return job_id in self._cancel_requested
+
+    def forget(self, job_id: str):
+        """Clear in-process bookkeeping for a finished job"""
+        self._cancel_requested.discard(job_id)
+
+    async def shutdown(self):
+        """Stop running jobs; their checkpoints are kept and they are resumable"""
+        tasks = list(self._tasks.values())
+        for task in tasks:
+            task.cancel()
+        if tasks:
+            await asyncio.gather(*tasks, return_exceptions=True)
+            logger.info(f"Stopped {len(tasks)} running analysis jobs")
+
+
+# Singleton instance
+job_store = JobStore()
@@ -0,0 +1,265 @@
+from typing import Dict, Any, List, Optional, Set, Tuple
+import hashlib
+import json
+import logging
+
+from src.config import settings
+from src.clients.database import db_client
+
+logger = logging.getLogger(__name__)
+
+# (document_id, text_hash) of a paragraph
+ParagraphRef = Tuple[str, str]
+
+
+class AnalysisLedger:
+    """
+    Per-project record of analyzed paragraph pairs, stored in PostgreSQL.
+
+    analysis_ledger holds one row per analyzed pair, keyed by the documents
+    and normalized text hashes of both paragraphs, with the LLM verdict (None
+    for consistent pairs). analysis_ledger_paragraphs holds the paragraphs
+    covered by the last analysis. A re-check compares the current paragraphs
+    with that set and only analyzes pairs touching changed or new paragraphs;
+    rows referencing paragraphs that no longer exist are retired.
+
+    Rows are scoped by a config key (LLM model, prompt version and candidate
+    options), so changing any of these starts a fresh ledger.
+    """
+
+    def __init__(self):
+        self.enabled = settings.analysis_ledger_enabled
+
+    async def ensure_schema(self):
+        """Create the ledger tables if they don't exist"""
+        pool = await db_client.get_pool()
+        await pool.execute(
+            """
+            CREATE TABLE IF NOT EXISTS analysis_ledger (
+                project_id TEXT NOT NULL,
+                config_key TEXT NOT NULL,
+                source_document_id TEXT NOT NULL,
+                source_hash TEXT NOT NULL,
+                target_document_id TEXT NOT NULL,
+                target_hash TEXT NOT NULL,
+                score REAL NOT NULL,
+                verdict JSONB,
+                updated_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+                PRIMARY KEY (
+                    project_id, config_key,
+                    source_document_id, source_hash, target_document_id, target_hash
+                )
+            );
+            CREATE TABLE IF NOT EXISTS analysis_ledger_paragraphs (
+                project_id TEXT NOT NULL,
+                config_key TEXT NOT NULL,
+                document_id TEXT NOT NULL,
+                text_hash TEXT NOT NULL,
+                PRIMARY KEY (project_id, config_key, document_id, text_hash)
+            );
+            """
+        )
+
+    def make_config_key(self, prompt_version: str, options: Dict[str, Any]) -> str:
+        """Build the ledger scope for a prompt version and candidate options"""
+        key_parts = [settings.llm_model, prompt_version, options]
+        return hashlib.sha256(json.dumps(key_parts, sort_keys=True).encode("utf-8")).hexdigest()
+
+    async def known_paragraphs(
+        self, project_id: str, config_key: str, document_ids: List[str]
+    ) -> Set[ParagraphRef]:
+        """Paragraphs of the given documents covered by the last analysis"""
+        pool = await db_client.get_pool()
+        rows = await pool.fetch(
+            """
+            SELECT document_id, text_hash
+            FROM analysis_ledger_paragraphs
+            WHERE project_id = $1 AND config_key = $2
+              AND document_id = ANY($3::text[])
+            """,
+            project_id,
+            config_key,
+            list(document_ids)
+        )
+        return {(row["document_id"], row["text_hash"]) for row in rows}
+
+    async def retire(
+        self,
+        project_id: str,
+        config_key: str,
+        current: Set[ParagraphRef],
+        document_ids: Optional[List[str]] = None
+    ) -> int:
+        """
+        Delete ledger rows referencing paragraphs that no longer exist.
+
+        Args:
+            project_id: Project being analyzed
+            config_key: Ledger scope
+            current: Paragraphs that currently exist in the analyzed documents
+            document_ids: Documents being analyzed; None means the whole
+                project, so rows of documents not in current are retired too
+
+        Returns:
+            Number of retired findings (inconsistent rows)
+        """
+        document_refs, hash_refs = _unzip(current)
+        pool = await db_client.get_pool()
+        rows = await pool.fetch(
+            """
+            WITH current_paragraphs AS (
+                SELECT * FROM unnest($3::text[], $4::text[]) AS c(document_id, text_hash)
+            )
+            DELETE FROM analysis_ledger l
+            WHERE l.project_id = $1 AND l.config_key = $2 AND (
+                (($5::text[] IS NULL OR l.source_document_id = ANY($5::text[]))
+                 AND NOT EXISTS (
+                    SELECT 1 FROM current_paragraphs c
+                    WHERE c.document_id = l.source_document_id AND c.text_hash = l.source_hash
+                 ))
+                OR
+                (($5::text[] IS NULL OR l.target_document_id = ANY($5::text[]))
+                 AND NOT EXISTS (
+                    SELECT 1 FROM current_paragraphs c
+                    WHERE c.document_id = l.target_document_id AND c.text_hash = l.target_hash
+                 ))
+            )
+            RETURNING l.verdict IS NOT NULL AS found
+            """,
+            project_id,
+            config_key,
+            document_refs,
+            hash_refs,
+            list(document_ids) if document_ids is not None else None
+        )
+
+        retired = sum(1 for row in rows if row["found"])
+        if rows:
+            logger.info(f"Ledger: retired {len(rows)} pairs ({retired} findings) of project {project_id}")
+        return retired
+
+    async def record(
+        self,
+        project_id: str,
+        config_key: str,
+        entries: List[Tuple[ParagraphRef, ParagraphRef, float, Optional[Dict[str, Any]]]],
+        covered: Set[ParagraphRef],
+        document_ids: Optional[List[str]] = None
+    ):
+        """
+        Store analyzed pairs and replace the covered paragraph set, in one transaction.
+
+        Args:
+            project_id: Project being analyzed
+            config_key: Ledger scope
+            entries: (source, target, score, verdict) per analyzed pair;
+                a None verdict records a consistent pair
+            covered: Paragraphs whose pairs have all been analyzed
+            document_ids: Documents being analyzed (None: the whole project);
+                their previous coverage is replaced by covered
+        """
+        document_refs, hash_refs = _unzip(covered)
+        pool = await db_client.get_pool()
+        async with pool.acquire() as conn:
+            async with conn.transaction():
+                if entries:
+                    await conn.executemany(
+                        """
+                        INSERT INTO analysis_ledger (
+                            project_id, config_key,
+                            source_document_id, source_hash, target_document_id, target_hash,
+                            score, verdict
+                        )
+                        VALUES ($1, $2, $3, $4, $5, $6, $7, $8)
+                        ON CONFLICT (
+                            project_id, config_key,
+                            source_document_id, source_hash, target_document_id, target_hash
+                        ) DO UPDATE SET
+                            score = EXCLUDED.score,
+                            verdict = EXCLUDED.verdict,
+                            updated_at = now()
+                        """,
+                        [
+                            (project_id, config_key, *source, *target, score, verdict)
+                            for source, target, score, verdict in entries
+                        ]
+                    )
+                await conn.execute(
+                    """
+                    DELETE FROM analysis_ledger_paragraphs
+                    WHERE project_id = $1 AND config_key = $2
+                      AND ($3::text[] IS NULL OR document_id = ANY($3::text[]))
+                    """,
+                    project_id,
+                    config_key,
+                    list(document_ids) if document_ids is not None else None
+                )
+                await conn.execute(
+                    """
+                    INSERT INTO analysis_ledger_paragraphs (project_id, config_key, document_id, text_hash)
+                    SELECT $1, $2, document_id, text_hash
+                    FROM unnest($3::text[], $4::text[]) AS c(document_id, text_hash)
+                    ON CONFLICT DO NOTHING
+                    """,
+                    project_id,
+                    config_key,
+                    document_refs,
+                    hash_refs
+                )
+
+    async def findings(
+        self, project_id: str, config_key: str, document_ids: List[str]
+    ) -> List[Dict[str, Any]]:
+        """Inconsistent pairs between the given documents, highest score first"""
+        pool = await db_client.get_pool()
+        rows = await pool.fetch(
+            """
+            SELECT source_document_id, source_hash, target_document_id, target_hash, score, verdict
+            FROM analysis_ledger
+            WHERE project_id = $1 AND config_key = $2 AND verdict IS NOT NULL
+              AND source_document_id = ANY($3::text[])
+              AND target_document_id = ANY($3::text[])
+            ORDER BY score DESC
+            """,
+            project_id,
+            config_key,
+            list(document_ids)
+        )
+        return [dict(row) for row in rows]
+
+    async def delete_document(self, project_id: str, document_id: str):
+        """Delete a document's pairs and covered paragraphs under every config key"""
+        pool = await db_client.get_pool()
+        async with pool.acquire() as conn:
+            async with conn.transaction():
+                await conn.execute(
+                    """
+                    DELETE FROM analysis_ledger
+                    WHERE project_id = $1 AND (source_document_id = $2 OR target_document_id = $2)
+                    """,
+                    project_id,
+                    document_id
+                )
+                await conn.execute(
+                    "DELETE FROM analysis_ledger_paragraphs WHERE project_id = $1 AND document_id = $2",
+                    project_id,
+                    document_id
+                )
+
+    async def delete_project(self, project_id: str):
+        """Delete all ledger rows of a project"""
+        pool = await db_client.get_pool()
+        async with pool.acquire() as conn:
+            async with conn.transaction():
+                await conn.execute("DELETE FROM analysis_ledger WHERE project_id = $1", project_id)
+                await conn.execute("DELETE FROM analysis_ledger_paragraphs WHERE project_id = $1", project_id)
+
+
+def _unzip(refs: Set[ParagraphRef]) -> Tuple[List[str], List[str]]:
+    """Split paragraph refs into parallel document_id and text_hash arrays"""
+    ordered = sorted(refs)
+    return [ref[0] for ref in ordered], [ref[1] for ref in ordered]
+
+
+# Singleton instance
+analysis_ledger = AnalysisLedger()
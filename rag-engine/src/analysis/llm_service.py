@@ -1,14 +1,33 @@
-from openai import OpenAI
-from typing import Dict, Any, Optional
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Callable, Dict, Any, List, Optional, Sequence, Set, Tuple
+import asyncio
+import hashlib
 import logging
 import json
 
 from src.config import settings
+from src.clients.openai_limiter import openai_limiter, RateLimitExceeded
+from src.clients.registry import clients
+from src.analysis.verdict_cache import verdict_cache, MISS
+from src.analysis.budget import AnalysisBudget, BudgetExhausted
+from src.analysis.prefilter import duplicate_reason, window_text
+from src.utils.metrics import (
+    INCONSISTENCIES,
+    LLM_CALLS_SKIPPED,
+    LLM_TOKENS_SAVED,
+    OPENAI_REQUESTS_IN_FLIGHT,
+    OPENAI_TOKENS,
+    timed
+)
+from src.utils.text import estimate_tokens
 
 logger = logging.getLogger(__name__)
 
-# Initialize OpenAI client
-client = OpenAI(api_key=settings.openai_api_key)
+# Caps the number of in-flight LLM calls across all requests of this process
+_process_semaphore = asyncio.Semaphore(settings.llm_max_concurrency)
+
+SYSTEM_PROMPT = "You are an expert document analyst specializing in identifying semantic inconsistencies between text passages. You must respond ONLY with valid JSON."
 
 INCONSISTENCY_TYPES = [
     "CONTRADICTION",
@@ -21,6 +40,27 @@ INCONSISTENCY_TYPES = [
 SEVERITY_LEVELS = ["CRITICAL", "HIGH", "MEDIUM", "LOW"]
 
 
+@dataclass
+class PairAnalysisStats:
+    """Per-request counters for analyze_paragraph_pairs"""
+    pairs: int = 0
+    cache_hits: int = 0
+    llm_calls: int = 0  # Chat completion requests
+    llm_failures: int = 0  # Pairs whose LLM call failed (including rate_limited)
+    rate_limited: int = 0  # Pairs that failed because of OpenAI rate limits
+    budget_skipped: int = 0  # Pairs left without a verdict because the AnalysisBudget ran out
+    packed_fallbacks: int = 0  # Pairs re-sent alone after an invalid packed result
+    duplicates_skipped: int = 0  # Pairs resolved as consistent duplicates without an LLM call
+    pairs_windowed: int = 0  # Pairs sent with a paragraph trimmed to settings.llm_paragraph_max_tokens
+    tokens_saved: int = 0  # Estimated tokens not sent thanks to duplicates and windowing
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+
+
+# Marks a pair whose packed result was missing or invalid
+_FAILED = object()
+
+
 def analyze_paragraph_pair(
     paragraph_a_text: str,
     paragraph_b_text: str,
@@ -41,57 +81,555 @@ def analyze_paragraph_pair(
 
     Returns:
         Dictionary with inconsistency details or None
+
+    Raises:
+        RateLimitExceeded: If the call could not be made within the OpenAI rate limits
     """
-    prompt = _build_consistency_prompt(
-        paragraph_a_text, paragraph_b_text, doc_a_title, doc_b_title
-    )
+    if _duplicate(paragraph_a_text, paragraph_b_text, None, doc_a_title, doc_b_title):
+        return None
+
+    window_a, window_b, offsets = _window_pair(paragraph_a_text, paragraph_b_text)
+    prompt = _build_consistency_prompt(window_a, window_b, doc_a_title, doc_b_title)
 
     try:
-        response = client.chat.completions.create(
-            model=settings.llm_model,
-            messages=[
-                {
-                    "role": "system",
-                    "content": "You are an expert document analyst specializing in identifying semantic inconsistencies between text passages. You must respond ONLY with valid JSON."
-                },
-                {"role": "user", "content": prompt}
-            ],
-            response_format={"type": "json_object"},
-            temperature=0.2
+        response = openai_limiter.call(
+            settings.llm_model,
+            _estimate_call_tokens(prompt, 1),
+            lambda: clients.openai.chat.completions.create(
+                model=settings.llm_model,
+                messages=_build_messages(prompt),
+                response_format={"type": "json_object"},
+                temperature=0.2
+            ),
+            settings.llm_max_retries,
+            settings.llm_retry_base_delay
         )
 
-        result = json.loads(response.choices[0].message.content)
-
-        if not result.get("is_inconsistent", False):
-            return None
-
-        # Validate and structure the result
-        inconsistency = {
-            "inconsistency_type": result.get("inconsistency_type", "CONTRADICTION"),
-            "severity": result.get("severity", "MEDIUM"),
-            "description": result.get("description", ""),
-            "explanation": result.get("explanation", ""),
-            "recommendation": result.get("recommendation", ""),
-            "source_excerpt": result.get("source_excerpt", paragraph_a_text[:200]),
-            "target_excerpt": result.get("target_excerpt", paragraph_b_text[:200]),
-            "source_location": {
-                "start_offset": result.get("source_start_offset", 0),
-                "end_offset": result.get("source_end_offset", len(paragraph_a_text))
-            },
-            "target_location": {
-                "start_offset": result.get("target_start_offset", 0),
-                "end_offset": result.get("target_end_offset", len(paragraph_b_text))
-            }
-        }
+        return _shift_result(
+            _parse_llm_result(response.choices[0].message.content, window_a, window_b),
+            offsets, paragraph_a_text, paragraph_b_text
+        )
+
+    except RateLimitExceeded:
+        raise
+    except Exception as e:
+        logger.error(f"LLM analysis failed: {e}")
+        return None
 
-        logger.info(f"Detected {inconsistency['severity']} {inconsistency['inconsistency_type']}")
-        return inconsistency
 
+async def analyze_paragraph_pair_async(
+    paragraph_a_text: str,
+    paragraph_b_text: str,
+    doc_a_title: str = "",
+    doc_b_title: str = ""
+) -> Optional[Dict[str, Any]]:
+    """
+    Async variant of analyze_paragraph_pair using the AsyncOpenAI client.
+
+    Does not block the event loop while waiting for the LLM. The number of
+    concurrent calls is bounded process-wide by settings.llm_max_concurrency.
+    """
+    if _duplicate(paragraph_a_text, paragraph_b_text, None, doc_a_title, doc_b_title):
+        return None
+
+    window_a, window_b, offsets = _window_pair(paragraph_a_text, paragraph_b_text)
+    try:
+        return _shift_result(
+            await _request_analysis_async(window_a, window_b, doc_a_title, doc_b_title),
+            offsets, paragraph_a_text, paragraph_b_text
+        )
+    except RateLimitExceeded:
+        raise
     except Exception as e:
         logger.error(f"LLM analysis failed: {e}")
         return None
 
 
+async def analyze_paragraph_pairs(
+    pairs: Sequence[Dict[str, str]],
+    concurrency: Optional[int] = None,
+    stats: Optional[PairAnalysisStats] = None,
+    pack_size: Optional[int] = None,
+    on_result: Optional[Callable[[int, Optional[Dict[str, Any]], bool], None]] = None,
+    scores: Optional[Sequence[float]] = None,
+    budget: Optional[AnalysisBudget] = None
+) -> List[Optional[Dict[str, Any]]]:
+    """
+    Analyze many paragraph pairs concurrently.
+
+    Verdicts are looked up in the persistent verdict cache first; identical
+    pairs within the batch are sent to the LLM only once, and every successful
+    verdict (consistent or not) is written back to the cache. Failed calls
+    (including calls that stayed rate limited) have a None result, are
+    reported through on_result and stats, and are never cached.
+
+    Before any LLM call, duplicates are resolved as consistent: pairs equal
+    after normalization, or (with scores) scoring at least
+    settings.duplicate_min_score with the same numbers, names and
+    negation/modal words. Paragraphs longer than
+    settings.llm_paragraph_max_tokens are sent as a window around the region
+    sharing most words with the other paragraph; reported offsets refer to
+    the full paragraph.
+
+    With pack_size > 1, up to pack_size pairs share one request (and one copy
+    of the instructions). Pairs whose packed result is missing or invalid are
+    re-sent with the single-pair prompt.
+
+    LLM calls are dispatched in input order, so pairs ranked by score are sent
+    highest first. Once the budget runs out, the remaining pairs get no
+    verdict (like failed pairs) and are counted in stats.budget_skipped.
+
+    Args:
+        pairs: Keyword arguments for analyze_paragraph_pair_async, one dict per pair
+        concurrency: Maximum in-flight calls for this batch
+            (defaults to settings.llm_request_concurrency)
+        stats: Optional counters to update (cache hits, LLM calls, tokens, failures, rate limits)
+        pack_size: Pairs per LLM request (defaults to settings.llm_pack_size)
+        on_result: Optional callback, called once per input index as soon as
+            its verdict is known, as on_result(index, result, failed); failed
+            is True when the pair got no verdict: the LLM call errored, was
+            rate limited or exceeded the budget (result is then None)
+        scores: Optional cosine similarity per pair, enabling near-duplicate
+            detection and budget.lowest_score
+        budget: Optional deadline, LLM call and token limits
+
+    Returns:
+        One result per pair, in the same order as the input
+    """
+    stats = stats if stats is not None else PairAnalysisStats()
+    stats.pairs += len(pairs)
+    results: List[Optional[Dict[str, Any]]] = [None] * len(pairs)
+    if not pairs:
+        return results
+
+    prompt_version = get_prompt_version()
+    keys = [verdict_cache.make_key(prompt_version, **pair) for pair in pairs]
+
+    cached: Dict[str, Any] = {}
+    if verdict_cache.enabled:
+        try:
+            cached = await verdict_cache.get_many(keys)
+        except Exception as e:
+            logger.warning(f"Verdict cache lookup failed: {e}")
+
+    def _notify(index: int, result: Optional[Dict[str, Any]], failed: bool):
+        """Report a pair's outcome to on_result and the budget's coverage"""
+        if budget is not None and scores is not None and not failed:
+            budget.record_score(scores[index])
+        if on_result:
+            on_result(index, result, failed)
+
+    # Group uncached pairs by key so duplicates cost a single LLM call
+    pending: Dict[str, List[int]] = {}
+    for index, key in enumerate(keys):
+        verdict = cached.get(key, MISS)
+        if verdict is not MISS:
+            results[index] = verdict
+            stats.cache_hits += 1
+            _notify(index, verdict, False)
+        elif key not in pending and _duplicate(
+            **pairs[index], score=scores[index] if scores is not None else None, stats=stats
+        ):
+            # Consistent without a call (not cached: the check is cheaper than a lookup)
+            _notify(index, None, False)
+        else:
+            pending.setdefault(key, []).append(index)
+
+    # Pairs as sent to the LLM, with long paragraphs windowed
+    requests: Dict[str, Dict[str, str]] = {}
+    offsets: Dict[str, Tuple[int, int]] = {}
+    for key, indexes in pending.items():
+        pair = pairs[indexes[0]]
+        window_a, window_b, offsets[key] = _window_pair(
+            pair["paragraph_a_text"], pair["paragraph_b_text"], stats
+        )
+        requests[key] = {**pair, "paragraph_a_text": window_a, "paragraph_b_text": window_b}
+
+    limit = max(1, min(
+        concurrency or settings.llm_request_concurrency,
+        settings.llm_max_concurrency
+    ))
+    semaphore = asyncio.Semaphore(limit)
+    pack_size = max(1, pack_size or settings.llm_pack_size)
+
+    logger.info(
+        f"Analyzing {len(pairs)} paragraph pairs: {stats.cache_hits} cached, "
+        f"{stats.duplicates_skipped} duplicates, "
+        f"{len(pending)} to analyze (concurrency: {limit}, pack size: {pack_size})"
+    )
+
+    verdicts: Dict[str, Any] = {}
+    not_retried: Set[str] = set()  # Keys of rate-limited or out-of-budget packed calls
+
+    def _resolve(key: str, result: Any):
+        """Record a verdict (or _FAILED) and notify on_result for every index sharing the key"""
+        if result is not _FAILED:
+            pair = pairs[pending[key][0]]
+            result = _shift_result(
+                result, offsets[key], pair["paragraph_a_text"], pair["paragraph_b_text"]
+            )
+            verdicts[key] = result
+            if result:
+                INCONSISTENCIES.labels(result["severity"]).inc()
+        for index in pending[key]:
+            results[index] = verdicts.get(key)
+            _notify(index, results[index], result is _FAILED)
+
+    if pack_size > 1 and len(pending) > 1:
+        async def _run_pack(pack_keys: List[str]):
+            async with semaphore:
+                try:
+                    pack_results = await _request_batch_analysis_async(
+                        [requests[key] for key in pack_keys], stats, budget
+                    )
+                except BudgetExhausted:
+                    stats.budget_skipped += sum(len(pending[key]) for key in pack_keys)
+                    not_retried.update(pack_keys)
+                    for key in pack_keys:
+                        _resolve(key, _FAILED)
+                    return
+                except RateLimitExceeded as e:
+                    # Re-sending the pairs one by one would only add load
+                    logger.error(f"Packed LLM analysis rate limited: {e}")
+                    stats.llm_failures += len(pack_keys)
+                    stats.rate_limited += len(pack_keys)
+                    not_retried.update(pack_keys)
+                    for key in pack_keys:
+                        _resolve(key, _FAILED)
+                    return
+                except Exception as e:
+                    logger.error(f"Packed LLM analysis failed: {e}")
+                    pack_results = [_FAILED] * len(pack_keys)
+                # Valid results are final; failed pairs are retried alone below
+                for key, result in zip(pack_keys, pack_results):
+                    if result is not _FAILED:
+                        _resolve(key, result)
+
+        packs = _build_packs([(key, requests[key]) for key in pending], pack_size)
+        await asyncio.gather(*(_run_pack(pack) for pack in packs))
+
+        stats.packed_fallbacks += len(pending) - len(verdicts) - len(not_retried)
+
+    async def _run(key: str):
+        async with semaphore:
+            try:
+                result = await _request_analysis_async(**requests[key], stats=stats, budget=budget)
+            except BudgetExhausted:
+                stats.budget_skipped += len(pending[key])
+                result = _FAILED
+            except RateLimitExceeded as e:
+                logger.error(f"LLM analysis rate limited: {e}")
+                stats.llm_failures += 1
+                stats.rate_limited += 1
+                result = _FAILED
+            except Exception as e:
+                logger.error(f"LLM analysis failed: {e}")
+                stats.llm_failures += 1
+                result = _FAILED
+            _resolve(key, result)
+
+    await asyncio.gather(*(
+        _run(key) for key in pending if key not in verdicts and key not in not_retried
+    ))
+
+    if stats.budget_skipped:
+        logger.warning(
+            f"Analysis budget exhausted ({budget.exhausted}): {stats.budget_skipped} pairs skipped"
+        )
+
+    if verdict_cache.enabled and verdicts:
+        try:
+            await verdict_cache.put_many(prompt_version, list(verdicts.items()))
+        except Exception as e:
+            logger.warning(f"Verdict cache write failed: {e}")
+
+    return results
+
+
+async def _request_analysis_async(
+    paragraph_a_text: str,
+    paragraph_b_text: str,
+    doc_a_title: str = "",
+    doc_b_title: str = "",
+    stats: Optional[PairAnalysisStats] = None,
+    budget: Optional[AnalysisBudget] = None
+) -> Optional[Dict[str, Any]]:
+    """Send one pair to the LLM; raises on API or parsing errors"""
+    prompt = _build_consistency_prompt(
+        paragraph_a_text, paragraph_b_text, doc_a_title, doc_b_title
+    )
+
+    content = await _complete_async(prompt, stats, budget=budget)
+
+    return _parse_llm_result(content, paragraph_a_text, paragraph_b_text)
+
+
+async def _request_batch_analysis_async(
+    pairs: List[Dict[str, str]],
+    stats: Optional[PairAnalysisStats] = None,
+    budget: Optional[AnalysisBudget] = None
+) -> List[Any]:
+    """
+    Send several pairs to the LLM in one packed prompt.
+
+    Returns:
+        One entry per pair: the structured result (None if consistent), or
+        _FAILED if the model returned no valid result for that pair
+    """
+    content = await _complete_async(_build_batch_consistency_prompt(pairs), stats, len(pairs), budget)
+
+    entries = json.loads(content).get("results", [])
+    by_index: Dict[int, Dict[str, Any]] = {}
+    for entry in entries if isinstance(entries, list) else []:
+        if (
+            isinstance(entry, dict)
+            and isinstance(entry.get("pair_index"), int)
+            and isinstance(entry.get("is_inconsistent"), bool)
+            and 0 <= entry["pair_index"] < len(pairs)
+        ):
+            by_index.setdefault(entry["pair_index"], entry)
+
+    return [
+        _structure_result(by_index[index], pair["paragraph_a_text"], pair["paragraph_b_text"])
+        if index in by_index else _FAILED
+        for index, pair in enumerate(pairs)
+    ]
+
+
+async def _complete_async(
+    prompt: str,
+    stats: Optional[PairAnalysisStats] = None,
+    pair_count: int = 1,
+    budget: Optional[AnalysisBudget] = None
+) -> str:
+    """
+    Run one JSON-mode chat completion within the rate limits (and the
+    analysis budget) and record request and token counts.
+
+    Raises:
+        RateLimitExceeded: If the call could not be made within the OpenAI rate limits
+        BudgetExhausted: If the call did not fit in the budget or was still
+            running at its deadline
+    """
+    estimated = _estimate_call_tokens(prompt, pair_count)
+    if budget is not None:
+        budget.reserve(estimated)
+    if stats is not None:
+        stats.llm_calls += 1
+
+    async def _request():
+        async with _process_semaphore:
+            with timed("llm"), OPENAI_REQUESTS_IN_FLIGHT.labels("chat").track_inprogress():
+                return await clients.async_openai.chat.completions.create(
+                    model=settings.llm_model,
+                    messages=_build_messages(prompt),
+                    response_format={"type": "json_object"},
+                    temperature=0.2
+                )
+
+    call = openai_limiter.call_async(
+        settings.llm_model,
+        estimated,
+        _request,
+        settings.llm_max_retries,
+        settings.llm_retry_base_delay
+    )
+    remaining = budget.remaining_seconds() if budget is not None else None
+    if remaining is None:
+        response = await call
+    else:
+        try:
+            response = await asyncio.wait_for(call, remaining)
+        except asyncio.TimeoutError:
+            budget.abandon()
+            raise BudgetExhausted("Analysis deadline reached during an LLM call")
+
+    if response.usage and budget is not None:
+        budget.settle(estimated, response.usage.prompt_tokens + response.usage.completion_tokens)
+    if response.usage:
+        OPENAI_TOKENS.labels(settings.llm_model, "prompt").inc(response.usage.prompt_tokens)
+        OPENAI_TOKENS.labels(settings.llm_model, "completion").inc(response.usage.completion_tokens)
+        if stats is not None:
+            stats.prompt_tokens += response.usage.prompt_tokens
+            stats.completion_tokens += response.usage.completion_tokens
+
+    return response.choices[0].message.content
+
+
+def _duplicate(
+    paragraph_a_text: str,
+    paragraph_b_text: str,
+    score: Optional[float],
+    doc_a_title: str = "",
+    doc_b_title: str = "",
+    stats: Optional[PairAnalysisStats] = None
+) -> bool:
+    """
+    Check whether a pair can be resolved as consistent without an LLM call
+    (see prefilter.duplicate_reason), recording the skipped call.
+    """
+    if not settings.duplicate_shortcut_enabled:
+        return False
+    reason = duplicate_reason(paragraph_a_text, paragraph_b_text, score, settings.duplicate_min_score)
+    if reason is None:
+        return False
+
+    saved = _estimate_call_tokens(
+        _build_consistency_prompt(paragraph_a_text, paragraph_b_text, doc_a_title, doc_b_title), 1
+    )
+    LLM_CALLS_SKIPPED.labels(reason).inc()
+    LLM_TOKENS_SAVED.labels("duplicate").inc(saved)
+    if stats is not None:
+        stats.duplicates_skipped += 1
+        stats.tokens_saved += saved
+    return True
+
+
+def _window_pair(
+    paragraph_a_text: str, paragraph_b_text: str, stats: Optional[PairAnalysisStats] = None
+) -> Tuple[str, str, Tuple[int, int]]:
+    """
+    Trim both paragraphs of a pair to settings.llm_paragraph_max_tokens (see prefilter.window_text).
+
+    Returns:
+        (text A to send, text B to send, (offset A, offset B)) for _shift_result
+    """
+    max_tokens = settings.llm_paragraph_max_tokens
+    window_a, offset_a = window_text(paragraph_a_text, paragraph_b_text, max_tokens)
+    window_b, offset_b = window_text(paragraph_b_text, paragraph_a_text, max_tokens)
+
+    saved = (
+        estimate_tokens(paragraph_a_text) + estimate_tokens(paragraph_b_text)
+        - estimate_tokens(window_a) - estimate_tokens(window_b)
+    )
+    if saved > 0:
+        LLM_TOKENS_SAVED.labels("windowing").inc(saved)
+        if stats is not None:
+            stats.pairs_windowed += 1
+            stats.tokens_saved += saved
+    return window_a, window_b, (offset_a, offset_b)
+
+
+def _shift_result(
+    result: Any, offsets: Tuple[int, int], paragraph_a_text: str, paragraph_b_text: str
+) -> Any:
+    """Map the offsets of a verdict on windowed paragraphs back to the full paragraphs"""
+    if not result or offsets == (0, 0):
+        return result
+
+    shifted = dict(result)
+    for field, offset, text in (
+        ("source_location", offsets[0], paragraph_a_text),
+        ("target_location", offsets[1], paragraph_b_text)
+    ):
+        location = result[field]
+        shifted[field] = {
+            name: min(max(value + offset, 0), len(text)) if isinstance(value, int) else value
+            for name, value in location.items()
+        }
+    return shifted
+
+
+def _estimate_call_tokens(prompt: str, pair_count: int) -> int:
+    """Estimated total tokens of a chat completion, for rate limit accounting"""
+    return (
+        estimate_tokens(SYSTEM_PROMPT) + estimate_tokens(prompt)
+        + pair_count * settings.llm_completion_token_estimate
+    )
+
+
+def _build_packs(
+    items: List[Tuple[str, Dict[str, str]]], pack_size: int
+) -> List[List[str]]:
+    """
+    Group (key, pair) items into packs of at most pack_size pairs whose
+    estimated prompt size stays within settings.llm_pack_max_tokens.
+
+    Returns:
+        Lists of keys, one per pack
+    """
+    packs: List[List[str]] = []
+    current: List[str] = []
+    current_tokens = 0
+
+    for key, pair in items:
+        tokens = estimate_tokens(pair["paragraph_a_text"]) + estimate_tokens(pair["paragraph_b_text"])
+        if current and (
+            len(current) >= pack_size
+            or current_tokens + tokens > settings.llm_pack_max_tokens
+        ):
+            packs.append(current)
+            current, current_tokens = [], 0
+        current.append(key)
+        current_tokens += tokens
+
+    if current:
+        packs.append(current)
+    return packs
+
+
+@lru_cache(maxsize=1)
+def get_prompt_version() -> str:
+    """
+    Short hash of the system prompt and prompt templates.
+
+    Changes whenever SYSTEM_PROMPT, _build_consistency_prompt or
+    _build_batch_consistency_prompt is edited, which invalidates verdicts
+    cached under the previous prompts. Single and packed verdicts share it.
+    """
+    template = _build_consistency_prompt("{text_a}", "{text_b}", "{doc_a_title}", "{doc_b_title}")
+    batch_template = _build_batch_consistency_prompt([
+        {"paragraph_a_text": "{text_a}", "paragraph_b_text": "{text_b}"}
+    ])
+    return hashlib.sha256(
+        (SYSTEM_PROMPT + template + batch_template).encode("utf-8")
+    ).hexdigest()[:16]
+
+
+def _build_messages(prompt: str) -> List[Dict[str, str]]:
+    """Build the chat messages for a consistency prompt"""
+    return [
+        {"role": "system", "content": SYSTEM_PROMPT},
+        {"role": "user", "content": prompt}
+    ]
+
+
+def _parse_llm_result(
+    content: str, paragraph_a_text: str, paragraph_b_text: str
+) -> Optional[Dict[str, Any]]:
+    """Validate and structure the LLM JSON response"""
+    return _structure_result(json.loads(content), paragraph_a_text, paragraph_b_text)
+
+
+def _structure_result(
+    result: Dict[str, Any], paragraph_a_text: str, paragraph_b_text: str
+) -> Optional[Dict[str, Any]]:
+    """Structure one verdict object; returns None if the pair is consistent"""
+    if not result.get("is_inconsistent", False):
+        return None
+
+    inconsistency = {
+        "inconsistency_type": result.get("inconsistency_type", "CONTRADICTION"),
+        "severity": result.get("severity", "MEDIUM"),
+        "description": result.get("description", ""),
+        "explanation": result.get("explanation", ""),
+        "recommendation": result.get("recommendation", ""),
+        "source_excerpt": result.get("source_excerpt", paragraph_a_text[:200]),
+        "target_excerpt": result.get("target_excerpt", paragraph_b_text[:200]),
+        "source_location": {
+            "start_offset": result.get("source_start_offset", 0),
+            "end_offset": result.get("source_end_offset", len(paragraph_a_text))
+        },
+        "target_location": {
+            "start_offset": result.get("target_start_offset", 0),
+            "end_offset": result.get("target_end_offset", len(paragraph_b_text))
+        }
+    }
+
+    logger.info(f"Detected {inconsistency['severity']} {inconsistency['inconsistency_type']}")
+    return inconsistency
+
+
 def _build_consistency_prompt(
     text_a: str, text_b: str, doc_a_title: str, doc_b_title: str
 ) -> str:
@@ -144,4 +682,68 @@ Your task is to determine if there is a **semantic inconsistency** between these
 
 Respond ONLY with valid JSON, no additional text."""
 
-    return prompt
+
+def _build_batch_consistency_prompt(pairs: List[Dict[str, str]]) -> str:
+    """Build one LLM prompt that checks several passage pairs"""
+    passages = "\n\n".join(
+        f"""### Pair {index}
+
+**Document A{f' ({pair["doc_a_title"]})' if pair.get("doc_a_title") else ''}:**
+{pair["paragraph_a_text"]}
+
+**Document B{f' ({pair["doc_b_title"]})' if pair.get("doc_b_title") else ''}:**
+{pair["paragraph_b_text"]}"""
+        for index, pair in enumerate(pairs)
+    )
+
+    return f"""Analyze each of the following {len(pairs)} pairs of text passages from different documents for semantic inconsistencies. Judge every pair independently.
+
+{passages}
+
+For each pair, determine if there is a **semantic inconsistency** between its two passages. An inconsistency exists when:
+- The passages contradict each other
+- One passage is missing requirements or information present in the other
+- Definitions or terminology conflict
+- The scope of statements is inconsistent
+- Data or facts mismatch
+
+**Respond with valid JSON containing one result per pair, in the following format:**
+
+```json
+{{
+  "results": [
+    {{
+      "pair_index": 0,
+      "is_inconsistent": true/false,
+      "inconsistency_type": "one of: {', '.join(INCONSISTENCY_TYPES)}",
+      "severity": "one of: {', '.join(SEVERITY_LEVELS)}",
+      "description": "Brief one-sentence description of the inconsistency",
+      "explanation": "Detailed explanation of why this is inconsistent and what the conflict is",
+      "recommendation": "Actionable recommendation for resolving the inconsistency",
+      "source_excerpt": "The specific portion of text A that is inconsistent",
+      "target_excerpt": "The specific portion of text B that is inconsistent",
+      "source_start_offset": 0,
+      "source_end_offset": 100,
+      "target_start_offset": 0,
+      "target_end_offset": 100
+    }}
+  ]
+}}
+```
+
+`pair_index` is the number of the pair. Offsets refer to positions within that pair's passages.
+
+**Severity Guidelines:**
+- CRITICAL: Fundamental contradictions that invalidate document validity
+- HIGH: Significant conflicts that require immediate attention
+- MEDIUM: Notable inconsistencies that should be addressed
+- LOW: Minor discrepancies or stylistic differences
+
+**Important:**
+- Return exactly one result for every pair from 0 to {len(pairs) - 1}
+- If a pair is semantically consistent (even if worded differently), set `is_inconsistent` to `false` and omit the other fields
+- Only report actual semantic conflicts, not stylistic differences
+- Be precise about the type of inconsistency
+- Provide actionable recommendations
+
+Respond ONLY with valid JSON, no additional text."""
@@ -0,0 +1,241 @@
+from pydantic import BaseModel, Field
+from typing import Callable, List, Dict, Any, Literal, Optional, Set, Tuple
+import logging
+
+from src.config import settings
+from src.analysis.llm_service import analyze_paragraph_pairs, PairAnalysisStats
+from src.analysis.budget import AnalysisBudget
+from src.utils.metrics import CANDIDATE_PAIRS
+from src.analysis.candidates import (
+    CandidatePair,
+    generate_cluster_candidates,
+    generate_matrix_candidates,
+    generate_precomputed_candidates,
+    generate_project_candidates,
+    select_candidates
+)
+
+logger = logging.getLogger(__name__)
+
+
+class AnalysisOptions(BaseModel):
+    """Candidate selection and LLM options shared by the analysis endpoints"""
+    top_k: int = 3  # Number of similar paragraphs to check per source paragraph
+    concurrency: Optional[int] = Field(default=None, ge=1)  # Max in-flight LLM calls for this request
+    min_score: Optional[float] = None  # Minimum cosine score (default: settings.candidate_min_score)
+    max_per_target: Optional[int] = Field(default=None, ge=1)  # Max candidates per target paragraph
+    bidirectional: bool = False  # Also search target -> source documents
+    # "qdrant": one filtered vector search per paragraph; "matrix": in-process NumPy cosine matrix;
+    # "cluster": project-wide k-means, comparing paragraphs only within a cluster;
+    # "precomputed": nearest-neighbour edges stored at ingest (see CandidateGraph)
+    candidate_engine: Optional[Literal["qdrant", "matrix", "cluster", "precomputed"]] = None  # Default: settings.candidate_engine
+    matrix_selection: Literal["top_k", "mutual", "threshold"] = "top_k"  # Pair selection for "matrix"
+    pack_size: Optional[int] = Field(default=None, ge=1, le=50)  # Pairs per LLM request (default: settings.llm_pack_size)
+    # Budget: pairs are sent highest score first until a limit is reached (defaults: settings.analysis_*)
+    deadline_seconds: Optional[float] = Field(default=None, gt=0)  # Wall-clock limit from the start of the request
+    max_llm_calls: Optional[int] = Field(default=None, ge=0)  # Chat completion requests
+    max_tokens: Optional[int] = Field(default=None, ge=1)  # Prompt plus completion tokens
+    include_timings: bool = False  # Add a per-stage timing breakdown to the response
+
+
+class InconsistencyResponse(BaseModel):
+    source_document_id: str
+    target_document_id: str
+    source_paragraph_id: str
+    target_paragraph_id: str
+    source_excerpt: str
+    target_excerpt: str
+    source_location: Dict[str, Any]  # paragraph_id, start_offset, end_offset
+    target_location: Dict[str, Any]
+    inconsistency_type: str
+    severity: str
+    description: str
+    explanation: str
+    recommendation: str
+
+
+async def generate_candidates(
+    project_id: str,
+    document_ids: List[str],
+    paragraphs: List[Dict[str, Any]],
+    options: AnalysisOptions,
+    source_ids: Optional[Set[str]] = None
+) -> Tuple[int, List[CandidatePair]]:
+    """
+    Find and select candidate pairs with the requested engine.
+
+    Args:
+        source_ids: Only generate pairs involving these paragraphs
+
+    Returns:
+        (number of raw candidates considered, selected candidates)
+    """
+    min_score = options.min_score if options.min_score is not None else settings.candidate_min_score
+    engine = options.candidate_engine or settings.candidate_engine
+
+    if engine == "matrix":
+        raw_candidates = await generate_matrix_candidates(
+            project_id,
+            document_ids,
+            paragraphs,
+            options.top_k,
+            options.matrix_selection,
+            min_score,
+            options.bidirectional,
+            source_ids
+        )
+    elif engine == "cluster":
+        raw_candidates = await generate_cluster_candidates(
+            project_id,
+            document_ids,
+            paragraphs,
+            options.top_k,
+            options.bidirectional,
+            source_ids
+        )
+    elif engine == "precomputed":
+        raw_candidates = await generate_precomputed_candidates(
+            project_id,
+            document_ids,
+            paragraphs,
+            options.top_k,
+            options.bidirectional,
+            source_ids
+        )
+    else:
+        raw_candidates = await generate_project_candidates(
+            project_id,
+            document_ids,
+            paragraphs,
+            options.top_k,
+            options.bidirectional,
+            source_ids
+        )
+
+    candidates = select_candidates(
+        raw_candidates,
+        min_score=min_score,
+        max_per_target=options.max_per_target or settings.candidate_max_per_target
+    )
+    CANDIDATE_PAIRS.labels("considered").inc(len(raw_candidates))
+    CANDIDATE_PAIRS.labels("selected").inc(len(candidates))
+
+    logger.info(f"Selected {len(candidates)} of {len(raw_candidates)} candidate pairs ({engine} engine)")
+    return len(raw_candidates), candidates
+
+
+async def analyze_candidates(
+    candidates: List[CandidatePair],
+    options: AnalysisOptions,
+    stats: PairAnalysisStats,
+    on_result: Optional[Callable[[int, Optional[Dict[str, Any]], bool], None]] = None,
+    budget: Optional[AnalysisBudget] = None
+) -> List[InconsistencyResponse]:
+    """
+    Analyze candidate pairs with the LLM and map detected inconsistencies.
+
+    Candidates come ranked by score (see select_candidates), so with a budget
+    the highest-scoring pairs are analyzed first.
+    """
+    results = await analyze_paragraph_pairs(
+        [
+            {
+                "paragraph_a_text": candidate.source["text"],
+                "paragraph_b_text": candidate.target["text"]
+            }
+            for candidate in candidates
+        ],
+        concurrency=options.concurrency,
+        stats=stats,
+        pack_size=options.pack_size,
+        on_result=on_result,
+        scores=[candidate.score for candidate in candidates],
+        budget=budget
+    )
+
+    return [
+        build_inconsistency_response(candidate.source, candidate.target, result)
+        for candidate, result in zip(candidates, results)
+        if result
+    ]
+
+
+def build_inconsistency_response(
+    source_para: Dict[str, Any],
+    target_para: Dict[str, Any],
+    result: Dict[str, Any]
+) -> InconsistencyResponse:
+    """Map an LLM result for a paragraph pair to the API response model"""
+    return InconsistencyResponse(
+        source_document_id=source_para["document_id"],
+        target_document_id=target_para["document_id"],
+        source_paragraph_id=source_para["paragraph_id"],
+        target_paragraph_id=target_para["paragraph_id"],
+        source_excerpt=result["source_excerpt"],
+        target_excerpt=result["target_excerpt"],
+        source_location={
+            "paragraph_id": source_para["paragraph_id"],
+            "start_offset": result["source_location"]["start_offset"],
+            "end_offset": result["source_location"]["end_offset"]
+        },
+        target_location={
+            "paragraph_id": target_para["paragraph_id"],
+            "start_offset": result["target_location"]["start_offset"],
+            "end_offset": result["target_location"]["end_offset"]
+        },
+        inconsistency_type=result["inconsistency_type"],
+        severity=result["severity"],
+        description=result["description"],
+        explanation=result["explanation"],
+        recommendation=result["recommendation"]
+    )
+
+
+def summary_message(found: int, stats: PairAnalysisStats, budget: AnalysisBudget) -> str:
+    """Result message, mentioning pairs left without a verdict"""
+    if stats.budget_skipped:
+        message = (
+            f"Partial analysis ({budget.exhausted} budget exhausted). Found {found} inconsistencies; "
+            f"{stats.budget_skipped} lower-scoring pairs were not analyzed."
+        )
+    else:
+        message = f"Analysis complete. Found {found} inconsistencies."
+    if stats.llm_failures:
+        message += (
+            f" {stats.llm_failures} pairs could not be analyzed "
+            f"({stats.rate_limited} rate limited) and will be retried on the next run."
+        )
+    return message
+
+
+def stats_fields(stats: PairAnalysisStats, budget: AnalysisBudget) -> Dict[str, Any]:
+    """Counter and coverage fields shared by all analysis responses"""
+    return {
+        "pairs_analyzed": stats.pairs - stats.budget_skipped,
+        "cache_hits": stats.cache_hits,
+        "llm_calls": stats.llm_calls,
+        "prompt_tokens": stats.prompt_tokens,
+        "completion_tokens": stats.completion_tokens,
+        "pairs_failed": stats.llm_failures,
+        "pairs_rate_limited": stats.rate_limited,
+        "llm_calls_skipped": stats.duplicates_skipped,
+        "pairs_windowed": stats.pairs_windowed,
+        "tokens_saved": stats.tokens_saved,
+        "partial": stats.budget_skipped > 0,
+        "budget_exhausted": budget.exhausted if stats.budget_skipped else None,
+        "pairs_skipped": stats.budget_skipped,
+        "lowest_score_analyzed": (
+            round(budget.lowest_score, 4) if budget.lowest_score is not None else None
+        )
+    }
+
+
+def analysis_budget(options: AnalysisOptions) -> AnalysisBudget:
+    """Analysis budget from the request, falling back to the configured defaults"""
+    return AnalysisBudget(
+        deadline_seconds=options.deadline_seconds or settings.analysis_deadline_seconds,
+        max_llm_calls=(
+            options.max_llm_calls if options.max_llm_calls is not None else settings.analysis_max_llm_calls
+        ),
+        max_tokens=options.max_tokens or settings.analysis_max_tokens
+    )
@@ -0,0 +1,135 @@
+from collections import Counter
+from typing import List, Optional, Tuple
+import re
+
+from src.utils.text import estimate_tokens, normalize_text
+
+# Duplicate reasons
+EXACT = "exact"  # Equal after normalization
+NEAR = "near"  # Very high cosine and the same facts
+
+# Tokens whose change can flip a verdict even between near-identical paragraphs:
+# numbers (amounts, dates, versions), capitalized names and acronyms, negations and modal verbs
+_NUMBER_RE = re.compile(r"\d+(?:[.,:/-]\d+)*%?")
+_ENTITY_RE = re.compile(r"\b[A-Z][\w-]*")
+_KEYWORD_RE = re.compile(
+    r"\b(?:not|no|never|none|nor|without|cannot|can't|won't|mustn't|shouldn't|isn't|aren't|"
+    r"shall|must|should|may|might|can|will|required|optional|prohibited|allowed|"
+    r"before|after|minimum|maximum|at least|at most|less|more)\b",
+    re.IGNORECASE
+)
+
+_WORD_RE = re.compile(r"\w{3,}")
+# Sentence ends (and line breaks) where a paragraph can be windowed
+_BOUNDARY_RE = re.compile(r"(?<=[.!?;:])\s+|\n+")
+
+# Marks text cut from a windowed paragraph
+ELLIPSIS = "[...]"
+
+
+def duplicate_reason(text_a: str, text_b: str, score: Optional[float], min_score: float) -> Optional[str]:
+    """
+    Check whether two paragraphs are duplicates that cannot be inconsistent.
+
+    Args:
+        text_a: First paragraph
+        text_b: Second paragraph
+        score: Cosine similarity of their embeddings, if known
+        min_score: Cosine similarity from which near-duplicates are considered
+
+    Returns:
+        EXACT or NEAR if the pair is a duplicate, otherwise None
+    """
+    if _comparable(text_a) == _comparable(text_b):
+        return EXACT
+    if score is not None and score >= min_score and _facts(text_a) == _facts(text_b):
+        return NEAR
+    return None
+
+
+def window_text(text: str, other: str, max_tokens: int) -> Tuple[str, int]:
+    """
+    Trim a paragraph to a token budget around the region most similar to the other one.
+
+    The paragraph is split at sentence boundaries (long sentences at word
+    boundaries) and the contiguous run of segments within the budget that
+    shares the most words with the other paragraph (rare words counting more)
+    is kept. Cut text is marked with ELLIPSIS.
+
+    Args:
+        text: Paragraph to trim
+        other: Paragraph it is compared with
+        max_tokens: Token budget (estimate_tokens); 0 disables windowing
+
+    Returns:
+        (text to send, offset to add to positions in it to get positions in text)
+    """
+    if max_tokens <= 0 or estimate_tokens(text) <= max_tokens:
+        return text, 0
+
+    max_chars = max(1, max_tokens * 3 - 2 * (len(ELLIPSIS) + 1))
+    spans = _segments(text, max_chars)
+    other_words = set(_WORD_RE.findall(other.lower()))
+    shared = [set(_WORD_RE.findall(text[start:end].lower())) & other_words for start, end in spans]
+    # Words repeated all over the paragraph say little about where the matching region is
+    frequency = Counter(word for words in shared for word in words)
+    weights = [sum(1 / frequency[word] for word in words) for words in shared]
+
+    # Highest-scoring window of consecutive segments that fits in max_chars
+    best, best_range = -1, (0, 1)
+    first, total = 0, 0
+    for last, (_, end) in enumerate(spans):
+        total += weights[last]
+        while end - spans[first][0] > max_chars:
+            total -= weights[first]
+            first += 1
+        if total > best:
+            best, best_range = total, (first, last + 1)
+
+    start, end = spans[best_range[0]][0], spans[best_range[1] - 1][1]
+    prefix = f"{ELLIPSIS} " if start > 0 else ""
+    suffix = f" {ELLIPSIS}" if end < len(text) else ""
+    return f"{prefix}{text[start:end]}{suffix}", start - len(prefix)
+
+
+def _comparable(text: str) -> str:
+    """Normalized, case-folded text"""
+    return normalize_text(text).casefold()
+
+
+def _facts(text: str) -> Tuple[Counter, Counter, Counter]:
+    """Numbers, entities and negation/modal keywords of a paragraph, with counts"""
+    normalized = normalize_text(text)
+    return (
+        Counter(_NUMBER_RE.findall(normalized)),
+        Counter(_ENTITY_RE.findall(normalized)),
+        Counter(keyword.lower() for keyword in _KEYWORD_RE.findall(normalized))
+    )
+
+
+def _segments(text: str, max_chars: int) -> List[Tuple[int, int]]:
+    """(start, end) spans of the sentences of text, none longer than max_chars"""
+    spans = []
+    start = 0
+    for boundary in _BOUNDARY_RE.finditer(text):
+        if boundary.start() > start:
+            spans.extend(_split_long(text, start, boundary.start(), max_chars))
+        start = boundary.end()
+    if start < len(text):
+        spans.extend(_split_long(text, start, len(text), max_chars))
+    return spans
+
+
+def _split_long(text: str, start: int, end: int, max_chars: int) -> List[Tuple[int, int]]:
+    """Split a span longer than max_chars at whitespace (or hard, if there is none)"""
+    spans = []
+    while end - start > max_chars:
+        cut = text.rfind(" ", start + 1, start + max_chars)
+        cut = cut if cut > start else start + max_chars
+        spans.append((start, cut))
+        start = cut
+        while start < end and text[start] == " ":
+            start += 1
+    if start < end:
+        spans.append((start, end))
+    return spans
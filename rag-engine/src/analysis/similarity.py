@@ -0,0 +1,210 @@
+import numpy as np
+from typing import List, Tuple
+
+# Rows of the similarity matrix computed at once (bounds peak memory)
+BLOCK_ROWS = 2048
+
+
+def to_unit_matrix(vectors: List[List[float]]) -> np.ndarray:
+    """Stack vectors into a float32 matrix with L2-normalized rows"""
+    matrix = np.asarray(vectors, dtype=np.float32)
+    if matrix.ndim != 2 or matrix.shape[0] == 0:
+        return matrix.reshape(0, 0)
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+def cosine_matrix(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    """Cosine similarity of every row of a with every row of b (unit-normalized inputs)"""
+    return a @ b.T
+
+
+def top_k_pairs(a: np.ndarray, b: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    For each row of a, the k most similar rows of b.
+
+    Returns:
+        (row indices, column indices, scores) arrays of equal length
+    """
+    k = min(k, b.shape[0])
+    if k <= 0 or a.shape[0] == 0:
+        return _empty()
+
+    rows, cols, scores = [], [], []
+    for start in range(0, a.shape[0], BLOCK_ROWS):
+        sim = cosine_matrix(a[start:start + BLOCK_ROWS], b)
+        if k < b.shape[0]:
+            top = np.argpartition(-sim, k - 1, axis=1)[:, :k]
+        else:
+            top = np.broadcast_to(np.arange(b.shape[0]), sim.shape)
+        block_rows = np.repeat(np.arange(sim.shape[0]), k)
+        block_cols = top.reshape(-1)
+        rows.append(block_rows + start)
+        cols.append(block_cols)
+        scores.append(sim[block_rows, block_cols])
+
+    return np.concatenate(rows), np.concatenate(cols), np.concatenate(scores)
+
+
+def mutual_nearest_pairs(a: np.ndarray, b: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Pairs (i, j) where b[j] is a[i]'s nearest neighbour and a[i] is b[j]'s.
+
+    Returns:
+        (row indices, column indices, scores) arrays of equal length
+    """
+    if a.shape[0] == 0 or b.shape[0] == 0:
+        return _empty()
+
+    row_best = np.empty(a.shape[0], dtype=np.int64)
+    row_score = np.empty(a.shape[0], dtype=np.float32)
+    col_best = np.zeros(b.shape[0], dtype=np.int64)
+    col_score = np.full(b.shape[0], -np.inf, dtype=np.float32)
+
+    for start in range(0, a.shape[0], BLOCK_ROWS):
+        sim = cosine_matrix(a[start:start + BLOCK_ROWS], b)
+        best = sim.argmax(axis=1)
+        row_best[start:start + sim.shape[0]] = best
+        row_score[start:start + sim.shape[0]] = sim[np.arange(sim.shape[0]), best]
+
+        block_col_best = sim.argmax(axis=0)
+        block_col_score = sim[block_col_best, np.arange(sim.shape[1])]
+        improved = block_col_score > col_score
+        col_best[improved] = block_col_best[improved] + start
+        col_score[improved] = block_col_score[improved]
+
+    rows = np.nonzero(col_best[row_best] == np.arange(a.shape[0]))[0]
+    return rows, row_best[rows], row_score[rows]
+
+
+def threshold_pairs(
+    a: np.ndarray, b: np.ndarray, threshold: float
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    All pairs with cosine similarity >= threshold.
+
+    Returns:
+        (row indices, column indices, scores) arrays of equal length
+    """
+    if a.shape[0] == 0 or b.shape[0] == 0:
+        return _empty()
+
+    rows, cols, scores = [], [], []
+    for start in range(0, a.shape[0], BLOCK_ROWS):
+        sim = cosine_matrix(a[start:start + BLOCK_ROWS], b)
+        block_rows, block_cols = np.nonzero(sim >= threshold)
+        rows.append(block_rows + start)
+        cols.append(block_cols)
+        scores.append(sim[block_rows, block_cols])
+
+    return np.concatenate(rows), np.concatenate(cols), np.concatenate(scores)
+
+
+def nearest_centroids(matrix: np.ndarray, centroids: np.ndarray, probes: int = 1) -> np.ndarray:
+    """
+    The probes most similar centroids of every row (unit-normalized inputs).
+
+    Returns:
+        (rows, probes) array of centroid indices, most similar first
+    """
+    probes = min(probes, centroids.shape[0])
+    nearest = np.empty((matrix.shape[0], probes), dtype=np.int64)
+    for start in range(0, matrix.shape[0], BLOCK_ROWS):
+        sim = cosine_matrix(matrix[start:start + BLOCK_ROWS], centroids)
+        if probes == 1:
+            top = sim.argmax(axis=1)[:, None]
+        else:
+            top = np.argpartition(-sim, probes - 1, axis=1)[:, :probes]
+            order = np.argsort(-np.take_along_axis(sim, top, axis=1), axis=1)
+            top = np.take_along_axis(top, order, axis=1)
+        nearest[start:start + sim.shape[0]] = top
+    return nearest
+
+
+def spherical_kmeans(
+    matrix: np.ndarray, k: int, iterations: int, rng: np.random.Generator
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Cluster unit-normalized rows by cosine similarity (k-means on the sphere).
+
+    Centroids start at k random rows; empty clusters are re-seeded with a random row.
+
+    Returns:
+        (centroids, label of every row)
+    """
+    k = min(k, matrix.shape[0])
+    centroids = matrix[rng.choice(matrix.shape[0], size=k, replace=False)]
+    labels = np.full(matrix.shape[0], -1, dtype=np.int64)
+
+    for _ in range(iterations):
+        new_labels = nearest_centroids(matrix, centroids)[:, 0]
+        if np.array_equal(new_labels, labels):
+            break
+        labels = new_labels
+        # Per-cluster sums as one matrix multiply (k is small)
+        assignment = np.zeros((k, matrix.shape[0]), dtype=matrix.dtype)
+        assignment[labels, np.arange(matrix.shape[0])] = 1
+        sums = assignment @ matrix
+        empty = ~sums.any(axis=1)
+        sums[empty] = matrix[rng.choice(matrix.shape[0], size=int(empty.sum()))]
+        centroids = to_unit_matrix(sums)
+
+    return centroids, labels
+
+
+def cluster_indices(
+    matrix: np.ndarray,
+    max_size: int,
+    branching: int = 8,
+    probes: int = 1,
+    iterations: int = 10,
+    seed: int = 0
+) -> List[np.ndarray]:
+    """
+    Partition rows into clusters of about max_size similar rows with hierarchical k-means.
+
+    Clusters larger than max_size are split into at most branching children
+    until they fit, so the cost grows with rows x log(rows) rather than with
+    rows x clusters. On the split that produces the final clusters, each row
+    joins its probes nearest children, so close rows on either side of a
+    boundary still share a cluster.
+
+    Returns:
+        Row indices of every cluster (a row is in up to probes clusters)
+    """
+    rng = np.random.default_rng(seed)
+    clusters: List[np.ndarray] = []
+    stack = [np.arange(matrix.shape[0])]
+
+    while stack:
+        members = stack.pop()
+        if len(members) <= max_size:
+            clusters.append(members)
+            continue
+
+        k = max(2, min(branching, -(-len(members) // max_size)))
+        centroids, labels = spherical_kmeans(matrix[members], k, iterations, rng)
+
+        if probes > 1 and len(members) <= branching * max_size:
+            nearest = nearest_centroids(matrix[members], centroids, probes)
+            groups = [members[(nearest == c).any(axis=1)] for c in range(len(centroids))]
+            clusters.extend(group for group in groups if len(group))
+            continue
+
+        groups = [members[labels == c] for c in range(len(centroids))]
+        if max(len(group) for group in groups) == len(members):
+            # Identical vectors cannot be split further
+            clusters.append(members)
+            continue
+        stack.extend(group for group in groups if len(group))
+
+    return clusters
+
+
+def _empty() -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    return (
+        np.empty(0, dtype=np.int64),
+        np.empty(0, dtype=np.int64),
+        np.empty(0, dtype=np.float32)
+    )
@@ -0,0 +1,188 @@
+from typing import Dict, Any, List, Optional, Tuple
+import hashlib
+import json
+import logging
+
+from src.config import settings
+from src.clients.database import db_client
+from src.utils.metrics import CACHE_LOOKUPS, timed
+from src.utils.text import text_hash
+
+logger = logging.getLogger(__name__)
+
+# Sentinel returned by lookups for keys that are not cached
+MISS = object()
+
+
+class VerdictCache:
+    """
+    Persistent cache of LLM verdicts for paragraph pairs, stored in PostgreSQL.
+
+    Keys combine the normalized text hashes of both paragraphs, the document
+    titles, the LLM model and the prompt version. Both "inconsistent" and
+    "consistent" verdicts are stored, so unchanged pairs never hit the LLM again.
+    Entries expire after settings.verdict_cache_ttl_seconds and the table is
+    trimmed to settings.verdict_cache_max_entries (least recently hit first).
+    """
+
+    def __init__(self):
+        self.enabled = settings.verdict_cache_enabled
+        self.ttl_seconds = settings.verdict_cache_ttl_seconds
+        self.max_entries = settings.verdict_cache_max_entries
+        self.hits = 0
+        self.misses = 0
+        self._writes_since_eviction = 0
+
+    async def ensure_schema(self):
+        """Create the cache table if it doesn't exist and evict stale entries"""
+        pool = await db_client.get_pool()
+        await pool.execute(
+            """
+            CREATE TABLE IF NOT EXISTS llm_verdict_cache (
+                cache_key TEXT PRIMARY KEY,
+                llm_model TEXT NOT NULL,
+                prompt_version TEXT NOT NULL,
+                is_inconsistent BOOLEAN NOT NULL,
+                verdict JSONB,
+                created_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+                last_hit_at TIMESTAMPTZ NOT NULL DEFAULT now()
+            );
+            CREATE INDEX IF NOT EXISTS llm_verdict_cache_last_hit_at_idx
+                ON llm_verdict_cache (last_hit_at);
+            """
+        )
+        await self.evict()
+
+    def make_key(
+        self,
+        prompt_version: str,
+        paragraph_a_text: str,
+        paragraph_b_text: str,
+        doc_a_title: str = "",
+        doc_b_title: str = ""
+    ) -> str:
+        """Build the cache key for a directed paragraph pair"""
+        key_parts = [
+            settings.llm_model,
+            prompt_version,
+            doc_a_title,
+            doc_b_title,
+            text_hash(paragraph_a_text),
+            text_hash(paragraph_b_text)
+        ]
+        return hashlib.sha256(json.dumps(key_parts).encode("utf-8")).hexdigest()
+
+    async def get_many(self, keys: List[str]) -> Dict[str, Any]:
+        """
+        Look up many cache keys in a single query.
+
+        Returns:
+            Dictionary mapping each key to its cached verdict (None for
+            "consistent") or MISS if the key is not cached
+        """
+        if not keys:
+            return {}
+
+        pool = await db_client.get_pool()
+        with timed("postgres"):
+            rows = await pool.fetch(
+                """
+                UPDATE llm_verdict_cache
+                SET last_hit_at = now()
+                WHERE cache_key = ANY($1::text[])
+                  AND created_at > now() - make_interval(secs => $2)
+                RETURNING cache_key, is_inconsistent, verdict
+                """,
+                list(set(keys)),
+                float(self.ttl_seconds)
+            )
+        found: Dict[str, Optional[Dict[str, Any]]] = {
+            row["cache_key"]: row["verdict"] if row["is_inconsistent"] else None
+            for row in rows
+        }
+
+        hits = sum(1 for key in keys if key in found)
+        self.hits += hits
+        self.misses += len(keys) - hits
+        CACHE_LOOKUPS.labels("verdict", "hit").inc(hits)
+        CACHE_LOOKUPS.labels("verdict", "miss").inc(len(keys) - hits)
+
+        return {key: found.get(key, MISS) for key in keys}
+
+    async def put_many(
+        self, prompt_version: str, entries: List[Tuple[str, Optional[Dict[str, Any]]]]
+    ):
+        """Store (cache_key, verdict) entries; a None verdict records a consistent pair"""
+        if not entries:
+            return
+
+        # Last write wins for duplicate keys within one batch
+        rows = {
+            key: (key, settings.llm_model, prompt_version, verdict is not None, verdict)
+            for key, verdict in entries
+        }
+
+        pool = await db_client.get_pool()
+        await pool.executemany(
+            """
+            INSERT INTO llm_verdict_cache
+                (cache_key, llm_model, prompt_version, is_inconsistent, verdict)
+            VALUES ($1, $2, $3, $4, $5)
+            ON CONFLICT (cache_key) DO UPDATE SET
+                is_inconsistent = EXCLUDED.is_inconsistent,
+                verdict = EXCLUDED.verdict,
+                created_at = now(),
+                last_hit_at = now()
+            """,
+            list(rows.values())
+        )
+
+        self._writes_since_eviction += len(rows)
+        if self._writes_since_eviction >= settings.verdict_cache_eviction_interval:
+            self._writes_since_eviction = 0
+            await self.evict()
+
+    async def evict(self):
+        """Delete expired entries and trim the cache to max_entries"""
+        pool = await db_client.get_pool()
+        expired = await pool.execute(
+            """
+            DELETE FROM llm_verdict_cache
+            WHERE created_at <= now() - make_interval(secs => $1)
+            """,
+            float(self.ttl_seconds)
+        )
+        trimmed = await pool.execute(
+            """
+            DELETE FROM llm_verdict_cache
+            WHERE cache_key IN (
+                SELECT cache_key FROM llm_verdict_cache
+                ORDER BY last_hit_at DESC
+                OFFSET $1
+            )
+            """,
+            self.max_entries
+        )
+
+        expired_count, trimmed_count = _row_count(expired), _row_count(trimmed)
+        if expired_count or trimmed_count:
+            logger.info(f"Verdict cache eviction: {expired_count} expired, {trimmed_count} trimmed")
+
+    def stats(self) -> Dict[str, Any]:
+        """In-process hit/miss counters"""
+        total = self.hits + self.misses
+        return {
+            "enabled": self.enabled,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / total, 4) if total else 0.0
+        }
+
+
+def _row_count(status: str) -> int:
+    """Parse the row count from an asyncpg command status (e.g. 'DELETE 12')"""
+    return int(status.split()[-1])
+
+
+# Singleton instance
+verdict_cache = VerdictCache()
@@ -0,0 +1,325 @@
+from datetime import datetime
+from typing import Dict, Any, Coroutine, List, Optional, Set, Tuple
+import asyncio
+import logging
+import os
+import socket
+import uuid
+
+from src.config import settings
+from src.clients.database import db_client
+
+logger = logging.getLogger(__name__)
+
+# Work item lifecycle
+QUEUED = "queued"
+LEASED = "leased"
+DONE = "done"
+FAILED = "failed"
+
+# (source paragraph id, target paragraph id, candidate score)
+WorkPair = Tuple[str, str, float]
+
+
+class WorkQueue:
+    """
+    Work queue of distributed analysis jobs, stored in PostgreSQL.
+
+    A distributed job splits its candidate pairs into analysis_work_items of
+    settings.analysis_work_item_size pairs. Worker replicas claim items with
+    FOR UPDATE SKIP LOCKED (highest-scoring pairs first), so no two workers
+    wait on or take the same item, and hold a lease of
+    settings.analysis_lease_seconds that they renew while analyzing. Verdicts
+    are written to the job's checkpoints (analysis_job_pairs). An item whose
+    lease expires (crashed or stalled worker) is claimed again, up to
+    settings.analysis_work_item_max_attempts times before it is marked failed.
+
+    Worker loops run as asyncio tasks of this process (see routes.jobs.start_workers).
+    """
+
+    def __init__(self):
+        self.enabled = settings.analysis_worker_enabled
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self._tasks: Set[asyncio.Task] = set()
+
+    async def ensure_schema(self):
+        """Create the work item table if it doesn't exist (after the job tables)"""
+        pool = await db_client.get_pool()
+        await pool.execute(
+            """
+            CREATE TABLE IF NOT EXISTS analysis_work_items (
+                id BIGSERIAL PRIMARY KEY,
+                job_id TEXT NOT NULL REFERENCES analysis_jobs (id) ON DELETE CASCADE,
+                pairs JSONB NOT NULL,
+                priority REAL NOT NULL,
+                status TEXT NOT NULL DEFAULT 'queued',
+                attempts INTEGER NOT NULL DEFAULT 0,
+                leased_by TEXT,
+                lease_expires_at TIMESTAMPTZ,
+                pairs_failed INTEGER NOT NULL DEFAULT 0,
+                stats JSONB NOT NULL DEFAULT '{}'::jsonb,
+                error TEXT,
+                created_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+                finished_at TIMESTAMPTZ
+            );
+            CREATE INDEX IF NOT EXISTS analysis_work_items_claim_idx
+                ON analysis_work_items (status, priority DESC, id);
+            CREATE INDEX IF NOT EXISTS analysis_work_items_job_id_idx
+                ON analysis_work_items (job_id);
+            """
+        )
+
+    async def enqueue(self, job_id: str, pairs: List[WorkPair]) -> datetime:
+        """
+        Split pairs (highest score first) into work items.
+
+        Returns:
+            Database time before the items were queued (see progress)
+        """
+        size = max(1, settings.analysis_work_item_size)
+        batches = [pairs[start:start + size] for start in range(0, len(pairs), size)]
+        pool = await db_client.get_pool()
+        async with pool.acquire() as conn:
+            async with conn.transaction():
+                queued_at = await conn.fetchval("SELECT now()")
+                await conn.executemany(
+                    "INSERT INTO analysis_work_items (job_id, pairs, priority) VALUES ($1, $2, $3)",
+                    [
+                        (job_id, [list(pair) for pair in batch], max(pair[2] for pair in batch))
+                        for batch in batches
+                    ]
+                )
+        logger.info(f"Job {job_id}: queued {len(pairs)} pairs in {len(batches)} work items")
+        return queued_at
+
+    async def pending_pairs(self, job_id: str) -> Set[Tuple[str, str]]:
+        """(source, target) pairs of a job's queued or leased items"""
+        pool = await db_client.get_pool()
+        rows = await pool.fetch(
+            """
+            SELECT pairs FROM analysis_work_items
+            WHERE job_id = $1 AND status = ANY($2::text[])
+            """,
+            job_id,
+            [QUEUED, LEASED]
+        )
+        return {(pair[0], pair[1]) for row in rows for pair in row["pairs"]}
+
+    async def claim(self) -> Optional[Dict[str, Any]]:
+        """
+        Lease the next work item: queued, or leased with an expired lease.
+
+        Items whose lease expired after their last allowed attempt are marked
+        failed instead.
+
+        Returns:
+            The leased item row, or None if there is no work
+        """
+        pool = await db_client.get_pool()
+        async with pool.acquire() as conn:
+            expired = await conn.fetch(
+                """
+                UPDATE analysis_work_items
+                SET status = 'failed', finished_at = now(), leased_by = NULL,
+                    pairs_failed = jsonb_array_length(pairs),
+                    error = 'Lease expired after ' || attempts || ' attempts'
+                WHERE status = 'leased' AND lease_expires_at < now() AND attempts >= $1
+                RETURNING id, job_id
+                """,
+                settings.analysis_work_item_max_attempts
+            )
+            for row in expired:
+                logger.warning(f"Work item {row['id']} of job {row['job_id']} failed: lease expired too often")
+
+            row = await conn.fetchrow(
+                """
+                WITH next AS (
+                    SELECT id FROM analysis_work_items
+                    WHERE status = 'queued' OR (status = 'leased' AND lease_expires_at < now())
+                    ORDER BY priority DESC, id
+                    LIMIT 1
+                    FOR UPDATE SKIP LOCKED
+                )
+                UPDATE analysis_work_items w
+                SET status = 'leased', leased_by = $1, attempts = w.attempts + 1,
+                    lease_expires_at = now() + make_interval(secs => $2)
+                FROM next
+                WHERE w.id = next.id
+                RETURNING w.*
+                """,
+                self.worker_id,
+                settings.analysis_lease_seconds
+            )
+        return dict(row) if row else None
+
+    async def heartbeat(self, item_id: int) -> bool:
+        """Extend the lease of an item; False if it is no longer held by this worker"""
+        pool = await db_client.get_pool()
+        row = await pool.fetchrow(
+            """
+            UPDATE analysis_work_items
+            SET lease_expires_at = now() + make_interval(secs => $3)
+            WHERE id = $1 AND leased_by = $2 AND status = 'leased'
+            RETURNING id
+            """,
+            item_id,
+            self.worker_id,
+            settings.analysis_lease_seconds
+        )
+        return row is not None
+
+    async def complete(
+        self,
+        item: Dict[str, Any],
+        entries: List[Tuple[str, float, Optional[Dict[str, Any]]]],
+        pairs_failed: int,
+        stats: Dict[str, int]
+    ) -> bool:
+        """
+        Checkpoint an item's verdicts and mark it done, in one transaction.
+
+        Verdicts are stored even if the lease was lost in the meantime (they
+        are valid, and checkpoints ignore duplicates); the item itself is only
+        updated while this worker holds it.
+
+        Args:
+            item: Leased item row
+            entries: (pair_key, score, inconsistency) verdicts; None records a consistent pair
+            pairs_failed: Pairs of the item left without a verdict (LLM errors)
+            stats: PairAnalysisStats counters of the item
+
+        Returns:
+            False if the lease had been lost
+        """
+        pool = await db_client.get_pool()
+        async with pool.acquire() as conn:
+            async with conn.transaction():
+                if entries:
+                    await conn.executemany(
+                        """
+                        INSERT INTO analysis_job_pairs (job_id, pair_key, score, inconsistency)
+                        VALUES ($1, $2, $3, $4)
+                        ON CONFLICT (job_id, pair_key) DO NOTHING
+                        """,
+                        [(item["job_id"], *entry) for entry in entries]
+                    )
+                row = await conn.fetchrow(
+                    """
+                    UPDATE analysis_work_items
+                    SET status = 'done', finished_at = now(), leased_by = NULL,
+                        pairs_failed = $3, stats = $4
+                    WHERE id = $1 AND leased_by = $2 AND status = 'leased'
+                    RETURNING id
+                    """,
+                    item["id"],
+                    self.worker_id,
+                    pairs_failed,
+                    stats
+                )
+        return row is not None
+
+    async def release(self, item_id: int):
+        """Return a leased item to the queue right away (worker shutdown; not a failed attempt)"""
+        pool = await db_client.get_pool()
+        await pool.execute(
+            """
+            UPDATE analysis_work_items
+            SET status = 'queued', leased_by = NULL, lease_expires_at = NULL,
+                attempts = greatest(attempts - 1, 0)
+            WHERE id = $1 AND leased_by = $2 AND status = 'leased'
+            """,
+            item_id,
+            self.worker_id
+        )
+
+    async def fail(self, item: Dict[str, Any], error: str):
+        """Record a failed attempt: requeue the item, or mark it failed after its last attempt"""
+        pool = await db_client.get_pool()
+        await pool.execute(
+            """
+            UPDATE analysis_work_items
+            SET status = CASE WHEN attempts >= $3 THEN 'failed' ELSE 'queued' END,
+                finished_at = CASE WHEN attempts >= $3 THEN now() END,
+                pairs_failed = CASE WHEN attempts >= $3 THEN jsonb_array_length(pairs) ELSE 0 END,
+                leased_by = NULL, lease_expires_at = NULL, error = $4
+            WHERE id = $1 AND leased_by = $2 AND status = 'leased'
+            """,
+            item["id"],
+            self.worker_id,
+            settings.analysis_work_item_max_attempts,
+            error
+        )
+
+    async def cancel_job(self, job_id: str, leased: bool = True) -> int:
+        """
+        Delete a job's unfinished items.
+
+        Args:
+            job_id: Job to cancel
+            leased: Also delete leased items (their workers stop at the next heartbeat)
+
+        Returns:
+            Number of items deleted
+        """
+        statuses = [QUEUED, LEASED] if leased else [QUEUED]
+        pool = await db_client.get_pool()
+        rows = await pool.fetch(
+            "DELETE FROM analysis_work_items WHERE job_id = $1 AND status = ANY($2::text[]) RETURNING id",
+            job_id,
+            statuses
+        )
+        return len(rows)
+
+    async def progress(self, job_id: str, since: datetime) -> Dict[str, Any]:
+        """
+        Unfinished items of a job, and the failed pairs and summed stats of items finished since a time.
+
+        Returns:
+            {"pending": int, "pairs_failed": int, "stats": {counter: total}}
+        """
+        pool = await db_client.get_pool()
+        row = await pool.fetchrow(
+            """
+            SELECT
+                count(*) FILTER (WHERE status IN ('queued', 'leased')) AS pending,
+                coalesce(sum(pairs_failed) FILTER (WHERE finished_at >= $2), 0) AS pairs_failed
+            FROM analysis_work_items
+            WHERE job_id = $1
+            """,
+            job_id,
+            since
+        )
+        stats = await pool.fetch(
+            """
+            SELECT s.key, sum(s.value::bigint)::bigint AS total
+            FROM analysis_work_items w, jsonb_each_text(w.stats) AS s
+            WHERE w.job_id = $1 AND w.finished_at >= $2
+            GROUP BY s.key
+            """,
+            job_id,
+            since
+        )
+        return {
+            "pending": row["pending"],
+            "pairs_failed": row["pairs_failed"],
+            "stats": {stat["key"]: stat["total"] for stat in stats}
+        }
+
+    def start(self, coro: Coroutine):
+        """Run a worker or job takeover loop as a background task of this process"""
+        task = asyncio.create_task(coro)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def shutdown(self):
+        """Stop the background loops; leased items are released for other workers"""
+        tasks = list(self._tasks)
+        for task in tasks:
+            task.cancel()
+        if tasks:
+            await asyncio.gather(*tasks, return_exceptions=True)
+            logger.info(f"Stopped {len(tasks)} analysis workers")
+
+
+# Singleton instance
+work_queue = WorkQueue()
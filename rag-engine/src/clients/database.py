@@ -1,68 +1,167 @@
-import psycopg2
-from psycopg2.extras import RealDictCursor
-from typing import List, Dict, Any
+import asyncpg
+from typing import List, Dict, Any, Optional
+import asyncio
+import json
 import logging
 
 from src.config import settings
+from src.utils.metrics import timed
 
 logger = logging.getLogger(__name__)
 
+PARAGRAPH_COLUMNS = "id, document_id, index, paragraph_id, text"
+
 
 class DatabaseClient:
+    """
+    PostgreSQL client backed by an asyncpg connection pool.
+
+    The pool is opened on startup (or lazily on first use) and shared by all
+    requests. Bulk methods fetch rows for many documents or ids in a single
+    query, so request handlers issue a constant number of queries regardless
+    of paragraph count.
+    """
+
     def __init__(self):
         self.connection_string = settings.database_url
+        self._pool: Optional[asyncpg.Pool] = None
+        self._pool_lock = asyncio.Lock()
+
+    async def connect(self):
+        """Open the connection pool"""
+        await self.get_pool()
 
-    def get_connection(self):
-        """Get a new database connection"""
-        return psycopg2.connect(self.connection_string, cursor_factory=RealDictCursor)
+    async def close(self):
+        """Close the connection pool"""
+        if self._pool is not None:
+            await self._pool.close()
+            self._pool = None
 
-    def fetch_document_paragraphs(self, document_id: str) -> List[Dict[str, Any]]:
+    async def get_pool(self) -> asyncpg.Pool:
+        """Get the shared connection pool, creating it on first use"""
+        if self._pool is None:
+            async with self._pool_lock:
+                if self._pool is None:
+                    self._pool = await asyncpg.create_pool(
+                        self.connection_string,
+                        min_size=settings.database_pool_min_size,
+                        max_size=settings.database_pool_max_size,
+                        init=_init_connection
+                    )
+                    logger.info(
+                        f"Database pool opened (size {settings.database_pool_min_size}"
+                        f"-{settings.database_pool_max_size})"
+                    )
+        return self._pool
+
+    async def ping(self):
+        """
+        Run a trivial query, opening the pool if needed.
+
+        Raises:
+            Exception: If PostgreSQL cannot be reached
+        """
+        pool = await self.get_pool()
+        await pool.fetchval("SELECT 1")
+
+    async def fetch_document_paragraphs(self, document_id: str) -> List[Dict[str, Any]]:
         """Fetch all paragraphs for a document"""
-        with self.get_connection() as conn:
-            with conn.cursor() as cur:
-                cur.execute(
-                    """
-                    SELECT id, document_id, index, paragraph_id, text
-                    FROM document_paragraphs
-                    WHERE document_id = %s
-                    ORDER BY index ASC
-                    """,
-                    (document_id,)
-                )
-                results = cur.fetchall()
-                return [dict(row) for row in results]
-
-    def fetch_paragraph_by_id(self, paragraph_db_id: str) -> Dict[str, Any]:
+        pool = await self.get_pool()
+        with timed("postgres"):
+            rows = await pool.fetch(
+                f"""
+                SELECT {PARAGRAPH_COLUMNS}
+                FROM document_paragraphs
+                WHERE document_id = $1
+                ORDER BY index ASC
+                """,
+                document_id
+            )
+        return [dict(row) for row in rows]
+
+    async def fetch_paragraphs_for_documents(self, document_ids: List[str]) -> List[Dict[str, Any]]:
+        """Fetch all paragraphs of many documents in a single query"""
+        if not document_ids:
+            return []
+
+        pool = await self.get_pool()
+        with timed("postgres"):
+            rows = await pool.fetch(
+                f"""
+                SELECT {PARAGRAPH_COLUMNS}
+                FROM document_paragraphs
+                WHERE document_id = ANY($1::text[])
+                ORDER BY document_id ASC, index ASC
+                """,
+                list(document_ids)
+            )
+        return [dict(row) for row in rows]
+
+    async def fetch_paragraph_by_id(self, paragraph_db_id: str) -> Optional[Dict[str, Any]]:
         """Fetch a single paragraph by its database ID"""
-        with self.get_connection() as conn:
-            with conn.cursor() as cur:
-                cur.execute(
-                    """
-                    SELECT id, document_id, index, paragraph_id, text
-                    FROM document_paragraphs
-                    WHERE id = %s
-                    """,
-                    (paragraph_db_id,)
-                )
-                result = cur.fetchone()
-                return dict(result) if result else None
-
-    def fetch_paragraph_by_paragraph_id(
+        paragraphs = await self.fetch_paragraphs_by_ids([paragraph_db_id])
+        return paragraphs.get(paragraph_db_id)
+
+    async def fetch_paragraphs_by_ids(self, paragraph_db_ids: List[str]) -> Dict[str, Dict[str, Any]]:
+        """Fetch many paragraphs by database ID in a single query, keyed by ID"""
+        if not paragraph_db_ids:
+            return {}
+
+        pool = await self.get_pool()
+        with timed("postgres"):
+            rows = await pool.fetch(
+                f"""
+                SELECT {PARAGRAPH_COLUMNS}
+                FROM document_paragraphs
+                WHERE id = ANY($1::text[])
+                """,
+                list(set(paragraph_db_ids))
+            )
+        return {row["id"]: dict(row) for row in rows}
+
+    async def fetch_paragraph_by_paragraph_id(
         self, document_id: str, paragraph_id: str
-    ) -> Dict[str, Any]:
+    ) -> Optional[Dict[str, Any]]:
         """Fetch a paragraph by document_id and paragraph_id (e.g., 'p-0')"""
-        with self.get_connection() as conn:
-            with conn.cursor() as cur:
-                cur.execute(
-                    """
-                    SELECT id, document_id, index, paragraph_id, text
-                    FROM document_paragraphs
-                    WHERE document_id = %s AND paragraph_id = %s
-                    """,
-                    (document_id, paragraph_id)
-                )
-                result = cur.fetchone()
-                return dict(result) if result else None
+        pool = await self.get_pool()
+        with timed("postgres"):
+            row = await pool.fetchrow(
+                f"""
+                SELECT {PARAGRAPH_COLUMNS}
+                FROM document_paragraphs
+                WHERE document_id = $1 AND paragraph_id = $2
+                """,
+                document_id,
+                paragraph_id
+            )
+        return dict(row) if row else None
+
+    async def fetch_project_documents(
+        self, project_id: str, document_ids: Optional[List[str]] = None
+    ) -> List[Dict[str, Any]]:
+        """Fetch the READY documents of a project, optionally restricted to a subset"""
+        pool = await self.get_pool()
+        with timed("postgres"):
+            rows = await pool.fetch(
+                """
+                SELECT id, project_id, title
+                FROM documents
+                WHERE project_id = $1 AND status = 'READY'
+                  AND ($2::text[] IS NULL OR id = ANY($2::text[]))
+                ORDER BY created_at ASC, id ASC
+                """,
+                project_id,
+                list(document_ids) if document_ids is not None else None
+            )
+        return [dict(row) for row in rows]
+
+
+async def _init_connection(conn: asyncpg.Connection):
+    """Decode JSON/JSONB columns to Python objects"""
+    for type_name in ("json", "jsonb"):
+        await conn.set_type_codec(
+            type_name, encoder=json.dumps, decoder=json.loads, schema="pg_catalog"
+        )
 
 
 # Singleton instance
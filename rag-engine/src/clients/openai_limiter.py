@@ -0,0 +1,327 @@
+from openai import APIConnectionError, APITimeoutError, InternalServerError, RateLimitError
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, Optional, TypeVar
+import asyncio
+import logging
+import random
+import threading
+import time
+
+from src.config import settings
+from src.utils.metrics import OPENAI_RETRIES, OPENAI_WAIT_SECONDS
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# Errors worth retrying; RateLimitError additionally pauses the model's budget
+TRANSIENT_ERRORS = (APIConnectionError, APITimeoutError, InternalServerError, RateLimitError)
+
+INTERACTIVE = "interactive"
+BULK = "bulk"
+
+# Priority of OpenAI calls made from the current context (request, job, thread)
+_priority: ContextVar[str] = ContextVar("openai_priority", default=INTERACTIVE)
+
+# Longest single sleep while waiting for budget, so waiters re-check priority and pauses
+_MAX_POLL_SECONDS = 1.0
+
+
+class RateLimitExceeded(Exception):
+    """
+    An OpenAI call could not be made within the rate limits.
+
+    Raised when retries after 429 responses are exhausted, or when an
+    interactive call would wait longer than
+    settings.openai_rate_limit_max_wait_seconds for budget. Callers
+    must treat it as a failed call, never as an empty result.
+    """
+
+
+@dataclass
+class _Bucket:
+    """Token bucket refilled continuously at per_minute / 60 units per second"""
+    per_minute: float
+    level: float = field(init=False)
+    updated: float = field(default_factory=time.monotonic)
+
+    def __post_init__(self):
+        self.level = self.per_minute
+
+    def refill(self, now: float):
+        self.level = min(self.per_minute, self.level + (now - self.updated) * self.per_minute / 60)
+        self.updated = now
+
+    def wait_for(self, amount: float, reserve: float) -> float:
+        """Seconds until amount can be taken while keeping reserve (a fraction of capacity)"""
+        missing = amount + reserve * self.per_minute - self.level
+        return 0.0 if missing <= 0 else missing * 60 / self.per_minute
+
+
+@dataclass
+class _ModelBudget:
+    requests: Optional[_Bucket]
+    tokens: Optional[_Bucket]
+    paused_until: float = 0.0  # Set from retry-after on 429 responses
+    interactive_waiting: int = 0
+
+
+class OpenAIRateLimiter:
+    """
+    Process-wide scheduler for OpenAI calls.
+
+    Enforces requests-per-minute and tokens-per-minute budgets per model with
+    token buckets shared by every thread and event-loop task. Each call
+    reserves one request and its estimated tokens before it is sent; the
+    estimate is corrected with the reported usage afterwards.
+
+    On a 429 the model's budget is paused for the server's retry-after (or an
+    exponential backoff) and drained, so all callers back off together rather
+    than each discovering the limit on its own. Waits are jittered.
+
+    Calls run with a priority taken from the current context (see set_priority()):
+    bulk calls never start while interactive calls are waiting and leave
+    settings.openai_interactive_reserve of each budget to interactive calls.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._budgets: Dict[str, _ModelBudget] = {}
+
+    def configure(self, model: str, rpm: int = 0, tpm: int = 0):
+        """Set the per-minute budgets of a model (0 disables a limit)"""
+        with self._lock:
+            self._budgets[model] = _ModelBudget(
+                requests=_Bucket(rpm) if rpm > 0 else None,
+                tokens=_Bucket(tpm) if tpm > 0 else None
+            )
+
+    def call(
+        self,
+        model: str,
+        tokens: int,
+        request: Callable[[], T],
+        max_retries: int,
+        base_delay: float
+    ) -> T:
+        """
+        Make a blocking OpenAI call within the model's budget, retrying transient errors.
+
+        Args:
+            model: Model whose budget the call uses
+            tokens: Estimated tokens of the call (prompt plus expected completion)
+            request: Performs the call and returns the SDK response
+            max_retries: Retries after the first attempt
+            base_delay: Backoff in seconds, doubled per retry
+
+        Returns:
+            The SDK response
+
+        Raises:
+            RateLimitExceeded: If the call stayed rate limited
+        """
+        for attempt in range(max_retries + 1):
+            self._wait_sync(model, tokens)
+            try:
+                response = request()
+            except TRANSIENT_ERRORS as e:
+                delay = self._on_error(model, e, attempt, max_retries, base_delay)
+                time.sleep(delay)
+                continue
+            self._settle(model, tokens, response)
+            return response
+
+    async def call_async(
+        self,
+        model: str,
+        tokens: int,
+        request: Callable[[], Awaitable[T]],
+        max_retries: int,
+        base_delay: float
+    ) -> T:
+        """Async variant of call; request returns an awaitable"""
+        for attempt in range(max_retries + 1):
+            await self._wait_async(model, tokens)
+            try:
+                response = await request()
+            except TRANSIENT_ERRORS as e:
+                delay = self._on_error(model, e, attempt, max_retries, base_delay)
+                await asyncio.sleep(delay)
+                continue
+            self._settle(model, tokens, response)
+            return response
+
+    def _wait_sync(self, model: str, tokens: int):
+        """Block until the call fits the model's budget"""
+        priority = _priority.get()
+        waited = 0.0
+        marked = False  # Whether this call counts in interactive_waiting
+        try:
+            while True:
+                delay = self._try_acquire(model, tokens, priority, waited, marked)
+                if delay <= 0:
+                    break
+                marked = marked or priority == INTERACTIVE
+                time.sleep(delay)
+                waited += delay
+        finally:
+            self._finish_wait(model, priority, waited, marked)
+
+    async def _wait_async(self, model: str, tokens: int):
+        """Wait (without blocking the event loop) until the call fits the model's budget"""
+        priority = _priority.get()
+        waited = 0.0
+        marked = False  # Whether this call counts in interactive_waiting
+        try:
+            while True:
+                delay = self._try_acquire(model, tokens, priority, waited, marked)
+                if delay <= 0:
+                    break
+                marked = marked or priority == INTERACTIVE
+                await asyncio.sleep(delay)
+                waited += delay
+        finally:
+            self._finish_wait(model, priority, waited, marked)
+
+    def _try_acquire(self, model: str, tokens: int, priority: str, waited: float, marked: bool) -> float:
+        """
+        Take one request and the estimated tokens from the budget.
+
+        An interactive caller that has to wait is counted in interactive_waiting
+        once (marked tells whether it already is) until _finish_wait.
+
+        Returns:
+            0 if the budget was taken, otherwise seconds to sleep before retrying
+
+        Raises:
+            RateLimitExceeded: If the caller has waited too long
+        """
+        with self._lock:
+            budget = self._budgets.get(model)
+            if budget is None:
+                return 0.0
+
+            now = time.monotonic()
+            if budget.paused_until > now:
+                delay = budget.paused_until - now
+            elif priority == BULK and budget.interactive_waiting:
+                delay = _MAX_POLL_SECONDS  # Leave the budget to interactive callers
+            else:
+                reserve = settings.openai_interactive_reserve if priority == BULK else 0.0
+                delay = 0.0
+                if budget.requests:
+                    budget.requests.refill(now)
+                    delay = budget.requests.wait_for(1, reserve)
+                if budget.tokens:
+                    budget.tokens.refill(now)
+                    # Oversized calls only need the usable part of the bucket, or they would wait forever
+                    amount = min(tokens, budget.tokens.per_minute * (1 - reserve))
+                    delay = max(delay, budget.tokens.wait_for(amount, reserve))
+                if delay <= 0:
+                    if budget.requests:
+                        budget.requests.level -= 1
+                    if budget.tokens:
+                        budget.tokens.level -= tokens
+                    return 0.0
+
+            # Bulk callers (background jobs) wait as long as it takes
+            if priority == INTERACTIVE and waited + delay > settings.openai_rate_limit_max_wait_seconds:
+                raise RateLimitExceeded(
+                    f"{model}: no rate limit budget within "
+                    f"{settings.openai_rate_limit_max_wait_seconds:.0f}s"
+                )
+            if priority == INTERACTIVE and not marked:
+                budget.interactive_waiting += 1
+            return min(delay, _MAX_POLL_SECONDS) * random.uniform(1.0, 1.2)
+
+    def _finish_wait(self, model: str, priority: str, waited: float, marked: bool):
+        """
+        Record the wait and release the interactive-waiter mark.
+
+        Runs in a finally block, so the mark is released even when the caller
+        is cancelled during its first sleep (deadline, disconnect, job cancel).
+        """
+        if waited > 0:
+            OPENAI_WAIT_SECONDS.labels(priority).observe(waited)
+        if marked:
+            with self._lock:
+                budget = self._budgets.get(model)
+                if budget is not None:
+                    budget.interactive_waiting -= 1
+
+    def _settle(self, model: str, estimated: int, response: Any):
+        """Correct the token budget with the usage reported by the response"""
+        usage = getattr(response, "usage", None)
+        if usage is None:
+            return
+        with self._lock:
+            budget = self._budgets.get(model)
+            if budget is not None and budget.tokens:
+                budget.tokens.level -= usage.total_tokens - estimated
+
+    def _on_error(
+        self, model: str, error: Exception, attempt: int, max_retries: int, base_delay: float
+    ) -> float:
+        """
+        Handle a failed attempt: pause the model's budget on 429 and compute the retry delay.
+
+        Raises:
+            RateLimitExceeded: If a 429 was the last allowed attempt
+            The original error: If another transient error was the last allowed attempt
+        """
+        rate_limited = isinstance(error, RateLimitError)
+        OPENAI_RETRIES.labels(model, "rate_limit" if rate_limited else "transient").inc()
+        delay = base_delay * (2 ** attempt) * random.uniform(0.5, 1.5)
+
+        if rate_limited:
+            retry_after = _retry_after(error)
+            if retry_after is not None:
+                delay = max(delay, retry_after)
+            with self._lock:
+                budget = self._budgets.get(model)
+                if budget is not None:
+                    budget.paused_until = max(budget.paused_until, time.monotonic() + delay)
+                    # The server disagrees with our accounting: start from an empty budget
+                    for bucket in (budget.requests, budget.tokens):
+                        if bucket:
+                            bucket.level = min(bucket.level, 0.0)
+            if attempt == max_retries:
+                raise RateLimitExceeded(f"{model}: rate limited after {attempt + 1} attempts") from error
+        elif attempt == max_retries:
+            raise error
+
+        logger.warning(
+            f"OpenAI call to {model} failed ({error}), "
+            f"retrying in {delay:.1f}s ({attempt + 1}/{max_retries})"
+        )
+        return delay
+
+
+def _retry_after(error: RateLimitError) -> Optional[float]:
+    """Seconds from the retry-after-ms / retry-after response headers, if present"""
+    headers = getattr(getattr(error, "response", None), "headers", None) or {}
+    try:
+        if headers.get("retry-after-ms"):
+            return float(headers["retry-after-ms"]) / 1000
+        if headers.get("retry-after"):
+            return float(headers["retry-after"])
+    except ValueError:
+        pass  # HTTP-date form: fall back to backoff
+    return None
+
+
+def set_priority(level: str):
+    """
+    Set the priority of OpenAI calls made from the current context.
+
+    Applies to the calling task (or thread) and to tasks and threads it
+    starts afterwards; other requests are unaffected.
+    """
+    _priority.set(level)
+
+
+# Singleton instance
+openai_limiter = OpenAIRateLimiter()
+openai_limiter.configure(settings.llm_model, settings.llm_rpm_limit, settings.llm_tpm_limit)
+openai_limiter.configure(settings.embedding_model, settings.embedding_rpm_limit, settings.embedding_tpm_limit)
@@ -1,38 +1,250 @@
-from qdrant_client import QdrantClient
-from qdrant_client.models import Distance, VectorParams, PointStruct, Filter, FieldCondition, MatchValue
-from typing import List, Dict, Any
+from qdrant_client import AsyncQdrantClient
+from qdrant_client.models import (
+    Distance,
+    VectorParams,
+    FilterSelector,
+    PointStruct,
+    Filter,
+    FieldCondition,
+    MatchValue,
+    SearchRequest,
+    SearchParams,
+    HnswConfigDiff,
+    PayloadSchemaType,
+    QuantizationSearchParams,
+    ScalarQuantization,
+    ScalarQuantizationConfig,
+    ScalarType,
+    ShardingMethod
+)
+from typing import List, Dict, Any, Optional, Sequence, Set, Tuple
+import asyncio
 import logging
+import uuid
 
 from src.config import settings
+from src.clients.registry import http2_enabled, http_limits
+from src.utils.metrics import timed
 
 logger = logging.getLogger(__name__)
 
+# Payload fields used by every search filter
+INDEXED_PAYLOAD_FIELDS = ("project_id", "document_id")
+
+# settings.qdrant_tenancy values
+TENANCY_SHARED = "shared"  # One collection, projects separated by payload filters
+TENANCY_SHARD_KEY = "shard_key"  # One collection with a custom shard per project
+TENANCY_COLLECTION = "collection"  # One collection per project
+
 
 class QdrantClientWrapper:
+    """
+    Async Qdrant client wrapper.
+
+    Built on AsyncQdrantClient, which keeps one HTTP connection pool (or one
+    gRPC channel with QDRANT_PREFER_GRPC) for the whole process, so searches,
+    retrieves and upserts never block the event loop and concurrent requests
+    share connections. Multi-request operations send their batches
+    concurrently. The client is created on first use (not at import), with
+    the shared keep-alive pool limits and HTTP/2 where available.
+
+    With settings.qdrant_tenancy, each project's points live in their own
+    shard ("shard_key") or collection ("collection"), so searches only touch
+    one project's points; the shard or collection is created on first use.
+    Every method takes the project_id to route to it.
+    """
+
     def __init__(self):
-        self.client = QdrantClient(url=settings.qdrant_url)
+        self._client: Optional[AsyncQdrantClient] = None
+        self.initialized = False  # init_collection succeeded
         self.collection_name = settings.qdrant_collection_name
         self.vector_size = settings.embedding_dimension
+        self.tenancy = settings.qdrant_tenancy
+        self._ready_projects: Set[str] = set()
+        self._project_lock = asyncio.Lock()
+
+    @property
+    def client(self) -> AsyncQdrantClient:
+        """The AsyncQdrantClient, created on first use"""
+        if self._client is None:
+            if settings.qdrant_location == ":memory:":
+                self._client = AsyncQdrantClient(location=":memory:")
+            elif settings.qdrant_location:
+                # Any other location would be taken as a URL; local on-disk mode needs path
+                self._client = AsyncQdrantClient(path=settings.qdrant_location)
+            else:
+                self._client = AsyncQdrantClient(
+                    url=settings.qdrant_url,
+                    prefer_grpc=settings.qdrant_prefer_grpc,
+                    grpc_port=settings.qdrant_grpc_port,
+                    timeout=settings.qdrant_timeout,
+                    limits=http_limits(),
+                    http2=http2_enabled()
+                )
+        return self._client
+
+    @client.setter
+    def client(self, client: AsyncQdrantClient):
+        self._client = client
+
+    async def ping(self):
+        """
+        Check that Qdrant answers, initializing the collection if startup could not.
+
+        Raises:
+            Exception: If Qdrant cannot be reached or the collection cannot be initialized
+        """
+        if not self.initialized:
+            await self.init_collection()
+        else:
+            await self.client.get_collections()
 
     async def init_collection(self):
-        """Initialize Qdrant collection if it doesn't exist"""
-        collections = self.client.get_collections().collections
+        """
+        Initialize the Qdrant collection.
+
+        Creates the collection if it doesn't exist, with the configured HNSW
+        parameters, optional int8 scalar quantization and on-disk original
+        vectors. HNSW and quantization settings are also applied to an
+        existing collection; on-disk storage and the vector size can only be
+        chosen at creation. Keyword payload indexes on project_id and
+        document_id are ensured in both cases.
+
+        With "collection" tenancy there is no shared collection: each
+        project's collection is created on first use with the same settings.
+
+        Raises:
+            ValueError: If settings.qdrant_tenancy is unknown, or "shard_key"
+                is used in local mode (no custom sharding)
+        """
+        if self.tenancy not in (TENANCY_SHARED, TENANCY_SHARD_KEY, TENANCY_COLLECTION):
+            raise ValueError(f"Unknown QDRANT_TENANCY: {self.tenancy}")
+        if self.tenancy == TENANCY_SHARD_KEY and settings.qdrant_location:
+            raise ValueError("QDRANT_TENANCY=shard_key needs a Qdrant server; local mode has no shard keys")
+
+        self._ready_projects.clear()
+        if self.tenancy == TENANCY_COLLECTION:
+            logger.info(f"Using one collection per project ({self.collection_name}_<project_id>)")
+            await self.client.get_collections()
+        else:
+            await self._ensure_collection(self.collection_name, sharded=self.tenancy == TENANCY_SHARD_KEY)
+        self.initialized = True
+
+    async def _ensure_collection(self, collection_name: str, sharded: bool = False):
+        """Create or update a collection and its payload indexes (see init_collection)"""
+        collections = (await self.client.get_collections()).collections
         collection_names = [c.name for c in collections]
 
-        if self.collection_name not in collection_names:
-            logger.info(f"Creating Qdrant collection: {self.collection_name}")
-            self.client.create_collection(
-                collection_name=self.collection_name,
+        if collection_name not in collection_names:
+            logger.info(f"Creating Qdrant collection: {collection_name}")
+            await self.client.create_collection(
+                collection_name=collection_name,
                 vectors_config=VectorParams(
                     size=self.vector_size,
-                    distance=Distance.COSINE
-                )
+                    distance=Distance.COSINE,
+                    on_disk=settings.qdrant_on_disk_vectors or None
+                ),
+                sharding_method=ShardingMethod.CUSTOM if sharded else None,
+                hnsw_config=self._hnsw_config(),
+                quantization_config=self._quantization_config()
             )
-            logger.info(f"Collection {self.collection_name} created successfully")
+            logger.info(f"Collection {collection_name} created successfully")
         else:
-            logger.info(f"Collection {self.collection_name} already exists")
+            logger.info(f"Collection {collection_name} already exists")
+            info = await self.client.get_collection(collection_name)
+            existing_size = info.config.params.vectors.size
+            if existing_size != self.vector_size:
+                logger.error(
+                    f"Collection {collection_name} has {existing_size}-dim vectors but "
+                    f"EMBEDDING_DIMENSION is {self.vector_size}; recreate the collection and re-ingest"
+                )
+            if sharded and info.config.params.sharding_method != ShardingMethod.CUSTOM:
+                logger.error(
+                    f"Collection {collection_name} was not created with custom sharding; "
+                    f"delete it and re-ingest to use QDRANT_TENANCY=shard_key"
+                )
+            if self._hnsw_config() or self._quantization_config():
+                await self.client.update_collection(
+                    collection_name=collection_name,
+                    hnsw_config=self._hnsw_config(),
+                    quantization_config=self._quantization_config()
+                )
+
+        if settings.qdrant_payload_indexes and not settings.qdrant_location:
+            # Local mode has no payload indexes
+            for field_name in INDEXED_PAYLOAD_FIELDS:
+                await self.client.create_payload_index(
+                    collection_name=collection_name,
+                    field_name=field_name,
+                    field_schema=PayloadSchemaType.KEYWORD
+                )
+            logger.info(f"Payload indexes ensured on {', '.join(INDEXED_PAYLOAD_FIELDS)}")
+
+    def _collection(self, project_id: str) -> str:
+        """Collection holding a project's points"""
+        if self.tenancy == TENANCY_COLLECTION:
+            return f"{self.collection_name}_{project_id}"
+        return self.collection_name
+
+    def _shard_key(self, project_id: str) -> Optional[str]:
+        """Shard key of a project's points (None unless "shard_key" tenancy)"""
+        return project_id if self.tenancy == TENANCY_SHARD_KEY else None
+
+    async def _ensure_project(self, project_id: str):
+        """Create the project's collection or shard key on first use"""
+        if self.tenancy == TENANCY_SHARED or project_id in self._ready_projects:
+            return
+        async with self._project_lock:
+            if project_id in self._ready_projects:
+                return
+            if self.tenancy == TENANCY_COLLECTION:
+                await self._ensure_collection(self._collection(project_id))
+            else:
+                try:
+                    await self.client.create_shard_key(self.collection_name, shard_key=project_id)
+                    logger.info(f"Created shard key for project {project_id}")
+                except Exception as e:
+                    if "already exists" not in str(e):
+                        raise
+            self._ready_projects.add(project_id)
+
+    def _hnsw_config(self) -> Optional[HnswConfigDiff]:
+        """HNSW parameters from settings (None: Qdrant defaults)"""
+        if settings.qdrant_hnsw_m is None and settings.qdrant_hnsw_ef_construct is None:
+            return None
+        return HnswConfigDiff(m=settings.qdrant_hnsw_m, ef_construct=settings.qdrant_hnsw_ef_construct)
+
+    def _quantization_config(self) -> Optional[ScalarQuantization]:
+        """int8 scalar quantization if enabled"""
+        if settings.qdrant_quantization != "int8":
+            return None
+        return ScalarQuantization(
+            scalar=ScalarQuantizationConfig(
+                type=ScalarType.INT8,
+                quantile=settings.qdrant_quantization_quantile,
+                always_ram=settings.qdrant_quantization_always_ram
+            )
+        )
 
-    def upsert_paragraph_embedding(
+    def _search_params(self) -> Optional[SearchParams]:
+        """Per-search HNSW and quantization parameters (None: Qdrant defaults)"""
+        quantization = None
+        if settings.qdrant_quantization == "int8":
+            # Search the quantized vectors, then rescore the best hits with the originals
+            quantization = QuantizationSearchParams(
+                rescore=True, oversampling=settings.qdrant_quantization_oversampling
+            )
+        if quantization is None and settings.qdrant_search_hnsw_ef is None:
+            return None
+        return SearchParams(hnsw_ef=settings.qdrant_search_hnsw_ef, quantization=quantization)
+
+    async def close(self):
+        """Close the HTTP connection pool / gRPC channel"""
+        if self._client is not None:
+            await self._client.close()
+            self._client = None
+
+    async def upsert_paragraph_embedding(
         self,
         paragraph_db_id: str,
         project_id: str,
@@ -42,23 +254,205 @@ class QdrantClientWrapper:
         embedding: List[float]
     ):
         """Insert or update a paragraph embedding"""
-        point = PointStruct(
-            id=paragraph_db_id,
-            vector=embedding,
-            payload={
-                "project_id": project_id,
-                "document_id": document_id,
-                "paragraph_id": paragraph_id,
-                "paragraph_index": paragraph_index
-            }
+        point = self._build_point(
+            paragraph_db_id, project_id, document_id, paragraph_id, paragraph_index, embedding
+        )
+
+        await self._ensure_project(project_id)
+        with timed("qdrant_upsert"):
+            await self.client.upsert(
+                collection_name=self._collection(project_id),
+                points=[point],
+                shard_key_selector=self._shard_key(project_id)
+            )
+
+    async def upsert_paragraph_embeddings(
+        self,
+        project_id: str,
+        document_id: str,
+        paragraphs: List[Dict[str, Any]],
+        embeddings: List[List[float]],
+        batch_size: Optional[int] = None,
+        wait: Optional[bool] = None,
+        parallel: Optional[int] = None,
+        generation: Optional[str] = None
+    ) -> int:
+        """
+        Insert or update many paragraph embeddings in batched requests.
+
+        Args:
+            project_id: Project the document belongs to
+            document_id: Document the paragraphs belong to
+            paragraphs: Paragraph rows (id, paragraph_id, index)
+            embeddings: Embedding vectors, aligned with paragraphs
+            batch_size: Points per upsert request (default: settings.qdrant_upsert_batch_size)
+            wait: Wait for each batch to be applied (default: settings.qdrant_upsert_wait)
+            parallel: Batches in flight at once (default: settings.qdrant_upsert_parallel)
+            generation: Ingest generation stored with the points (see replace_document_embeddings)
+
+        Returns:
+            Number of upsert requests sent
+        """
+        batch_size = batch_size or settings.qdrant_upsert_batch_size
+        wait = settings.qdrant_upsert_wait if wait is None else wait
+        parallel = parallel or settings.qdrant_upsert_parallel
+
+        points = [
+            self._build_point(
+                paragraph["id"],
+                project_id,
+                document_id,
+                paragraph["paragraph_id"],
+                paragraph["index"],
+                embedding,
+                generation
+            )
+            for paragraph, embedding in zip(paragraphs, embeddings)
+        ]
+        batches = [points[i:i + batch_size] for i in range(0, len(points), batch_size)]
+
+        semaphore = asyncio.Semaphore(max(1, parallel))
+        await self._ensure_project(project_id)
+
+        async def _upsert(batch: List[PointStruct]):
+            async with semaphore:
+                with timed("qdrant_upsert"):
+                    await self.client.upsert(
+                        collection_name=self._collection(project_id),
+                        points=batch,
+                        wait=wait,
+                        shard_key_selector=self._shard_key(project_id)
+                    )
+
+        # gather re-raises the first error from any batch
+        await asyncio.gather(*(_upsert(batch) for batch in batches))
+
+        logger.info(f"Upserted {len(points)} points in {len(batches)} batches (wait={wait})")
+        return len(batches)
+
+    def _build_point(
+        self,
+        paragraph_db_id: str,
+        project_id: str,
+        document_id: str,
+        paragraph_id: str,
+        paragraph_index: int,
+        embedding: List[float],
+        generation: Optional[str] = None
+    ) -> PointStruct:
+        """Build a Qdrant point for a paragraph embedding"""
+        payload = {
+            "project_id": project_id,
+            "document_id": document_id,
+            "paragraph_id": paragraph_id,
+            "paragraph_index": paragraph_index
+        }
+        if generation is not None:
+            payload["ingest_generation"] = generation
+        return PointStruct(id=paragraph_db_id, vector=embedding, payload=payload)
+
+    async def replace_document_embeddings(
+        self,
+        project_id: str,
+        document_id: str,
+        paragraphs: List[Dict[str, Any]],
+        embeddings: List[List[float]]
+    ) -> int:
+        """
+        Replace all of a document's points with a new set.
+
+        The new points are upserted under a fresh ingest generation first, and
+        only then are the document's points from earlier generations (removed
+        or re-created paragraphs) deleted. Searches never see the document
+        without points, and a failed upsert leaves the previous points in place.
+
+        Args:
+            project_id: Project the document belongs to
+            document_id: Document the paragraphs belong to
+            paragraphs: Paragraph rows (id, paragraph_id, index)
+            embeddings: Embedding vectors, aligned with paragraphs
+
+        Returns:
+            Number of stale points deleted
+        """
+        generation = uuid.uuid4().hex
+        await self.upsert_paragraph_embeddings(
+            project_id, document_id, paragraphs, embeddings, generation=generation
+        )
+
+        stale = Filter(
+            must=self._document_filter(project_id, document_id).must,
+            must_not=[FieldCondition(key="ingest_generation", match=MatchValue(value=generation))]
+        )
+        removed = await self._delete_points(project_id, stale)
+        if removed:
+            logger.info(f"Removed {removed} stale points of document {document_id}")
+        return removed
+
+    async def delete_document(self, project_id: str, document_id: str) -> int:
+        """
+        Delete all points of a document.
+
+        Returns:
+            Number of points deleted
+        """
+        removed = await self._delete_points(project_id, self._document_filter(project_id, document_id))
+        logger.info(f"Deleted {removed} points of document {document_id}")
+        return removed
+
+    async def delete_project(self, project_id: str) -> int:
+        """
+        Delete all points of a project.
+
+        Drops the project's collection or shard key with "collection" /
+        "shard_key" tenancy, so the storage is released immediately.
+
+        Returns:
+            Number of points deleted
+        """
+        await self._ensure_project(project_id)
+        project_filter = Filter(
+            must=[FieldCondition(key="project_id", match=MatchValue(value=project_id))]
         )
+        removed = await self._count(project_id, project_filter)
 
-        self.client.upsert(
-            collection_name=self.collection_name,
-            points=[point]
+        if self.tenancy == TENANCY_COLLECTION:
+            await self.client.delete_collection(self._collection(project_id))
+        elif self.tenancy == TENANCY_SHARD_KEY:
+            await self.client.delete_shard_key(self.collection_name, shard_key=project_id)
+        else:
+            await self._delete_points(project_id, project_filter, count=False)
+        self._ready_projects.discard(project_id)
+
+        logger.info(f"Deleted {removed} points of project {project_id}")
+        return removed
+
+    async def _count(self, project_id: str, points_filter: Filter) -> int:
+        """Exact number of a project's points matching a filter"""
+        result = await self.client.count(
+            collection_name=self._collection(project_id),
+            count_filter=points_filter,
+            exact=True,
+            shard_key_selector=self._shard_key(project_id)
         )
+        return result.count
 
-    def query_similar_paragraphs(
+    async def _delete_points(self, project_id: str, points_filter: Filter, count: bool = True) -> int:
+        """Delete a project's points matching a filter, returning how many there were"""
+        await self._ensure_project(project_id)
+        removed = await self._count(project_id, points_filter) if count else 0
+        if count and not removed:
+            return 0
+        with timed("qdrant_delete"):
+            await self.client.delete(
+                collection_name=self._collection(project_id),
+                points_selector=FilterSelector(filter=points_filter),
+                wait=True,
+                shard_key_selector=self._shard_key(project_id)
+            )
+        return removed
+
+    async def query_similar_paragraphs(
         self,
         project_id: str,
         query_embedding: List[float],
@@ -66,8 +460,152 @@ class QdrantClientWrapper:
         top_k: int = 5
     ) -> List[Dict[str, Any]]:
         """Find similar paragraphs in a specific document"""
-        # Filter by project_id and target_document_id
-        query_filter = Filter(
+        await self._ensure_project(project_id)
+        with timed("qdrant_search"):
+            results = await self.client.search(
+                collection_name=self._collection(project_id),
+                query_vector=query_embedding,
+                query_filter=self._document_filter(project_id, target_document_id),
+                search_params=self._search_params(),
+                limit=top_k,
+                shard_key_selector=self._shard_key(project_id)
+            )
+
+        return [
+            {
+                "id": result.id,
+                "score": result.score,
+                "payload": result.payload
+            }
+            for result in results
+        ]
+
+    async def query_similar_paragraphs_batch(
+        self,
+        project_id: str,
+        queries: Sequence[Tuple[List[float], str]],
+        top_k: int = 5,
+        batch_size: Optional[int] = None
+    ) -> List[List[Dict[str, Any]]]:
+        """
+        Run many similarity searches with Qdrant's batch search API.
+
+        Up to settings.qdrant_search_parallel batch requests are in flight at once.
+
+        Args:
+            project_id: Project to search in
+            queries: (query embedding, target document id) tuples
+            top_k: Hits per query
+            batch_size: Searches per request (default: settings.qdrant_search_batch_size)
+
+        Returns:
+            One hit list per query, in input order
+        """
+        batch_size = batch_size or settings.qdrant_search_batch_size
+        search_params = self._search_params()
+        semaphore = asyncio.Semaphore(max(1, settings.qdrant_search_parallel))
+        await self._ensure_project(project_id)
+
+        async def _search(batch: Sequence[Tuple[List[float], str]]) -> List[List[Dict[str, Any]]]:
+            requests = [
+                SearchRequest(
+                    vector=embedding,
+                    filter=self._document_filter(project_id, target_document_id),
+                    params=search_params,
+                    limit=top_k,
+                    with_payload=True,
+                    shard_key=self._shard_key(project_id)
+                )
+                for embedding, target_document_id in batch
+            ]
+            async with semaphore:
+                with timed("qdrant_search"):
+                    batch_results = await self.client.search_batch(
+                        collection_name=self._collection(project_id),
+                        requests=requests
+                    )
+            return [
+                [
+                    {"id": result.id, "score": result.score, "payload": result.payload}
+                    for result in results
+                ]
+                for results in batch_results
+            ]
+
+        batches = await asyncio.gather(*(
+            _search(queries[start:start + batch_size])
+            for start in range(0, len(queries), batch_size)
+        ))
+        return [results for batch in batches for results in batch]
+
+    async def get_embeddings_by_ids(
+        self, project_id: str, paragraph_db_ids: Sequence[str], batch_size: Optional[int] = None
+    ) -> Dict[str, List[float]]:
+        """Retrieve the embedding vectors for many of a project's paragraphs, keyed by point id"""
+        batch_size = batch_size or settings.qdrant_retrieve_batch_size
+        semaphore = asyncio.Semaphore(max(1, settings.qdrant_search_parallel))
+        await self._ensure_project(project_id)
+
+        async def _retrieve(ids: List[str]):
+            async with semaphore:
+                with timed("qdrant_retrieve"):
+                    return await self.client.retrieve(
+                        collection_name=self._collection(project_id),
+                        ids=ids,
+                        with_payload=False,
+                        with_vectors=True,
+                        shard_key_selector=self._shard_key(project_id)
+                    )
+
+        batches = await asyncio.gather(*(
+            _retrieve(list(paragraph_db_ids[start:start + batch_size]))
+            for start in range(0, len(paragraph_db_ids), batch_size)
+        ))
+        return {str(result.id): result.vector for results in batches for result in results}
+
+    async def get_project_embeddings(
+        self, project_id: str, exclude_document_id: Optional[str] = None, batch_size: Optional[int] = None
+    ) -> List[Tuple[str, str, List[float]]]:
+        """
+        Scroll through all of a project's points with their vectors.
+
+        Args:
+            project_id: Project to read
+            exclude_document_id: Skip the points of this document
+            batch_size: Points per scroll request (default: settings.qdrant_retrieve_batch_size)
+
+        Returns:
+            (point id, document_id, vector) per point
+        """
+        batch_size = batch_size or settings.qdrant_retrieve_batch_size
+        await self._ensure_project(project_id)
+        points_filter = Filter(
+            must=[FieldCondition(key="project_id", match=MatchValue(value=project_id))],
+            must_not=[
+                FieldCondition(key="document_id", match=MatchValue(value=exclude_document_id))
+            ] if exclude_document_id else None
+        )
+
+        points = []
+        offset = None
+        while True:
+            with timed("qdrant_retrieve"):
+                results, offset = await self.client.scroll(
+                    collection_name=self._collection(project_id),
+                    scroll_filter=points_filter,
+                    limit=batch_size,
+                    offset=offset,
+                    with_payload=["document_id"],
+                    with_vectors=True,
+                    shard_key_selector=self._shard_key(project_id)
+                )
+            points.extend((str(result.id), result.payload["document_id"], result.vector) for result in results)
+            if offset is None:
+                return points
+
+    def _document_filter(self, project_id: str, document_id: str) -> Filter:
+        """Filter by project_id and document_id"""
+        return Filter(
             must=[
                 FieldCondition(
                     key="project_id",
@@ -75,34 +613,21 @@ class QdrantClientWrapper:
                 ),
                 FieldCondition(
                     key="document_id",
-                    match=MatchValue(value=target_document_id)
+                    match=MatchValue(value=document_id)
                 )
             ]
         )
 
-        results = self.client.search(
-            collection_name=self.collection_name,
-            query_vector=query_embedding,
-            query_filter=query_filter,
-            limit=top_k
-        )
-
-        return [
-            {
-                "id": result.id,
-                "score": result.score,
-                "payload": result.payload
-            }
-            for result in results
-        ]
-
-    def get_embedding_by_id(self, paragraph_db_id: str) -> List[float]:
+    async def get_embedding_by_id(self, project_id: str, paragraph_db_id: str) -> List[float]:
         """Retrieve the embedding vector for a paragraph"""
-        results = self.client.retrieve(
-            collection_name=self.collection_name,
-            ids=[paragraph_db_id],
-            with_vectors=True
-        )
+        await self._ensure_project(project_id)
+        with timed("qdrant_retrieve"):
+            results = await self.client.retrieve(
+                collection_name=self._collection(project_id),
+                ids=[paragraph_db_id],
+                with_vectors=True,
+                shard_key_selector=self._shard_key(project_id)
+            )
 
         if results:
             return results[0].vector
@@ -0,0 +1,126 @@
+from openai import OpenAI, AsyncOpenAI
+from typing import Optional
+import asyncio
+import importlib.util
+import logging
+import threading
+
+import httpx
+
+from src.config import settings
+
+logger = logging.getLogger(__name__)
+
+# HTTP/2 needs the optional h2 package
+HTTP2_AVAILABLE = importlib.util.find_spec("h2") is not None
+
+
+def http2_enabled() -> bool:
+    """Whether HTTP connection pools negotiate HTTP/2"""
+    return settings.http2_enabled and HTTP2_AVAILABLE
+
+
+def http_limits() -> httpx.Limits:
+    """Connection pool limits shared by all HTTP clients (keep-alive tuned by settings)"""
+    return httpx.Limits(
+        max_connections=settings.http_max_connections,
+        max_keepalive_connections=settings.http_max_keepalive_connections,
+        keepalive_expiry=settings.http_keepalive_expiry_seconds
+    )
+
+
+class ClientRegistry:
+    """
+    Lazily built OpenAI clients, shared by the whole process.
+
+    Importing a module no longer creates clients: the sync client (used by
+    embedding calls in worker threads) and the async client (used by LLM
+    calls) are built on first use, each on one tuned httpx connection pool
+    with keep-alive, and HTTP/2 when the h2 package is installed. Retries are
+    handled by openai_limiter, so the clients never retry on their own.
+    """
+
+    def __init__(self):
+        self._openai: Optional[OpenAI] = None
+        self._async_openai: Optional[AsyncOpenAI] = None
+        self._lock = threading.Lock()
+
+    @property
+    def openai(self) -> OpenAI:
+        """Sync OpenAI client, built on first use"""
+        if self._openai is None:
+            with self._lock:
+                if self._openai is None:
+                    self._openai = OpenAI(
+                        api_key=settings.openai_api_key,
+                        base_url=settings.openai_base_url,
+                        max_retries=0,
+                        http_client=httpx.Client(
+                            limits=http_limits(),
+                            http2=http2_enabled(),
+                            timeout=settings.openai_timeout
+                        )
+                    )
+                    logger.info(f"OpenAI client created (http2={http2_enabled()})")
+        return self._openai
+
+    @openai.setter
+    def openai(self, client: OpenAI):
+        self._openai = client
+
+    @property
+    def async_openai(self) -> AsyncOpenAI:
+        """Async OpenAI client, built on first use"""
+        if self._async_openai is None:
+            with self._lock:
+                if self._async_openai is None:
+                    self._async_openai = AsyncOpenAI(
+                        api_key=settings.openai_api_key,
+                        base_url=settings.openai_base_url,
+                        max_retries=0,
+                        http_client=httpx.AsyncClient(
+                            limits=http_limits(),
+                            http2=http2_enabled(),
+                            timeout=settings.openai_timeout
+                        )
+                    )
+                    logger.info(f"Async OpenAI client created (http2={http2_enabled()})")
+        return self._async_openai
+
+    @async_openai.setter
+    def async_openai(self, client: AsyncOpenAI):
+        self._async_openai = client
+
+    async def ping_openai(self):
+        """
+        List the models through the async client (no tokens are used).
+
+        Raises:
+            Exception: If the OpenAI API cannot be reached
+        """
+        await self.async_openai.models.list()
+
+    async def warm_up(self):
+        """
+        Build both clients and open their connections (TLS handshake, HTTP/2 session).
+
+        Raises:
+            Exception: If the OpenAI API cannot be reached
+        """
+        await asyncio.gather(
+            self.ping_openai(),
+            asyncio.to_thread(self.openai.models.list)
+        )
+
+    async def close(self):
+        """Close the connection pools of the clients built so far"""
+        if self._async_openai is not None:
+            await self._async_openai.close()
+            self._async_openai = None
+        if self._openai is not None:
+            self._openai.close()
+            self._openai = None
+
+
+# Singleton instance
+clients = ClientRegistry()
@@ -5,19 +5,137 @@ from typing import Optional
 class Settings(BaseSettings):
     # OpenAI
     openai_api_key: str
+    openai_base_url: Optional[str] = None  # OpenAI-compatible endpoint (default: api.openai.com)
+    openai_timeout: float = 600.0  # Seconds per request
+
+    # HTTP connection pools (OpenAI clients and Qdrant REST), shared per process
+    http_max_connections: int = 100
+    http_max_keepalive_connections: int = 20  # Idle connections kept open for reuse
+    http_keepalive_expiry_seconds: float = 30.0
+    http2_enabled: bool = True  # Negotiate HTTP/2 when the h2 package is installed
+
+    # Startup and readiness
+    startup_warmup: bool = False  # Open PostgreSQL, Qdrant and OpenAI connections before serving
+    readiness_timeout_seconds: float = 5.0  # Per dependency check in /ready
+    readiness_check_openai: bool = True  # Include the OpenAI API in /ready
 
     # Database
     database_url: str
+    database_pool_min_size: int = 2
+    database_pool_max_size: int = 10
 
     # Qdrant
     qdrant_url: str = "http://qdrant:6333"
+    qdrant_location: Optional[str] = None  # Local mode instead of qdrant_url: ":memory:" or a storage directory
     qdrant_collection_name: str = "paragraph_embeddings"
+    qdrant_tenancy: str = "shared"  # "shared", "shard_key" (custom shard per project) or "collection" (per project)
+    qdrant_prefer_grpc: bool = False  # Use the gRPC transport (port qdrant_grpc_port) instead of REST
+    qdrant_grpc_port: int = 6334
+    qdrant_timeout: int = 30  # Seconds per request
+    qdrant_upsert_batch_size: int = 256  # Points per upsert request
+    qdrant_upsert_parallel: int = 2  # Upsert requests in flight per ingest
+    qdrant_upsert_wait: bool = True  # Wait until each batch is applied
+    qdrant_search_batch_size: int = 256  # Searches per search_batch request
+    qdrant_retrieve_batch_size: int = 1000  # Point ids per retrieve request
+    qdrant_search_parallel: int = 4  # Search/retrieve batch requests in flight per operation
+    qdrant_payload_indexes: bool = True  # Keyword indexes on project_id and document_id
+    qdrant_quantization: Optional[str] = None  # "int8" scalar quantization (None: full float32 vectors only)
+    qdrant_quantization_quantile: float = 0.99
+    qdrant_quantization_always_ram: bool = True  # Keep quantized vectors in RAM
+    qdrant_quantization_oversampling: float = 2.0  # Candidates fetched per hit before rescoring
+    qdrant_on_disk_vectors: bool = False  # Keep original vectors on disk (memmap); set at creation only
+    qdrant_hnsw_m: Optional[int] = None  # HNSW edges per node (Qdrant default: 16)
+    qdrant_hnsw_ef_construct: Optional[int] = None  # HNSW build beam width (Qdrant default: 100)
+    qdrant_search_hnsw_ef: Optional[int] = None  # HNSW search beam width (Qdrant default: ef_construct)
 
     # Models
     embedding_model: str = "text-embedding-3-small"
-    embedding_dimension: int = 1536
+    embedding_dimension: int = 1536  # Sent as "dimensions" to text-embedding-3 models (e.g. 512 or 256)
     llm_model: str = "gpt-4"
 
+    # Embedding batching
+    embedding_batch_max_items: int = 512  # Inputs per embeddings request (API limit: 2048)
+    embedding_batch_max_tokens: int = 100_000  # Estimated tokens per embeddings request
+    embedding_concurrency: int = 4  # Sub-batches in flight per ingest
+    embedding_max_retries: int = 4
+    embedding_retry_base_delay: float = 1.0  # Seconds, doubled per retry
+
+    # Embedding cache (persistent, in PostgreSQL)
+    embedding_cache_enabled: bool = True
+
+    # Candidate selection
+    # "qdrant" (vector search), "matrix" (in-process NumPy), "cluster" (k-means) or "precomputed" (ingest-time edges)
+    candidate_engine: str = "qdrant"
+    candidate_min_score: float = 0.0  # Minimum cosine score for a pair to reach the LLM
+    candidate_max_per_target: Optional[int] = None  # Max sources paired with one target paragraph
+    candidate_cluster_size: int = 64  # Paragraphs per cluster ("cluster" engine)
+    candidate_cluster_branching: int = 8  # Children per k-means split
+    candidate_cluster_probes: int = 2  # Final clusters each paragraph joins (covers cluster boundaries)
+    candidate_cluster_iterations: int = 10  # k-means iterations per split
+
+    # Candidate graph: nearest-neighbour edges computed at ingest ("precomputed" engine)
+    candidate_graph_enabled: bool = False  # Compute edges in /embeddings/ingest-document
+    candidate_graph_top_k: int = 3  # Neighbours stored per paragraph and other document (max usable top_k)
+    candidate_graph_max_neighbors: Optional[int] = None  # Max edges per paragraph, closest kept (None = no cap)
+
+    # LLM concurrency
+    llm_max_concurrency: int = 16  # In-flight LLM calls per process
+    llm_request_concurrency: int = 8  # Default in-flight LLM calls per request
+    llm_max_retries: int = 4
+    llm_retry_base_delay: float = 1.0  # Seconds, doubled per retry
+    llm_completion_token_estimate: int = 300  # Expected completion tokens per pair (rate limit accounting)
+
+    # Pre-LLM filtering
+    duplicate_shortcut_enabled: bool = True  # Resolve duplicate pairs as consistent without an LLM call
+    duplicate_min_score: float = 0.98  # Cosine from which pairs with the same numbers/names are duplicates
+    llm_paragraph_max_tokens: int = 1500  # Longer paragraphs are windowed to this many tokens (0 = never)
+
+    # OpenAI rate limits per model, shared by the whole process (0 = unlimited)
+    llm_rpm_limit: int = 0
+    llm_tpm_limit: int = 0
+    embedding_rpm_limit: int = 0
+    embedding_tpm_limit: int = 0
+    openai_interactive_reserve: float = 0.2  # Budget fraction background jobs leave to interactive requests
+    openai_rate_limit_max_wait_seconds: float = 120.0  # Interactive calls fail with a rate limit error after this
+
+    # Default budget of synchronous analysis requests (None = unlimited; jobs only use request values)
+    analysis_deadline_seconds: Optional[float] = None  # Wall-clock limit per request
+    analysis_max_llm_calls: Optional[int] = None
+    analysis_max_tokens: Optional[int] = None  # Prompt plus completion tokens
+
+    # Streaming analysis
+    stream_progress_interval_seconds: float = 2.0  # Max seconds between progress frames
+
+    # Incremental analysis ledger
+    analysis_ledger_enabled: bool = True
+
+    # Background analysis jobs
+    analysis_job_checkpoint_batch_size: int = 100  # Verdicts per checkpoint write
+    analysis_job_checkpoint_interval_seconds: float = 2.0  # Max seconds between checkpoint writes
+    analysis_jobs_resume_on_startup: bool = True  # Restart jobs interrupted by a shutdown or crash
+    analysis_jobs_single_replica: bool = False  # Only one replica: take over every active job at startup without waiting for it to go stale
+
+    # Distributed analysis jobs (PostgreSQL work queue)
+    analysis_jobs_distributed: bool = False  # Default for new jobs: analyze pairs on worker replicas
+    analysis_worker_enabled: bool = False  # Run workers in this replica (and take over stale jobs)
+    analysis_worker_concurrency: int = 2  # Work items analyzed at once per replica
+    analysis_work_item_size: int = 20  # Candidate pairs per work item
+    analysis_lease_seconds: float = 60.0  # Work item lease; expired items are claimed by another worker
+    analysis_heartbeat_interval_seconds: float = 15.0  # Lease renewal and job heartbeat interval
+    analysis_work_item_max_attempts: int = 3  # Claims of a work item before it is marked failed
+    analysis_worker_poll_interval_seconds: float = 1.0  # Idle wait between claims when the queue is empty
+    analysis_job_stale_seconds: float = 120.0  # Job heartbeat age after which another replica takes the job over
+
+    # Packed prompts (several pairs per LLM request; 1 disables packing)
+    llm_pack_size: int = 1
+    llm_pack_max_tokens: int = 6000  # Estimated passage tokens per packed request
+
+    # Verdict cache (persistent, in PostgreSQL)
+    verdict_cache_enabled: bool = True
+    verdict_cache_ttl_seconds: int = 30 * 24 * 3600
+    verdict_cache_max_entries: int = 500_000
+    verdict_cache_eviction_interval: int = 1000  # Writes between eviction passes
+
     # Server
     port: int = 8000
     log_level: str = "INFO"
@@ -0,0 +1,81 @@
+from typing import Dict, List
+import logging
+
+from src.config import settings
+from src.clients.database import db_client
+from src.utils.metrics import timed
+
+logger = logging.getLogger(__name__)
+
+
+class EmbeddingCache:
+    """
+    Persistent embedding cache stored in PostgreSQL.
+
+    Entries are keyed by (embedding model, dimension, normalized text hash),
+    so a paragraph is embedded once no matter how often it is re-uploaded or
+    repeated across documents.
+    """
+
+    def __init__(self):
+        self.enabled = settings.embedding_cache_enabled
+        self.model = settings.embedding_model
+        self.dimension = settings.embedding_dimension
+
+    async def ensure_schema(self):
+        """Create the cache table if it doesn't exist"""
+        pool = await db_client.get_pool()
+        await pool.execute(
+            """
+            CREATE TABLE IF NOT EXISTS embedding_cache (
+                embedding_model TEXT NOT NULL,
+                dimension INTEGER NOT NULL,
+                text_hash TEXT NOT NULL,
+                embedding REAL[] NOT NULL,
+                created_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+                PRIMARY KEY (embedding_model, dimension, text_hash)
+            )
+            """
+        )
+
+    async def get_many(self, text_hashes: List[str]) -> Dict[str, List[float]]:
+        """Fetch cached embeddings for many text hashes in a single query"""
+        if not text_hashes:
+            return {}
+
+        pool = await db_client.get_pool()
+        with timed("postgres"):
+            rows = await pool.fetch(
+                """
+                SELECT text_hash, embedding
+                FROM embedding_cache
+                WHERE embedding_model = $1 AND dimension = $2
+                  AND text_hash = ANY($3::text[])
+                """,
+                self.model,
+                self.dimension,
+                list(set(text_hashes))
+            )
+        return {row["text_hash"]: list(row["embedding"]) for row in rows}
+
+    async def put_many(self, embeddings: Dict[str, List[float]]):
+        """Store embeddings keyed by text hash"""
+        if not embeddings:
+            return
+
+        pool = await db_client.get_pool()
+        await pool.executemany(
+            """
+            INSERT INTO embedding_cache (embedding_model, dimension, text_hash, embedding)
+            VALUES ($1, $2, $3, $4)
+            ON CONFLICT (embedding_model, dimension, text_hash) DO NOTHING
+            """,
+            [
+                (self.model, self.dimension, text_hash, embedding)
+                for text_hash, embedding in embeddings.items()
+            ]
+        )
+
+
+# Singleton instance
+embedding_cache = EmbeddingCache()
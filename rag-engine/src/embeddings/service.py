@@ -1,13 +1,20 @@
-from openai import OpenAI
-from typing import List
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Tuple, Union
+import asyncio
+import contextvars
 import logging
 
 from src.config import settings
+from src.clients.openai_limiter import openai_limiter
+from src.clients.registry import clients
+from src.embeddings.cache import embedding_cache
+from src.utils.metrics import CACHE_LOOKUPS, OPENAI_REQUESTS_IN_FLIGHT, OPENAI_TOKENS, timed
+from src.utils.text import estimate_tokens, text_hash
 
 logger = logging.getLogger(__name__)
 
-# Initialize OpenAI client
-client = OpenAI(api_key=settings.openai_api_key)
+# Models accepting the "dimensions" parameter (shortened embeddings)
+DIMENSIONS_MODEL_PREFIXES = ("text-embedding-3",)
 
 
 def generate_embedding(text: str) -> List[float]:
@@ -24,9 +31,12 @@ def generate_embedding(text: str) -> List[float]:
         A list of floats representing the embedding vector
     """
     try:
-        response = client.embeddings.create(
-            model=settings.embedding_model,
-            input=text
+        response = openai_limiter.call(
+            settings.embedding_model,
+            estimate_tokens(text),
+            lambda: _create_embeddings(text),
+            settings.embedding_max_retries,
+            settings.embedding_retry_base_delay
         )
         embedding = response.data[0].embedding
         logger.debug(f"Generated embedding for text (length: {len(text)})")
@@ -38,8 +48,14 @@ def generate_embedding(text: str) -> List[float]:
 
 def generate_embeddings_batch(texts: List[str]) -> List[List[float]]:
     """
-    Generate embeddings for multiple texts in a single API call.
-    More efficient for batch processing.
+    Generate embeddings for multiple texts.
+
+    The texts are split into sub-batches bounded by
+    settings.embedding_batch_max_items and an estimated token budget of
+    settings.embedding_batch_max_tokens. Sub-batches run concurrently (up to
+    settings.embedding_concurrency) within the process-wide embedding rate
+    limits, are retried individually on transient errors, and are
+    reassembled in input order.
 
     Args:
         texts: List of texts to embed
@@ -47,14 +63,116 @@ def generate_embeddings_batch(texts: List[str]) -> List[List[float]]:
     Returns:
         List of embedding vectors
     """
+    if not texts:
+        return []
+
+    batches = _split_batches(texts)
+
     try:
-        response = client.embeddings.create(
-            model=settings.embedding_model,
-            input=texts
-        )
-        embeddings = [item.embedding for item in response.data]
-        logger.info(f"Generated {len(embeddings)} embeddings in batch")
+        workers = max(1, min(settings.embedding_concurrency, len(batches)))
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            # Each worker call runs in a copy of the caller's context (request timings)
+            futures = [
+                executor.submit(contextvars.copy_context().run, _embed_sub_batch, batch)
+                for batch in batches
+            ]
+            results = [future.result() for future in futures]
+        embeddings = [embedding for batch in results for embedding in batch]
+        logger.info(f"Generated {len(embeddings)} embeddings in {len(batches)} sub-batches")
         return embeddings
     except Exception as e:
         logger.error(f"Failed to generate batch embeddings: {e}")
         raise
+
+
+def _split_batches(texts: List[str]) -> List[List[str]]:
+    """Split texts into consecutive sub-batches within the item and token limits"""
+    batches: List[List[str]] = []
+    current: List[str] = []
+    current_tokens = 0
+
+    for text in texts:
+        tokens = estimate_tokens(text)
+        if current and (
+            len(current) >= settings.embedding_batch_max_items
+            or current_tokens + tokens > settings.embedding_batch_max_tokens
+        ):
+            batches.append(current)
+            current, current_tokens = [], 0
+        current.append(text)
+        current_tokens += tokens
+
+    if current:
+        batches.append(current)
+    return batches
+
+
+def _embed_sub_batch(texts: List[str]) -> List[List[float]]:
+    """Embed one sub-batch within the rate limits, retrying transient failures"""
+    def _request():
+        with timed("embedding"), OPENAI_REQUESTS_IN_FLIGHT.labels("embedding").track_inprogress():
+            return _create_embeddings(texts)
+
+    response = openai_limiter.call(
+        settings.embedding_model,
+        sum(estimate_tokens(text) for text in texts),
+        _request,
+        settings.embedding_max_retries,
+        settings.embedding_retry_base_delay
+    )
+    if response.usage:
+        OPENAI_TOKENS.labels(settings.embedding_model, "prompt").inc(response.usage.prompt_tokens)
+    return [item.embedding for item in response.data]
+
+
+def _create_embeddings(texts: Union[str, List[str]]):
+    """Call the embeddings API, requesting settings.embedding_dimension where supported"""
+    kwargs = {}
+    if settings.embedding_model.startswith(DIMENSIONS_MODEL_PREFIXES):
+        kwargs["dimensions"] = settings.embedding_dimension
+    return clients.openai.embeddings.create(model=settings.embedding_model, input=texts, **kwargs)
+
+
+async def generate_embeddings_cached(texts: List[str]) -> Tuple[List[List[float]], int]:
+    """
+    Generate embeddings for multiple texts, reusing cached vectors.
+
+    Texts are deduplicated by normalized content hash; only hashes that are
+    neither cached nor repeated earlier in the batch are sent to the
+    embedding API, and the new vectors are written back to the cache.
+
+    Args:
+        texts: List of texts to embed
+
+    Returns:
+        Tuple of (embedding vectors in input order, number of texts embedded via the API)
+    """
+    hashes = [text_hash(text) for text in texts]
+
+    cached = {}
+    if embedding_cache.enabled:
+        try:
+            cached = await embedding_cache.get_many(hashes)
+        except Exception as e:
+            logger.warning(f"Embedding cache lookup failed: {e}")
+
+    # First text for each uncached hash
+    missing = {}
+    for text, hash_ in zip(texts, hashes):
+        if hash_ not in cached and hash_ not in missing:
+            missing[hash_] = text
+
+    if missing:
+        generated = await asyncio.to_thread(generate_embeddings_batch, list(missing.values()))
+        computed = dict(zip(missing.keys(), generated))
+        if embedding_cache.enabled:
+            try:
+                await embedding_cache.put_many(computed)
+            except Exception as e:
+                logger.warning(f"Embedding cache write failed: {e}")
+        cached.update(computed)
+
+    CACHE_LOOKUPS.labels("embedding", "hit").inc(len(texts) - len(missing))
+    CACHE_LOOKUPS.labels("embedding", "miss").inc(len(missing))
+    logger.info(f"Embeddings: {len(texts) - len(missing)} reused, {len(missing)} computed")
+    return [cached[hash_] for hash_ in hashes], len(missing)
@@ -1,11 +1,24 @@
-from fastapi import FastAPI
+from fastapi import FastAPI, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
+from prometheus_client import CONTENT_TYPE_LATEST, generate_latest
+from typing import Any, Awaitable, Callable, Dict
+import asyncio
 import logging
+import time
 from contextlib import asynccontextmanager
 
 from src.config import settings
-from src.routes import embeddings, consistency
-from src.clients.qdrant_client import init_qdrant_collection
+from src.routes import embeddings, consistency, jobs
+from src.clients.qdrant_client import init_qdrant_collection, qdrant_client
+from src.clients.database import db_client
+from src.clients.registry import clients
+from src.analysis.verdict_cache import verdict_cache
+from src.embeddings.cache import embedding_cache
+from src.analysis.jobs import job_store
+from src.analysis.work_queue import work_queue
+from src.analysis.ledger import analysis_ledger
+from src.analysis.candidate_graph import candidate_graph
+from src.utils.metrics import HTTP_REQUEST_SECONDS, HTTP_REQUESTS_IN_FLIGHT
 
 # Configure logging
 logging.basicConfig(
@@ -21,17 +34,58 @@ async def lifespan(app: FastAPI):
     # Startup
     logger.info("Starting RAG-Engine...")
 
-    # Initialize Qdrant collection
+    # Initialize the Qdrant collection and open the database pool concurrently.
+    # Failures are logged, not fatal: /ready reports them (and retries the Qdrant setup)
+    await asyncio.gather(
+        _startup_step("Qdrant collection", init_qdrant_collection),
+        _startup_step("Database pool", db_client.connect)
+    )
+
+    # Initialize the tables of the caches, ledger and candidate graph (the
+    # candidate graph is also used by the "precomputed" engine when ingest doesn't fill it)
+    schema_steps = [("Candidate graph", candidate_graph.ensure_schema)]
+    if embedding_cache.enabled:
+        schema_steps.append(("Embedding cache", embedding_cache.ensure_schema))
+    if verdict_cache.enabled:
+        schema_steps.append(("Verdict cache", verdict_cache.ensure_schema))
+    if analysis_ledger.enabled:
+        schema_steps.append(("Analysis ledger", analysis_ledger.ensure_schema))
+    await asyncio.gather(*(_startup_step(name, step) for name, step in schema_steps))
+
+    # Open the OpenAI connections before the first request
+    if settings.startup_warmup:
+        await _startup_step("OpenAI connections", clients.warm_up)
+
+    # Initialize job tables and pick up jobs interrupted by a previous process
     try:
-        await init_qdrant_collection()
-        logger.info("Qdrant collection initialized")
+        await job_store.ensure_schema()
+        await work_queue.ensure_schema()
+        await jobs.resume_interrupted_jobs()
+        jobs.start_takeover()
+        if work_queue.enabled:
+            jobs.start_workers()
+        logger.info("Analysis jobs initialized")
     except Exception as e:
-        logger.error(f"Failed to initialize Qdrant collection: {e}")
+        logger.error(f"Failed to initialize analysis jobs: {e}")
 
     yield
 
     # Shutdown
     logger.info("Shutting down RAG-Engine...")
+    await work_queue.shutdown()
+    await job_store.shutdown()
+    await db_client.close()
+    await qdrant_client.close()
+    await clients.close()
+
+
+async def _startup_step(name: str, step: Callable[[], Awaitable[Any]]):
+    """Run one startup step, logging (not raising) failures"""
+    try:
+        await step()
+        logger.info(f"{name} initialized")
+    except Exception as e:
+        logger.error(f"Failed to initialize {name}: {e}")
 
 
 app = FastAPI(
@@ -50,6 +104,31 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Request metrics
+@app.middleware("http")
+async def record_request_metrics(request: Request, call_next):
+    if request.url.path == "/metrics":
+        return await call_next(request)
+
+    started = time.perf_counter()
+    status = 500
+    with HTTP_REQUESTS_IN_FLIGHT.track_inprogress():
+        try:
+            response = await call_next(request)
+            status = response.status_code
+            return response
+        finally:
+            # Label by endpoint function (bounded cardinality, unlike raw paths with IDs)
+            endpoint = request.scope.get("endpoint")
+            HTTP_REQUEST_SECONDS.labels(
+                getattr(endpoint, "__name__", "unmatched"), str(status)
+            ).observe(time.perf_counter() - started)
+
+# Prometheus metrics
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    return Response(generate_latest(), media_type=CONTENT_TYPE_LATEST)
+
 # Health check
 @app.get("/health")
 async def health_check():
@@ -57,12 +136,54 @@ async def health_check():
         "status": "ok",
         "service": "rag-engine",
         "embedding_model": settings.embedding_model,
-        "llm_model": settings.llm_model
+        "llm_model": settings.llm_model,
+        "verdict_cache": verdict_cache.stats()
     }
 
+# Readiness check
+@app.get("/ready")
+async def readiness_check(response: Response):
+    """
+    Check that PostgreSQL, Qdrant and (with READINESS_CHECK_OPENAI) the OpenAI API are reachable.
+
+    Returns 503 if any dependency fails or takes longer than
+    READINESS_TIMEOUT_SECONDS; each dependency reports ok, latency_ms and error.
+    """
+    checks: Dict[str, Callable[[], Awaitable[Any]]] = {
+        "postgres": db_client.ping,
+        "qdrant": qdrant_client.ping
+    }
+    if settings.readiness_check_openai:
+        checks["openai"] = clients.ping_openai
+
+    results = await asyncio.gather(*(_check_dependency(check) for check in checks.values()))
+    ready = all(result["ok"] for result in results)
+    response.status_code = 200 if ready else 503
+    return {
+        "status": "ready" if ready else "unavailable",
+        "dependencies": dict(zip(checks, results))
+    }
+
+
+async def _check_dependency(check: Callable[[], Awaitable[Any]]) -> Dict[str, Any]:
+    """Run one readiness check with a timeout, measuring its latency"""
+    started = time.perf_counter()
+    try:
+        await asyncio.wait_for(check(), timeout=settings.readiness_timeout_seconds)
+        error = None
+    except asyncio.TimeoutError:
+        error = f"Timed out after {settings.readiness_timeout_seconds}s"
+    except Exception as e:
+        error = str(e) or type(e).__name__
+    result = {"ok": error is None, "latency_ms": round(1000 * (time.perf_counter() - started), 1)}
+    if error is not None:
+        result["error"] = error
+    return result
+
 # Include routers
 app.include_router(embeddings.router, prefix="/embeddings", tags=["Embeddings"])
 app.include_router(consistency.router, prefix="/consistency", tags=["Consistency"])
+app.include_router(jobs.router, prefix="/consistency/jobs", tags=["Jobs"])
 
 if __name__ == "__main__":
     import uvicorn
@@ -1,45 +1,82 @@
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Query, Request
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
-from typing import List, Dict, Any
+from typing import AsyncIterator, List, Dict, Any, Literal, Optional, Tuple
+import asyncio
+import json
 import logging
+import time
 
+from src.config import settings
 from src.clients.database import db_client
-from src.clients.qdrant_client import qdrant_client
-from src.embeddings.service import generate_embedding
-from src.analysis.llm_service import analyze_paragraph_pair
+from src.analysis.llm_service import get_prompt_version, PairAnalysisStats
+from src.analysis.budget import AnalysisBudget
+from src.analysis.ledger import analysis_ledger
+from src.analysis.pipeline import (
+    AnalysisOptions,
+    InconsistencyResponse,
+    analysis_budget,
+    analyze_candidates,
+    build_inconsistency_response,
+    generate_candidates,
+    stats_fields,
+    summary_message
+)
+from src.utils.metrics import rounded, start_request_timings
+from src.utils.text import text_hash
 
 logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
 
-class AnalyzePairRequest(BaseModel):
+class AnalyzePairRequest(AnalysisOptions):
     project_id: str
     doc1_id: str
     doc2_id: str
-    top_k: int = 3  # Number of similar paragraphs to check per source paragraph
-
-
-class InconsistencyResponse(BaseModel):
-    source_document_id: str
-    target_document_id: str
-    source_paragraph_id: str
-    target_paragraph_id: str
-    source_excerpt: str
-    target_excerpt: str
-    source_location: Dict[str, int]
-    target_location: Dict[str, int]
-    inconsistency_type: str
-    severity: str
-    description: str
-    explanation: str
-    recommendation: str
-
-
-class AnalyzePairResponse(BaseModel):
+
+
+class AnalysisResponse(BaseModel):
     success: bool
     message: str
     inconsistencies: List[InconsistencyResponse]
+    candidates_considered: int = 0  # Raw similarity-search hits
+    pairs_analyzed: int = 0  # Unique candidate pairs after dedup, threshold and caps
+    cache_hits: int = 0
+    llm_calls: int = 0  # Chat completion requests
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    pairs_failed: int = 0  # Pairs without a verdict (LLM errors); retried on the next run
+    pairs_rate_limited: int = 0  # Failed pairs that stayed rate limited by OpenAI
+    llm_calls_skipped: int = 0  # Pairs resolved as consistent duplicates without an LLM call
+    pairs_windowed: int = 0  # Pairs sent with a long paragraph trimmed to LLM_PARAGRAPH_MAX_TOKENS
+    tokens_saved: int = 0  # Estimated tokens not sent thanks to skipped calls and windowing
+    partial: bool = False  # The budget ran out before every pair was analyzed
+    budget_exhausted: Optional[str] = None  # "deadline", "llm_calls" or "tokens"
+    pairs_skipped: int = 0  # Lower-scoring pairs left unanalyzed by the budget (retried by incremental runs)
+    lowest_score_analyzed: Optional[float] = None  # Lowest candidate score that got a verdict
+    # Seconds per stage (postgres, qdrant_*, embedding, llm; concurrent calls are summed) and total
+    timings: Optional[Dict[str, float]] = None
+
+
+class AnalyzePairResponse(AnalysisResponse):
+    pass
+
+
+class AnalyzeProjectRequest(AnalysisOptions):
+    project_id: str
+    document_ids: Optional[List[str]] = None  # Subset of READY documents (default: all)
+    # Only analyze pairs touching paragraphs changed since the last incremental run
+    # (analyze-project only); the response still lists every current finding
+    incremental: bool = False
+
+
+class AnalyzeProjectResponse(AnalysisResponse):
+    documents_analyzed: int = 0
+    document_pairs: int = 0
+    paragraphs_changed: Optional[int] = None  # Incremental runs: new or edited paragraphs
+    findings_reused: Optional[int] = None  # Incremental runs: findings carried over from the ledger
+    findings_retired: Optional[int] = None  # Incremental runs: findings dropped with deleted paragraphs
 
 
 @router.post("/analyze-pair", response_model=AnalyzePairResponse)
@@ -49,93 +86,372 @@ async def analyze_pair(request: AnalyzePairRequest):
 
     This endpoint:
     1. Fetches paragraphs from both documents
-    2. For each paragraph in doc1, finds semantically similar paragraphs in doc2 using Qdrant
-    3. Uses LLM to analyze each candidate pair for inconsistencies
-    4. Returns list of detected inconsistencies
+    2. For each paragraph in doc1, finds semantically similar paragraphs in doc2 using Qdrant batch search
+    3. Deduplicates, filters and ranks the candidate pairs
+    4. Uses LLM to analyze each candidate pair for inconsistencies
+    5. Returns list of detected inconsistencies
     """
+    started = time.perf_counter()
+    timings = start_request_timings()
+    budget = analysis_budget(request)
     try:
         logger.info(f"Analyzing pair: {request.doc1_id} <-> {request.doc2_id}")
 
-        # Fetch paragraphs for both documents
-        doc1_paragraphs = db_client.fetch_document_paragraphs(request.doc1_id)
-        doc2_paragraphs = db_client.fetch_document_paragraphs(request.doc2_id)
+        # Fetch paragraphs for both documents (single query)
+        paragraphs = await db_client.fetch_paragraphs_for_documents(
+            [request.doc1_id, request.doc2_id]
+        )
+        doc1_paragraphs = [p for p in paragraphs if p["document_id"] == request.doc1_id]
+        doc2_paragraphs = [p for p in paragraphs if p["document_id"] == request.doc2_id]
 
         if not doc1_paragraphs or not doc2_paragraphs:
             raise HTTPException(status_code=404, detail="One or both documents have no paragraphs")
 
         logger.info(f"Doc1: {len(doc1_paragraphs)} paragraphs, Doc2: {len(doc2_paragraphs)} paragraphs")
 
-        inconsistencies = []
+        result = await _run_analysis(
+            request.project_id, [request.doc1_id, request.doc2_id], paragraphs, request, budget
+        )
+
+        return AnalyzePairResponse(**result, timings=_timings(request, timings, started))
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Failed to analyze document pair: {e}")
+        raise HTTPException(status_code=500, detail=f"Analysis failed: {str(e)}")
+
+
+@router.post("/analyze-pair/stream")
+async def analyze_pair_stream(
+    request: AnalyzePairRequest,
+    http_request: Request,
+    format: Optional[Literal["ndjson", "sse"]] = Query(default=None)
+):
+    """
+    Streaming variant of /analyze-pair.
+
+    Emits one frame per detected inconsistency as soon as the LLM confirms it,
+    periodic progress frames (pairs done / total) and a final summary frame.
+    Frames are newline-delimited JSON by default, or Server-Sent Events with
+    ?format=sse or an "Accept: text/event-stream" header. Each frame has a
+    "type" of "inconsistency", "progress", "summary" or "error".
+    """
+    budget = analysis_budget(request)
+    use_sse = format == "sse" or (
+        format is None and "text/event-stream" in http_request.headers.get("accept", "")
+    )
+
+    paragraphs = await db_client.fetch_paragraphs_for_documents([request.doc1_id, request.doc2_id])
+    document_ids = {p["document_id"] for p in paragraphs}
+    if request.doc1_id not in document_ids or request.doc2_id not in document_ids:
+        raise HTTPException(status_code=404, detail="One or both documents have no paragraphs")
+
+    frames = _stream_analysis(
+        request.project_id, [request.doc1_id, request.doc2_id], paragraphs, request, budget
+    )
 
-        # For each paragraph in doc1
-        for doc1_para in doc1_paragraphs:
-            # Get or generate embedding for this paragraph
-            embedding = qdrant_client.get_embedding_by_id(doc1_para["id"])
+    return StreamingResponse(
+        _encode_frames(frames, use_sse),
+        media_type="text/event-stream" if use_sse else "application/x-ndjson",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
 
-            if not embedding:
-                # Generate embedding if not found (fallback)
-                embedding = generate_embedding(doc1_para["text"])
 
-            # Find similar paragraphs in doc2
-            similar_results = qdrant_client.query_similar_paragraphs(
-                project_id=request.project_id,
-                query_embedding=embedding,
-                target_document_id=request.doc2_id,
-                top_k=request.top_k
+@router.post("/analyze-project", response_model=AnalyzeProjectResponse)
+async def analyze_project(request: AnalyzeProjectRequest):
+    """
+    Analyze all READY documents of a project (or a subset) in one request.
+
+    This endpoint:
+    1. Loads the paragraphs of all documents in one query
+    2. Retrieves every paragraph vector from Qdrant once
+    3. Runs the similarity searches for all document pairs with Qdrant batch search
+    4. Deduplicates and ranks candidate pairs project-wide and analyzes them with the LLM
+    """
+    started = time.perf_counter()
+    timings = start_request_timings()
+    budget = analysis_budget(request)
+    try:
+        logger.info(f"Analyzing project {request.project_id}")
+
+        documents = await db_client.fetch_project_documents(request.project_id, request.document_ids)
+        document_ids = [doc["id"] for doc in documents]
+        document_pairs = len(document_ids) * (len(document_ids) - 1) // 2
+
+        if document_pairs == 0:
+            return AnalyzeProjectResponse(
+                success=True,
+                message="Not enough documents to perform consistency check",
+                inconsistencies=[],
+                documents_analyzed=len(document_ids)
             )
 
-            # Analyze each candidate pair with LLM
-            for similar in similar_results:
-                # Fetch the target paragraph details
-                target_para = db_client.fetch_paragraph_by_id(similar["id"])
+        paragraphs = await db_client.fetch_paragraphs_for_documents(document_ids)
 
-                if not target_para:
-                    continue
+        logger.info(
+            f"Project {request.project_id}: {len(document_ids)} documents, "
+            f"{document_pairs} document pairs, {len(paragraphs)} paragraphs"
+        )
 
-                # Call LLM to analyze the pair
-                result = analyze_paragraph_pair(
-                    paragraph_a_text=doc1_para["text"],
-                    paragraph_b_text=target_para["text"]
-                )
+        if request.incremental and analysis_ledger.enabled:
+            result = await _run_incremental_analysis(
+                request.project_id, document_ids, paragraphs, request, budget
+            )
+        else:
+            result = await _run_analysis(request.project_id, document_ids, paragraphs, request, budget)
 
-                if result:
-                    # Inconsistency detected
-                    inconsistencies.append(
-                        InconsistencyResponse(
-                            source_document_id=request.doc1_id,
-                            target_document_id=request.doc2_id,
-                            source_paragraph_id=doc1_para["paragraph_id"],
-                            target_paragraph_id=target_para["paragraph_id"],
-                            source_excerpt=result["source_excerpt"],
-                            target_excerpt=result["target_excerpt"],
-                            source_location={
-                                "paragraph_id": doc1_para["paragraph_id"],
-                                "start_offset": result["source_location"]["start_offset"],
-                                "end_offset": result["source_location"]["end_offset"]
-                            },
-                            target_location={
-                                "paragraph_id": target_para["paragraph_id"],
-                                "start_offset": result["target_location"]["start_offset"],
-                                "end_offset": result["target_location"]["end_offset"]
-                            },
-                            inconsistency_type=result["inconsistency_type"],
-                            severity=result["severity"],
-                            description=result["description"],
-                            explanation=result["explanation"],
-                            recommendation=result["recommendation"]
-                        )
-                    )
-
-        logger.info(f"Found {len(inconsistencies)} inconsistencies")
-
-        return AnalyzePairResponse(
-            success=True,
-            message=f"Analysis complete. Found {len(inconsistencies)} inconsistencies.",
-            inconsistencies=inconsistencies
+        return AnalyzeProjectResponse(
+            **result,
+            documents_analyzed=len(document_ids),
+            document_pairs=document_pairs,
+            timings=_timings(request, timings, started)
         )
 
     except HTTPException:
         raise
     except Exception as e:
-        logger.error(f"Failed to analyze document pair: {e}")
+        logger.error(f"Failed to analyze project: {e}")
         raise HTTPException(status_code=500, detail=f"Analysis failed: {str(e)}")
+
+
+async def _run_analysis(
+    project_id: str,
+    document_ids: List[str],
+    paragraphs: List[Dict[str, Any]],
+    options: AnalysisOptions,
+    budget: AnalysisBudget
+) -> Dict[str, Any]:
+    """
+    Generate, select and analyze candidate pairs for a set of documents.
+
+    Returns:
+        Common AnalysisResponse fields
+    """
+    candidates_considered, candidates = await generate_candidates(
+        project_id, document_ids, paragraphs, options
+    )
+
+    # Analyze all candidate pairs with the LLM concurrently (cached verdicts are reused)
+    stats = PairAnalysisStats()
+    inconsistencies = await analyze_candidates(candidates, options, stats, budget=budget)
+
+    logger.info(
+        f"Found {len(inconsistencies)} inconsistencies "
+        f"({stats.cache_hits} cached verdicts, {stats.llm_calls} LLM calls, "
+        f"{stats.prompt_tokens} prompt tokens)"
+    )
+
+    return {
+        "success": stats.llm_failures == 0,
+        "message": summary_message(len(inconsistencies), stats, budget),
+        "inconsistencies": inconsistencies,
+        "candidates_considered": candidates_considered,
+        **stats_fields(stats, budget)
+    }
+
+
+async def _run_incremental_analysis(
+    project_id: str,
+    document_ids: List[str],
+    paragraphs: List[Dict[str, Any]],
+    options: AnalyzeProjectRequest,
+    budget: AnalysisBudget
+) -> Dict[str, Any]:
+    """
+    Re-analyze only the pairs touching new or edited paragraphs.
+
+    Paragraphs are identified by (document_id, normalized text hash). Pairs
+    recorded in the analysis ledger are kept while both paragraphs still
+    exist, pairs referencing deleted paragraphs are retired, and candidates
+    are generated for every pair involving a changed paragraph that a full
+    run would select, in either direction (see source_ids of the candidate
+    engines). The returned inconsistencies are the full current set: ledger
+    findings re-mapped to the current paragraph locations plus new ones.
+
+    Returns:
+        Common AnalysisResponse fields plus incremental counters
+    """
+    config_key = analysis_ledger.make_config_key(
+        get_prompt_version(),
+        options.model_dump(include={
+            "top_k", "min_score", "max_per_target", "candidate_engine", "matrix_selection"
+        })
+    )
+    whole_project = options.document_ids is None
+
+    refs = {p["id"]: (p["document_id"], text_hash(p["text"])) for p in paragraphs}
+    current = set(refs.values())
+    known = await analysis_ledger.known_paragraphs(project_id, config_key, document_ids)
+    changed_ids = {paragraph_id for paragraph_id, ref in refs.items() if ref not in known}
+
+    retired = await analysis_ledger.retire(
+        project_id, config_key, current, None if whole_project else document_ids
+    )
+
+    logger.info(
+        f"Incremental analysis: {len(changed_ids)} of {len(paragraphs)} paragraphs changed, "
+        f"{retired} findings retired"
+    )
+
+    candidates_considered, candidates = 0, []
+    if changed_ids:
+        candidates_considered, candidates = await generate_candidates(
+            project_id, document_ids, paragraphs, options, source_ids=changed_ids
+        )
+
+    outcomes: List[Tuple[int, Optional[Dict[str, Any]], bool]] = []
+    stats = PairAnalysisStats()
+    await analyze_candidates(
+        candidates, options, stats,
+        on_result=lambda index, result, failed: outcomes.append((index, result, failed)),
+        budget=budget
+    )
+
+    # Paragraphs with a failed (or skipped) pair stay "changed" so the next run retries them
+    covered = set(current)
+    entries = []
+    for index, result, failed in outcomes:
+        candidate = candidates[index]
+        source_ref, target_ref = refs[candidate.source["id"]], refs[candidate.target["id"]]
+        if failed:
+            covered.discard(source_ref)
+            covered.discard(target_ref)
+        else:
+            entries.append((source_ref, target_ref, candidate.score, result))
+
+    new_findings = sum(1 for entry in entries if entry[3])
+    await analysis_ledger.record(
+        project_id, config_key, entries, covered, None if whole_project else document_ids
+    )
+
+    # Map every finding to the first current paragraph with that text
+    paragraph_by_ref: Dict[Tuple[str, str], Dict[str, Any]] = {}
+    for paragraph in sorted(paragraphs, key=lambda p: p["index"]):
+        paragraph_by_ref.setdefault(refs[paragraph["id"]], paragraph)
+
+    inconsistencies = []
+    for finding in await analysis_ledger.findings(project_id, config_key, document_ids):
+        source = paragraph_by_ref.get((finding["source_document_id"], finding["source_hash"]))
+        target = paragraph_by_ref.get((finding["target_document_id"], finding["target_hash"]))
+        if source and target:
+            inconsistencies.append(build_inconsistency_response(source, target, finding["verdict"]))
+
+    logger.info(
+        f"Incremental analysis: {new_findings} new findings, {len(inconsistencies)} current "
+        f"({stats.llm_calls} LLM calls)"
+    )
+
+    return {
+        "success": stats.llm_failures == 0,
+        "message": summary_message(len(inconsistencies), stats, budget),
+        "inconsistencies": inconsistencies,
+        "candidates_considered": candidates_considered,
+        **stats_fields(stats, budget),
+        "paragraphs_changed": len(changed_ids),
+        "findings_reused": len(inconsistencies) - new_findings,
+        "findings_retired": retired
+    }
+
+
+async def _stream_analysis(
+    project_id: str,
+    document_ids: List[str],
+    paragraphs: List[Dict[str, Any]],
+    options: AnalysisOptions,
+    budget: AnalysisBudget
+) -> AsyncIterator[Dict[str, Any]]:
+    """
+    Run an analysis and yield frames as results arrive.
+
+    Verdicts are pushed onto a queue by the analysis task and turned into
+    frames immediately; nothing but counters is accumulated, so memory stays
+    flat regardless of the number of inconsistencies.
+    """
+    try:
+        candidates_considered, candidates = await generate_candidates(
+            project_id, document_ids, paragraphs, options
+        )
+    except Exception as e:
+        logger.error(f"Failed to generate candidates: {e}")
+        yield {"type": "error", "detail": f"Analysis failed: {str(e)}"}
+        return
+
+    total = len(candidates)
+    yield {"type": "progress", "pairs_done": 0, "pairs_total": total}
+
+    queue: asyncio.Queue = asyncio.Queue()
+    stats = PairAnalysisStats()
+    task = asyncio.create_task(
+        analyze_candidates(
+            candidates, options, stats,
+            on_result=lambda index, result, failed: queue.put_nowait((index, result)),
+            budget=budget
+        )
+    )
+
+    done = 0
+    found = 0
+    interval = settings.stream_progress_interval_seconds
+    loop = asyncio.get_running_loop()
+    next_progress = loop.time() + interval
+
+    try:
+        while done < total:
+            try:
+                index, result = await asyncio.wait_for(queue.get(), timeout=interval)
+            except asyncio.TimeoutError:
+                if task.done():
+                    break
+            else:
+                done += 1
+                if result:
+                    found += 1
+                    candidate = candidates[index]
+                    frame = build_inconsistency_response(candidate.source, candidate.target, result)
+                    yield {"type": "inconsistency", "data": frame.model_dump()}
+
+            if loop.time() >= next_progress:
+                next_progress = loop.time() + interval
+                yield {"type": "progress", "pairs_done": done, "pairs_total": total}
+
+        await task
+    except asyncio.CancelledError:
+        # Client disconnected
+        task.cancel()
+        raise
+    except Exception as e:
+        logger.error(f"Streaming analysis failed: {e}")
+        yield {"type": "error", "detail": f"Analysis failed: {str(e)}"}
+        return
+
+    logger.info(f"Streamed {found} inconsistencies ({stats.llm_calls} LLM calls)")
+
+    yield {"type": "progress", "pairs_done": done, "pairs_total": total}
+    yield {
+        "type": "summary",
+        "success": stats.llm_failures == 0,
+        "message": summary_message(found, stats, budget),
+        "inconsistencies_found": found,
+        "candidates_considered": candidates_considered,
+        **stats_fields(stats, budget)
+    }
+
+
+async def _encode_frames(frames: AsyncIterator[Dict[str, Any]], use_sse: bool) -> AsyncIterator[str]:
+    """Serialize frames as NDJSON lines or Server-Sent Events"""
+    async for frame in frames:
+        if use_sse:
+            yield f"event: {frame['type']}\ndata: {json.dumps(frame)}\n\n"
+        else:
+            yield json.dumps(frame) + "\n"
+
+
+def _timings(
+    options: AnalysisOptions, timings: Dict[str, float], started: float
+) -> Optional[Dict[str, float]]:
+    """Stage timings for the response, if requested"""
+    if not options.include_timings:
+        return None
+    timings["total"] = time.perf_counter() - started
+    return rounded(timings)
@@ -1,10 +1,15 @@
 from fastapi import APIRouter, HTTPException
 from pydantic import BaseModel
+from typing import Dict, Optional
 import logging
+import time
 
 from src.clients.database import db_client
 from src.clients.qdrant_client import qdrant_client
-from src.embeddings.service import generate_embedding, generate_embeddings_batch
+from src.analysis.candidate_graph import candidate_graph
+from src.analysis.ledger import analysis_ledger
+from src.embeddings.service import generate_embeddings_cached
+from src.utils.metrics import rounded, start_request_timings
 
 logger = logging.getLogger(__name__)
 
@@ -14,12 +19,20 @@ router = APIRouter()
 class IngestDocumentRequest(BaseModel):
     project_id: str
     document_id: str
+    # Store nearest-neighbour candidate edges for the "precomputed" engine (default: settings.candidate_graph_enabled)
+    precompute_candidates: Optional[bool] = None
+    include_timings: bool = False  # Add a per-stage timing breakdown to the response
 
 
 class IngestDocumentResponse(BaseModel):
     success: bool
     message: str
     paragraphs_processed: int
+    paragraphs_reused: int = 0  # Embeddings taken from the cache or repeated text
+    paragraphs_computed: int = 0  # Embeddings generated via the embedding API
+    points_removed: int = 0  # Stale points of an earlier ingest (removed or re-created paragraphs)
+    candidate_edges: Optional[int] = None  # Candidate edges stored (with precompute_candidates)
+    timings: Optional[Dict[str, float]] = None  # Seconds per stage (with include_timings)
 
 
 @router.post("/ingest-document", response_model=IngestDocumentResponse)
@@ -29,41 +42,59 @@ async def ingest_document(request: IngestDocumentRequest):
 
     This endpoint:
     1. Fetches all paragraphs for the document from PostgreSQL
-    2. Generates embeddings for each paragraph using OpenAI
-    3. Stores embeddings in Qdrant with metadata
+    2. Generates embeddings using OpenAI, reusing cached vectors for known texts
+    3. Stores embeddings in Qdrant with metadata, replacing the document's
+       previous points (see QdrantClientWrapper.replace_document_embeddings)
+    4. Optionally stores the nearest neighbours of its paragraphs in the other
+       documents, and theirs in this one, as candidate edges (see CandidateGraph)
     """
+    started = time.perf_counter()
+    timings = start_request_timings()
     try:
         logger.info(f"Ingesting document {request.document_id} for project {request.project_id}")
 
         # Fetch paragraphs from database
-        paragraphs = db_client.fetch_document_paragraphs(request.document_id)
+        paragraphs = await db_client.fetch_document_paragraphs(request.document_id)
 
         if not paragraphs:
             raise HTTPException(status_code=404, detail="No paragraphs found for document")
 
         logger.info(f"Found {len(paragraphs)} paragraphs")
 
-        # Generate embeddings (batch processing for efficiency)
+        # Generate embeddings (cached by content hash, batch processing for new texts)
         texts = [p["text"] for p in paragraphs]
-        embeddings = generate_embeddings_batch(texts)
-
-        # Store embeddings in Qdrant
-        for paragraph, embedding in zip(paragraphs, embeddings):
-            qdrant_client.upsert_paragraph_embedding(
-                paragraph_db_id=paragraph["id"],
-                project_id=request.project_id,
-                document_id=request.document_id,
-                paragraph_id=paragraph["paragraph_id"],
-                paragraph_index=paragraph["index"],
-                embedding=embedding
+        embeddings, computed = await generate_embeddings_cached(texts)
+
+        # Store embeddings in Qdrant (batched upserts), then drop points of earlier ingests
+        points_removed = await qdrant_client.replace_document_embeddings(
+            project_id=request.project_id,
+            document_id=request.document_id,
+            paragraphs=paragraphs,
+            embeddings=embeddings
+        )
+
+        # Precompute candidate edges against the rest of the project
+        candidate_edges = None
+        precompute = request.precompute_candidates
+        if precompute is None:
+            precompute = candidate_graph.enabled
+        if precompute:
+            candidate_edges = await candidate_graph.update_document(
+                request.project_id, request.document_id, paragraphs, embeddings
             )
 
         logger.info(f"Successfully ingested {len(paragraphs)} paragraphs")
+        timings["total"] = time.perf_counter() - started
 
         return IngestDocumentResponse(
             success=True,
             message=f"Successfully ingested {len(paragraphs)} paragraphs",
-            paragraphs_processed=len(paragraphs)
+            paragraphs_processed=len(paragraphs),
+            paragraphs_reused=len(paragraphs) - computed,
+            paragraphs_computed=computed,
+            points_removed=points_removed,
+            candidate_edges=candidate_edges,
+            timings=rounded(timings) if request.include_timings else None
         )
 
     except HTTPException:
@@ -71,3 +102,59 @@ async def ingest_document(request: IngestDocumentRequest):
     except Exception as e:
         logger.error(f"Failed to ingest document: {e}")
         raise HTTPException(status_code=500, detail=f"Ingestion failed: {str(e)}")
+
+
+class DeleteEmbeddingsResponse(BaseModel):
+    success: bool
+    message: str
+    points_deleted: int
+
+
+@router.delete(
+    "/projects/{project_id}/documents/{document_id}",
+    response_model=DeleteEmbeddingsResponse
+)
+async def delete_document_embeddings(project_id: str, document_id: str):
+    """
+    Delete a document's embeddings from Qdrant, its candidate edges and its ledger rows.
+
+    Call when a document is deleted, so its points stop being searched.
+    """
+    try:
+        logger.info(f"Deleting embeddings of document {document_id} in project {project_id}")
+        deleted = await qdrant_client.delete_document(project_id, document_id)
+        await candidate_graph.delete_document(project_id, document_id)
+        if analysis_ledger.enabled:
+            await analysis_ledger.delete_document(project_id, document_id)
+        return DeleteEmbeddingsResponse(
+            success=True,
+            message=f"Deleted {deleted} points",
+            points_deleted=deleted
+        )
+    except Exception as e:
+        logger.error(f"Failed to delete document embeddings: {e}")
+        raise HTTPException(status_code=500, detail=f"Deletion failed: {str(e)}")
+
+
+@router.delete("/projects/{project_id}", response_model=DeleteEmbeddingsResponse)
+async def delete_project_embeddings(project_id: str):
+    """
+    Delete all of a project's embeddings from Qdrant, its candidate edges and its ledger rows.
+
+    With QDRANT_TENANCY=collection or shard_key, the project's collection or
+    shard is dropped.
+    """
+    try:
+        logger.info(f"Deleting embeddings of project {project_id}")
+        deleted = await qdrant_client.delete_project(project_id)
+        await candidate_graph.delete_project(project_id)
+        if analysis_ledger.enabled:
+            await analysis_ledger.delete_project(project_id)
+        return DeleteEmbeddingsResponse(
+            success=True,
+            message=f"Deleted {deleted} points",
+            points_deleted=deleted
+        )
+    except Exception as e:
+        logger.error(f"Failed to delete project embeddings: {e}")
+        raise HTTPException(status_code=500, detail=f"Deletion failed: {str(e)}")
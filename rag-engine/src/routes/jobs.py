@@ -0,0 +1,563 @@
+from fastapi import APIRouter, HTTPException
+from pydantic import BaseModel
+from typing import List, Dict, Any, Awaitable, Callable, Optional, Tuple
+from dataclasses import asdict, fields
+from datetime import datetime
+import asyncio
+import logging
+import time
+
+from src.config import settings
+from src.clients.database import db_client
+from src.analysis.jobs import job_store, ACTIVE_STATUSES
+from src.analysis.work_queue import work_queue
+from src.analysis.llm_service import PairAnalysisStats
+from src.analysis.budget import AnalysisBudget
+from src.clients.openai_limiter import BULK, set_priority
+from src.analysis.candidates import CandidatePair
+from src.utils.metrics import WORK_ITEMS
+from src.analysis.pipeline import (
+    InconsistencyResponse,
+    analyze_candidates,
+    build_inconsistency_response,
+    generate_candidates
+)
+from src.routes.consistency import AnalysisResponse, AnalyzeProjectRequest
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter()
+
+
+class AnalysisJobRequest(AnalyzeProjectRequest):
+    # Analyze the candidate pairs on worker replicas through the PostgreSQL work
+    # queue instead of in this process (default: settings.analysis_jobs_distributed)
+    distributed: Optional[bool] = None
+
+
+class JobResponse(BaseModel):
+    job_id: str
+    project_id: str
+    status: str  # queued, running, completed, failed, cancelled, interrupted
+    stage: Optional[str] = None  # load, candidates, analysis
+    pairs_total: int = 0
+    pairs_done: int = 0  # Checkpointed pairs (including earlier runs of the job)
+    pairs_failed: int = 0  # Pairs whose LLM call failed in the last run (retried on resume)
+    inconsistencies_found: int = 0
+    stats: Dict[str, int]  # Cumulative cache hits, LLM calls and tokens
+    stage_timings: Dict[str, float]  # Seconds per stage
+    error: Optional[str] = None
+    created_at: datetime
+    updated_at: datetime
+
+
+class JobResultResponse(AnalysisResponse):
+    job_id: str
+    status: str
+
+
+@router.post("", response_model=JobResponse, status_code=202)
+async def submit_job(request: AnalysisJobRequest):
+    """
+    Submit a project analysis (or a subset of documents via document_ids) as a
+    background job. Poll GET /consistency/jobs/{job_id} for progress.
+    """
+    try:
+        if request.distributed is None:
+            request.distributed = settings.analysis_jobs_distributed
+        job = await job_store.create(request.project_id, request.model_dump())
+        job_store.start(job["id"], _run_job(job["id"], request))
+        logger.info(f"Submitted analysis job {job['id']} for project {request.project_id}")
+        return _job_response(job)
+    except Exception as e:
+        logger.error(f"Failed to submit analysis job: {e}")
+        raise HTTPException(status_code=500, detail=f"Failed to submit job: {str(e)}")
+
+
+@router.get("/{job_id}", response_model=JobResponse)
+async def get_job(job_id: str):
+    """Get the status, progress and stage timings of a job"""
+    return _job_response(await _get_job_or_404(job_id))
+
+
+@router.get("/{job_id}/result", response_model=JobResultResponse)
+async def get_job_result(job_id: str):
+    """Get the inconsistencies checkpointed so far (complete once status is "completed")"""
+    job = await _get_job_or_404(job_id)
+    try:
+        inconsistencies = await job_store.inconsistencies(job_id)
+    except Exception as e:
+        logger.error(f"Failed to load job result: {e}")
+        raise HTTPException(status_code=500, detail=f"Failed to load job result: {str(e)}")
+
+    stats = job["stats"]
+    return JobResultResponse(
+        job_id=job_id,
+        status=job["status"],
+        success=job["status"] == "completed",
+        message=f"Job {job['status']}. Found {len(inconsistencies)} inconsistencies.",
+        inconsistencies=[InconsistencyResponse(**item) for item in inconsistencies],
+        pairs_analyzed=job["pairs_done"],
+        cache_hits=stats.get("cache_hits", 0),
+        llm_calls=stats.get("llm_calls", 0),
+        prompt_tokens=stats.get("prompt_tokens", 0),
+        completion_tokens=stats.get("completion_tokens", 0),
+        pairs_failed=job["pairs_failed"],
+        llm_calls_skipped=stats.get("duplicates_skipped", 0),
+        pairs_windowed=stats.get("pairs_windowed", 0),
+        tokens_saved=stats.get("tokens_saved", 0)
+    )
+
+
+@router.post("/{job_id}/cancel", response_model=JobResponse)
+async def cancel_job(job_id: str):
+    """Cancel a queued or running job; verdicts checkpointed so far are kept"""
+    job = await _get_job_or_404(job_id)
+    if job["status"] not in ACTIVE_STATUSES:
+        raise HTTPException(status_code=409, detail=f"Job is {job['status']}")
+
+    if not job_store.cancel(job_id):
+        # Not running in this process (another replica, or left over from a crash)
+        await job_store.update(job_id, status="cancelled")
+    # Stop distributed work; workers drop leased items at their next heartbeat
+    await work_queue.cancel_job(job_id)
+
+    # Give the task a moment to record its final state
+    for _ in range(50):
+        if not job_store.is_running(job_id):
+            break
+        await asyncio.sleep(0.01)
+
+    return _job_response(await job_store.get(job_id))
+
+
+@router.post("/{job_id}/resume", response_model=JobResponse, status_code=202)
+async def resume_job(job_id: str):
+    """
+    Resume a cancelled, failed or interrupted job, or retry the failed pairs
+    of a completed one; checkpointed pairs are skipped.
+    """
+    job = await _get_job_or_404(job_id)
+    if job["status"] in ACTIVE_STATUSES or (job["status"] == "completed" and not job["pairs_failed"]):
+        raise HTTPException(status_code=409, detail=f"Job is {job['status']}")
+
+    await job_store.update(job_id, status="queued", error=None)
+    job_store.start(job_id, _run_job(job_id, AnalysisJobRequest(**job["request"])))
+    logger.info(f"Resumed analysis job {job_id}")
+    return _job_response(await job_store.get(job_id))
+
+
+async def resume_interrupted_jobs():
+    """
+    Mark jobs left active by a stopped process as interrupted and optionally restart them.
+
+    Other replicas may be running jobs, so only jobs without a heartbeat for
+    settings.analysis_job_stale_seconds are taken over, unless
+    settings.analysis_jobs_single_replica says no other replica exists.
+    """
+    stale_seconds = None if settings.analysis_jobs_single_replica else settings.analysis_job_stale_seconds
+    job_ids = await job_store.mark_interrupted(stale_seconds)
+    if not job_ids:
+        return
+
+    logger.info(f"Found {len(job_ids)} interrupted analysis jobs")
+    if not settings.analysis_jobs_resume_on_startup:
+        return
+
+    for job_id in job_ids:
+        job = await job_store.get(job_id)
+        await job_store.update(job_id, status="queued")
+        job_store.start(job_id, _run_job(job_id, AnalysisJobRequest(**job["request"])))
+
+
+def start_takeover():
+    """Periodically take over jobs whose process stopped sending heartbeats (every replica)"""
+    if not settings.analysis_jobs_single_replica:
+        work_queue.start(_takeover_loop())
+
+
+def start_workers():
+    """Start this replica's work queue workers (settings.analysis_worker_concurrency loops)"""
+    for _ in range(max(1, settings.analysis_worker_concurrency)):
+        work_queue.start(_worker_loop())
+    logger.info(
+        f"Analysis worker {work_queue.worker_id} started "
+        f"({settings.analysis_worker_concurrency} concurrent work items)"
+    )
+
+
+async def _run_job(job_id: str, request: AnalysisJobRequest):
+    """
+    Execute a job: load paragraphs, generate candidates, then analyze every
+    candidate pair that has not been checkpointed yet.
+
+    Verdicts are queued by the analysis task and written to Postgres in
+    batches by this coroutine, so checkpointing never blocks LLM calls.
+    OpenAI calls run at bulk priority, behind interactive requests. A budget
+    in the request applies to each run; pairs it leaves out count as failed
+    and are analyzed when the job is resumed.
+
+    Distributed jobs queue the pairs for worker replicas instead (see
+    _analyze_distributed). Every job sends a heartbeat while it runs.
+    """
+    set_priority(BULK)
+    budget = AnalysisBudget(request.deadline_seconds, request.max_llm_calls, request.max_tokens)
+    job = await job_store.get(job_id)
+    timings: Dict[str, float] = dict(job["stage_timings"])
+    base_stats: Dict[str, int] = dict(job["stats"])
+    stats = PairAnalysisStats()
+    buffer: List[Tuple[str, float, Optional[Dict[str, Any]]]] = []
+    progress = {
+        "pairs_done": job["pairs_done"],
+        "pairs_failed": 0,
+        "inconsistencies_found": job["inconsistencies_found"]
+    }
+
+    async def _flush(**fields: Any):
+        """
+        Write buffered verdicts, then the progress counters.
+
+        A job cancelled through another replica is never overwritten; a
+        progress flush that finds it cancelled stops this run.
+        """
+        await job_store.checkpoint(job_id, buffer)
+        buffer.clear()
+        updated = await job_store.update(
+            job_id,
+            unless_cancelled=fields.get("status") != "cancelled",
+            **progress,
+            stats=_merge_stats(base_stats, stats),
+            stage_timings=timings,
+            **fields
+        )
+        if not updated and "status" not in fields:
+            job_store.cancel(job_id)
+
+    heartbeat = asyncio.create_task(_job_heartbeat(job_id))
+    try:
+        if not await job_store.update(job_id, unless_cancelled=True, status="running", stage="load", pairs_failed=0):
+            logger.info(f"Job {job_id} was cancelled before it started")
+            return
+        started = time.perf_counter()
+        documents = await db_client.fetch_project_documents(request.project_id, request.document_ids)
+        document_ids = [doc["id"] for doc in documents]
+        paragraphs = await db_client.fetch_paragraphs_for_documents(document_ids)
+        timings["load"] = round(time.perf_counter() - started, 3)
+
+        await job_store.update(job_id, unless_cancelled=True, stage="candidates", stage_timings=timings)
+        started = time.perf_counter()
+        candidates: List[CandidatePair] = []
+        if len(document_ids) > 1:
+            _, candidates = await generate_candidates(
+                request.project_id, document_ids, paragraphs, request
+            )
+        timings["candidates"] = round(time.perf_counter() - started, 3)
+
+        # Skip pairs checkpointed by earlier runs of this job
+        completed = await job_store.completed_pairs(job_id)
+        remaining = [c for c in candidates if _pair_key(c) not in completed]
+        progress["pairs_done"] = len(candidates) - len(remaining)
+        progress["inconsistencies_found"] = sum(
+            1 for c in candidates if completed.get(_pair_key(c))
+        )
+        logger.info(
+            f"Job {job_id}: {len(candidates)} candidate pairs, "
+            f"{progress['pairs_done']} already checkpointed"
+        )
+
+        await job_store.update(
+            job_id, unless_cancelled=True, stage="analysis", pairs_total=len(candidates), stage_timings=timings, **progress
+        )
+        started = time.perf_counter()
+        analysis_time = timings.get("analysis", 0.0)
+
+        if request.distributed:
+            try:
+                await _analyze_distributed(job_id, remaining, budget, progress, stats, timings, _flush)
+            finally:
+                timings["analysis"] = round(analysis_time + time.perf_counter() - started, 3)
+        else:
+            queue: asyncio.Queue = asyncio.Queue()
+            task = asyncio.create_task(
+                analyze_candidates(
+                    remaining, request, stats,
+                    on_result=lambda index, result, failed: queue.put_nowait((index, result, failed)),
+                    budget=budget
+                )
+            )
+
+            interval = settings.analysis_job_checkpoint_interval_seconds
+            loop = asyncio.get_running_loop()
+            next_flush = loop.time() + interval
+            received = 0
+            try:
+                while received < len(remaining):
+                    try:
+                        index, result, failed = await asyncio.wait_for(queue.get(), timeout=interval)
+                    except asyncio.TimeoutError:
+                        if task.done():
+                            break
+                    else:
+                        received += 1
+                        if failed:
+                            progress["pairs_failed"] += 1
+                        else:
+                            candidate = remaining[index]
+                            inconsistency = None
+                            if result:
+                                inconsistency = build_inconsistency_response(
+                                    candidate.source, candidate.target, result
+                                ).model_dump()
+                                progress["inconsistencies_found"] += 1
+                            buffer.append((_pair_key(candidate), candidate.score, inconsistency))
+                            progress["pairs_done"] += 1
+
+                    if len(buffer) >= settings.analysis_job_checkpoint_batch_size or loop.time() >= next_flush:
+                        next_flush = loop.time() + interval
+                        timings["analysis"] = round(analysis_time + time.perf_counter() - started, 3)
+                        await _flush()
+
+                await task
+            finally:
+                task.cancel()
+                timings["analysis"] = round(analysis_time + time.perf_counter() - started, 3)
+
+        await _flush(status="completed", stage=None)
+        logger.info(
+            f"Job {job_id} completed: {progress['inconsistencies_found']} inconsistencies, "
+            f"{progress['pairs_failed']} failed pairs"
+        )
+
+    except asyncio.CancelledError:
+        status = "cancelled" if job_store.cancel_requested(job_id) else "interrupted"
+        if status == "cancelled":
+            await work_queue.cancel_job(job_id)
+        await _flush(status=status)
+        logger.info(f"Job {job_id} {status} after {progress['pairs_done']} pairs")
+    except Exception as e:
+        logger.error(f"Job {job_id} failed: {e}")
+        await _flush(status="failed", error=str(e))
+    finally:
+        heartbeat.cancel()
+        job_store.forget(job_id)
+
+
+async def _analyze_distributed(
+    job_id: str,
+    remaining: List[CandidatePair],
+    budget: AnalysisBudget,
+    progress: Dict[str, int],
+    stats: PairAnalysisStats,
+    timings: Dict[str, float],
+    flush: Callable[..., Awaitable[None]]
+):
+    """
+    Queue the remaining pairs as work items and follow the workers' checkpoints until all are finished.
+
+    Pairs still queued by an earlier run of the job are not queued again.
+    Only the deadline of the budget applies: at the deadline the items no
+    worker has claimed yet are dropped (leased items are finished). Pairs
+    left without a verdict count as failed.
+    """
+    pending = await work_queue.pending_pairs(job_id)
+    pairs = [
+        (c.source["id"], c.target["id"], c.score)
+        for c in remaining
+        if (c.source["id"], c.target["id"]) not in pending
+    ]
+    since = await work_queue.enqueue(job_id, pairs)
+    if not work_queue.enabled:
+        logger.info(f"Job {job_id}: no workers in this replica, waiting for worker replicas")
+
+    done_before, found_before = await job_store.checkpoint_counts(job_id)
+    pairs_done, inconsistencies_found = progress["pairs_done"], progress["inconsistencies_found"]
+    started = time.perf_counter()
+    analysis_time = timings.get("analysis", 0.0)
+    deadline_reached = False
+    while True:
+        await asyncio.sleep(settings.analysis_job_checkpoint_interval_seconds)
+        state = await work_queue.progress(job_id, since)
+        done, found = await job_store.checkpoint_counts(job_id)
+        progress["pairs_done"] = pairs_done + done - done_before
+        progress["inconsistencies_found"] = inconsistencies_found + found - found_before
+        progress["pairs_failed"] = state["pairs_failed"]
+        for field in fields(PairAnalysisStats):
+            setattr(stats, field.name, state["stats"].get(field.name, 0))
+        if state["pending"] == 0:
+            break
+
+        if not deadline_reached and budget.remaining_seconds() == 0:
+            deadline_reached = True
+            budget.abandon()
+            dropped = await work_queue.cancel_job(job_id, leased=False)
+            logger.warning(f"Job {job_id}: deadline reached, dropped {dropped} queued work items")
+        timings["analysis"] = round(analysis_time + time.perf_counter() - started, 3)
+        await flush()
+
+    progress["pairs_failed"] = len(remaining) - (progress["pairs_done"] - pairs_done)
+
+
+async def _job_heartbeat(job_id: str):
+    """
+    Keep a running job's updated_at fresh, so other replicas don't take it
+    over, and stop the job once it has been cancelled through another replica.
+    """
+    while True:
+        await asyncio.sleep(settings.analysis_heartbeat_interval_seconds)
+        try:
+            status = await job_store.touch(job_id)
+        except Exception as e:
+            logger.warning(f"Job {job_id}: heartbeat failed: {e}")
+            continue
+        if status in (None, "cancelled"):
+            logger.info(f"Job {job_id} was cancelled by another replica, stopping")
+            job_store.cancel(job_id)
+            return
+
+
+async def _worker_loop():
+    """Claim and analyze work items until the process shuts down"""
+    set_priority(BULK)
+    while True:
+        try:
+            item = await work_queue.claim()
+        except Exception as e:
+            logger.error(f"Failed to claim work item: {e}")
+            item = None
+        if item is None:
+            await asyncio.sleep(settings.analysis_worker_poll_interval_seconds)
+            continue
+        await _process_work_item(item)
+
+
+async def _process_work_item(item: Dict[str, Any]):
+    """
+    Analyze the pairs of a leased work item and checkpoint their verdicts.
+
+    The lease is renewed every settings.analysis_heartbeat_interval_seconds;
+    if it is lost (expired and claimed by another worker, or the job was
+    cancelled) the analysis is abandoned.
+    """
+    lease = {"lost": False}
+    try:
+        job = await job_store.get(item["job_id"])
+        if job is None:
+            raise ValueError("Job not found")
+        request = AnalysisJobRequest(**job["request"])
+        paragraphs = await db_client.fetch_paragraphs_by_ids(
+            sorted({paragraph_id for pair in item["pairs"] for paragraph_id in pair[:2]})
+        )
+        candidates = [
+            CandidatePair(source=paragraphs[source_id], target=paragraphs[target_id], score=score)
+            for source_id, target_id, score in item["pairs"]
+            if source_id in paragraphs and target_id in paragraphs
+        ]
+
+        stats = PairAnalysisStats()
+        verdicts: Dict[int, Optional[Dict[str, Any]]] = {}
+
+        def _on_result(index: int, result: Optional[Dict[str, Any]], failed: bool):
+            if not failed:
+                verdicts[index] = result
+
+        analysis = asyncio.create_task(analyze_candidates(candidates, request, stats, on_result=_on_result))
+        renewal = asyncio.create_task(_renew_lease(item["id"], analysis, lease))
+        try:
+            await analysis
+        finally:
+            renewal.cancel()
+
+        entries = []
+        for index, result in sorted(verdicts.items()):
+            candidate = candidates[index]
+            inconsistency = None
+            if result:
+                inconsistency = build_inconsistency_response(
+                    candidate.source, candidate.target, result
+                ).model_dump()
+            entries.append((_pair_key(candidate), candidate.score, inconsistency))
+
+        if await work_queue.complete(item, entries, len(item["pairs"]) - len(entries), asdict(stats)):
+            WORK_ITEMS.labels("done").inc()
+        else:
+            WORK_ITEMS.labels("lost").inc()
+            logger.warning(f"Work item {item['id']}: lease lost before completion")
+
+    except asyncio.CancelledError:
+        if lease["lost"]:
+            WORK_ITEMS.labels("lost").inc()
+            logger.warning(f"Work item {item['id']}: lease lost, analysis abandoned")
+            return
+        await work_queue.release(item["id"])
+        WORK_ITEMS.labels("released").inc()
+        raise
+    except Exception as e:
+        logger.error(f"Work item {item['id']} of job {item['job_id']} failed: {e}")
+        WORK_ITEMS.labels("failed").inc()
+        await work_queue.fail(item, str(e))
+
+
+async def _renew_lease(item_id: int, analysis: asyncio.Task, lease: Dict[str, bool]):
+    """Extend a work item's lease while it is analyzed; cancel the analysis if the lease is lost"""
+    while True:
+        await asyncio.sleep(settings.analysis_heartbeat_interval_seconds)
+        try:
+            held = await work_queue.heartbeat(item_id)
+        except Exception as e:
+            logger.warning(f"Work item {item_id}: lease renewal failed: {e}")
+            continue
+        if not held:
+            lease["lost"] = True
+            analysis.cancel()
+            return
+
+
+async def _takeover_loop():
+    """Periodically take over jobs whose replica stopped sending heartbeats"""
+    while True:
+        await asyncio.sleep(settings.analysis_job_stale_seconds / 2)
+        try:
+            await resume_interrupted_jobs()
+        except Exception as e:
+            logger.error(f"Failed to take over stale analysis jobs: {e}")
+
+
+def _pair_key(candidate: CandidatePair) -> str:
+    """Checkpoint key of a (canonical) candidate pair"""
+    return f"{candidate.source['id']}:{candidate.target['id']}"
+
+
+def _merge_stats(base: Dict[str, int], stats: PairAnalysisStats) -> Dict[str, int]:
+    """Add the counters of this run to those of earlier runs"""
+    return {name: base.get(name, 0) + value for name, value in asdict(stats).items()}
+
+
+async def _get_job_or_404(job_id: str) -> Dict[str, Any]:
+    """Fetch a job row or raise 404"""
+    try:
+        job = await job_store.get(job_id)
+    except Exception as e:
+        logger.error(f"Failed to load job: {e}")
+        raise HTTPException(status_code=500, detail=f"Failed to load job: {str(e)}")
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+
+def _job_response(job: Dict[str, Any]) -> JobResponse:
+    """Map a job row to the API response model"""
+    return JobResponse(
+        job_id=job["id"],
+        project_id=job["project_id"],
+        status=job["status"],
+        stage=job["stage"],
+        pairs_total=job["pairs_total"],
+        pairs_done=job["pairs_done"],
+        pairs_failed=job["pairs_failed"],
+        inconsistencies_found=job["inconsistencies_found"],
+        stats=job["stats"],
+        stage_timings=job["stage_timings"],
+        error=job["error"],
+        created_at=job["created_at"],
+        updated_at=job["updated_at"]
+    )
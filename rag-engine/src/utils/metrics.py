@@ -0,0 +1,112 @@
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Iterator, Optional
+import time
+
+from prometheus_client import Counter, Gauge, Histogram
+
+# Latency buckets (seconds) covering fast DB queries up to slow LLM calls
+_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+
+STAGE_SECONDS = Histogram(
+    "ragengine_stage_seconds",
+    "Latency of backend calls by stage",
+    ["stage"],  # postgres, embedding, qdrant_search, qdrant_retrieve, qdrant_upsert, qdrant_delete, llm
+    buckets=_BUCKETS
+)
+HTTP_REQUEST_SECONDS = Histogram(
+    "ragengine_http_request_seconds",
+    "HTTP request latency by endpoint",
+    ["endpoint", "status"],
+    buckets=_BUCKETS
+)
+HTTP_REQUESTS_IN_FLIGHT = Gauge(
+    "ragengine_http_requests_in_flight",
+    "HTTP requests being processed"
+)
+OPENAI_REQUESTS_IN_FLIGHT = Gauge(
+    "ragengine_openai_requests_in_flight",
+    "OpenAI requests awaiting a response",
+    ["kind"]  # embedding, chat
+)
+OPENAI_TOKENS = Counter(
+    "ragengine_openai_tokens_total",
+    "OpenAI tokens used",
+    ["model", "kind"]  # kind: prompt, completion
+)
+OPENAI_RETRIES = Counter(
+    "ragengine_openai_retries_total",
+    "Retried OpenAI calls",
+    ["model", "reason"]  # reason: rate_limit (429), transient (connection, timeout, 5xx)
+)
+OPENAI_WAIT_SECONDS = Histogram(
+    "ragengine_openai_rate_limit_wait_seconds",
+    "Time OpenAI calls waited for rate limit budget",
+    ["priority"],  # interactive, bulk
+    buckets=_BUCKETS
+)
+CANDIDATE_PAIRS = Counter(
+    "ragengine_candidate_pairs_total",
+    "Candidate paragraph pairs",
+    ["stage"]  # considered (raw hits), selected (sent to verdict cache / LLM)
+)
+INCONSISTENCIES = Counter(
+    "ragengine_inconsistencies_total",
+    "Inconsistencies reported by the LLM (excluding cached verdicts) by severity",
+    ["severity"]
+)
+LLM_CALLS_SKIPPED = Counter(
+    "ragengine_llm_calls_skipped_total",
+    "Candidate pairs resolved as consistent duplicates without an LLM call",
+    ["reason"]  # exact (equal after normalization), near (high cosine, same numbers and names)
+)
+LLM_TOKENS_SAVED = Counter(
+    "ragengine_llm_tokens_saved_total",
+    "Estimated LLM tokens not sent",
+    ["reason"]  # duplicate (skipped calls), windowing (trimmed long paragraphs)
+)
+WORK_ITEMS = Counter(
+    "ragengine_work_items_total",
+    "Distributed analysis work items handled by this replica's workers",
+    ["result"]  # done, failed, released (shutdown), lost (lease expired or job cancelled)
+)
+CACHE_LOOKUPS = Counter(
+    "ragengine_cache_lookups_total",
+    "Cache lookups; hit ratio = hit / (hit + miss)",
+    ["cache", "result"]  # cache: verdict, embedding; result: hit, miss
+)
+
+# Per-request stage timings, collected when a response asks for them
+_request_timings: ContextVar[Optional[Dict[str, float]]] = ContextVar("request_timings", default=None)
+
+
+@contextmanager
+def timed(stage: str) -> Iterator[None]:
+    """Observe the duration of a block in STAGE_SECONDS and the current request's timings"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        STAGE_SECONDS.labels(stage).observe(elapsed)
+        timings = _request_timings.get()
+        if timings is not None:
+            timings[stage] = timings.get(stage, 0.0) + elapsed
+
+
+def start_request_timings() -> Dict[str, float]:
+    """
+    Start collecting stage timings for the current request.
+
+    The returned dict is shared by every task and thread that inherits the
+    current context, and accumulates seconds per stage (concurrent calls are
+    summed, so totals can exceed wall-clock time).
+    """
+    timings: Dict[str, float] = {}
+    _request_timings.set(timings)
+    return timings
+
+
+def rounded(timings: Dict[str, float]) -> Dict[str, float]:
+    """Timings rounded to milliseconds for responses"""
+    return {stage: round(seconds, 3) for stage, seconds in sorted(timings.items())}
@@ -0,0 +1,24 @@
+import hashlib
+import re
+import unicodedata
+
+_WHITESPACE_RE = re.compile(r"\s+")
+
+
+def normalize_text(text: str) -> str:
+    """Normalize paragraph text for hashing (Unicode NFKC, collapsed whitespace)"""
+    return _WHITESPACE_RE.sub(" ", unicodedata.normalize("NFKC", text)).strip()
+
+
+def text_hash(text: str) -> str:
+    """SHA-256 hex digest of the normalized text"""
+    return hashlib.sha256(normalize_text(text).encode("utf-8")).hexdigest()
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Rough token estimate without a tokenizer (about 3 characters per token).
+
+    Deliberately conservative so budgets derived from it stay under API limits.
+    """
+    return (len(text) + 2) // 3
@@ -0,0 +1,5 @@
+import os
+
+# Settings required at import time; unit tests never connect to these services
+os.environ.setdefault("OPENAI_API_KEY", "test")
+os.environ.setdefault("DATABASE_URL", "postgresql://test@localhost/test")
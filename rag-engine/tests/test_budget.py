@@ -0,0 +1,97 @@
+import pytest
+
+from src.analysis import budget as budget_module
+from src.analysis.budget import (
+    DEADLINE,
+    LLM_CALLS,
+    TOKENS,
+    AnalysisBudget,
+    BudgetExhausted
+)
+
+
+class _Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch) -> _Clock:
+    clock = _Clock()
+    monkeypatch.setattr(budget_module.time, "monotonic", clock)
+    return clock
+
+
+def test_unlimited_budget_only_tracks_coverage():
+    budget = AnalysisBudget()
+    for _ in range(100):
+        budget.reserve(10_000)
+    assert budget.exhausted is None
+    assert budget.remaining_seconds() is None
+    assert (budget.llm_calls, budget.tokens) == (100, 1_000_000)
+
+
+def test_llm_call_limit():
+    budget = AnalysisBudget(max_llm_calls=2)
+    budget.reserve(1)
+    budget.reserve(1)
+    with pytest.raises(BudgetExhausted):
+        budget.reserve(1)
+    assert budget.exhausted == LLM_CALLS
+    assert budget.llm_calls == 2
+
+
+def test_token_limit_counts_settled_usage():
+    budget = AnalysisBudget(max_tokens=100)
+    budget.reserve(60)
+    budget.settle(60, 30)
+    assert budget.tokens == 30
+    budget.reserve(70)
+    with pytest.raises(BudgetExhausted):
+        budget.reserve(1)
+    assert budget.exhausted == TOKENS
+
+
+def test_exhausted_budget_rejects_smaller_calls():
+    budget = AnalysisBudget(max_tokens=100)
+    with pytest.raises(BudgetExhausted):
+        budget.reserve(101)
+    # A later (lower-scoring) call that would fit is not sent either
+    with pytest.raises(BudgetExhausted):
+        budget.reserve(1)
+    assert (budget.llm_calls, budget.tokens) == (0, 0)
+
+
+def test_deadline(clock):
+    budget = AnalysisBudget(deadline_seconds=5)
+    assert budget.remaining_seconds() == 5
+    budget.reserve(1)
+    clock.now += 6
+    assert budget.remaining_seconds() == 0
+    with pytest.raises(BudgetExhausted):
+        budget.reserve(1)
+    assert budget.exhausted == DEADLINE
+
+
+def test_abandon_keeps_first_reason():
+    budget = AnalysisBudget()
+    budget.abandon()
+    assert budget.exhausted == DEADLINE
+    with pytest.raises(BudgetExhausted):
+        budget.reserve(1)
+
+    budget = AnalysisBudget(max_llm_calls=0)
+    with pytest.raises(BudgetExhausted):
+        budget.reserve(1)
+    budget.abandon()
+    assert budget.exhausted == LLM_CALLS
+
+
+def test_record_score_keeps_lowest():
+    budget = AnalysisBudget()
+    for score in (0.9, 0.7, 0.8):
+        budget.record_score(score)
+    assert budget.lowest_score == 0.7
@@ -0,0 +1,178 @@
+import asyncio
+from typing import Dict, List, Set, Tuple
+
+import numpy as np
+import pytest
+
+from src.analysis import candidates as candidates_module
+from src.analysis import similarity
+from src.analysis.candidate_graph import _document_edges
+from src.analysis.candidates import (
+    CandidatePair,
+    _cluster_candidates,
+    _matrix_candidates,
+    generate_precomputed_candidates,
+    generate_project_candidates,
+    select_candidates
+)
+
+DOCUMENTS = ["doc-a", "doc-b", "doc-c"]
+TOP_K = 2
+
+
+def _fixture(seed: int = 7) -> Tuple[List[Dict], Dict[str, List[float]]]:
+    """12 paragraphs per document with random 8-dimensional embeddings"""
+    rng = np.random.default_rng(seed)
+    paragraphs = [
+        {"id": f"{doc}-{i}", "document_id": doc, "index": i, "paragraph_id": f"p-{i}", "text": f"{doc} {i}"}
+        for doc in DOCUMENTS
+        for i in range(12)
+    ]
+    embeddings = {p["id"]: rng.normal(size=8).tolist() for p in paragraphs}
+    return paragraphs, embeddings
+
+
+CHANGED = {"doc-b-3", "doc-c-5", "doc-c-9"}
+
+
+def _keys(candidates) -> Set[Tuple[str, str]]:
+    return {(c.source["id"], c.target["id"]) for c in select_candidates(candidates)}
+
+
+def _assert_incremental_covers_full(full, incremental):
+    """Every full-run pair touching a changed paragraph is in the incremental run, and nothing else"""
+    expected = {key for key in _keys(full) if CHANGED & set(key)}
+    got = _keys(incremental)
+    assert expected
+    assert expected <= got
+    assert all(CHANGED & set(key) for key in got)
+
+
+def test_matrix_incremental_covers_full_run():
+    paragraphs, embeddings = _fixture()
+    full = _matrix_candidates(DOCUMENTS, paragraphs, embeddings, TOP_K, "top_k", 0.0, False, None)
+    incremental = _matrix_candidates(DOCUMENTS, paragraphs, embeddings, TOP_K, "top_k", 0.0, False, CHANGED)
+    _assert_incremental_covers_full(full, incremental)
+
+
+@pytest.mark.parametrize("selection", ["mutual", "threshold"])
+def test_matrix_incremental_other_selections(selection):
+    paragraphs, embeddings = _fixture()
+    full = _matrix_candidates(DOCUMENTS, paragraphs, embeddings, TOP_K, selection, 0.3, False, None)
+    incremental = _matrix_candidates(DOCUMENTS, paragraphs, embeddings, TOP_K, selection, 0.3, False, CHANGED)
+    _assert_incremental_covers_full(full, incremental)
+
+
+def test_cluster_incremental_covers_full_run(monkeypatch):
+    monkeypatch.setattr(candidates_module.settings, "candidate_cluster_size", 8)
+    monkeypatch.setattr(candidates_module.settings, "candidate_cluster_branching", 3)
+    paragraphs, embeddings = _fixture()
+    full = _cluster_candidates(DOCUMENTS, paragraphs, embeddings, TOP_K, False, None)
+    incremental = _cluster_candidates(DOCUMENTS, paragraphs, embeddings, TOP_K, False, CHANGED)
+    _assert_incremental_covers_full(full, incremental)
+
+
+def test_qdrant_incremental_covers_full_run(monkeypatch):
+    paragraphs, embeddings = _fixture()
+    by_document = {
+        doc: [p["id"] for p in paragraphs if p["document_id"] == doc] for doc in DOCUMENTS
+    }
+
+    async def load_embeddings(project_id, rows):
+        return {p["id"]: embeddings[p["id"]] for p in rows}
+
+    async def search(project_id, queries, top_k=5):
+        # Brute-force stand-in for Qdrant's cosine search within one document
+        results = []
+        for vector, document_id in queries:
+            ids = by_document[document_id]
+            scores = similarity.cosine_matrix(
+                similarity.to_unit_matrix([vector]),
+                similarity.to_unit_matrix([embeddings[i] for i in ids])
+            )[0]
+            best = np.argsort(-scores)[:top_k]
+            results.append([{"id": ids[j], "score": float(scores[j])} for j in best])
+        return results
+
+    monkeypatch.setattr(candidates_module, "_load_embeddings", load_embeddings)
+    monkeypatch.setattr(candidates_module.qdrant_client, "query_similar_paragraphs_batch", search)
+
+    full = asyncio.run(generate_project_candidates("p", DOCUMENTS, paragraphs, TOP_K))
+    incremental = asyncio.run(generate_project_candidates("p", DOCUMENTS, paragraphs, TOP_K, source_ids=CHANGED))
+    _assert_incremental_covers_full(full, incremental)
+
+
+def test_precomputed_incremental_covers_full_run(monkeypatch):
+    paragraphs, embeddings = _fixture()
+    edges = {}
+    for doc in DOCUMENTS:
+        rows = [p for p in paragraphs if p["document_id"] == doc]
+        others = [(p["id"], p["document_id"], embeddings[p["id"]]) for p in paragraphs if p["document_id"] != doc]
+        for source, source_doc, target, target_doc, score in _document_edges(
+            doc, rows, [embeddings[p["id"]] for p in rows], others, TOP_K
+        ):
+            edges[(source, target)] = {
+                "source_paragraph_id": source,
+                "target_paragraph_id": target,
+                "target_document_id": target_doc,
+                "score": score
+            }
+
+    async def covered_documents(project_id, document_ids):
+        return set(document_ids)
+
+    async def stored_edges(project_id, document_ids):
+        return list(edges.values())
+
+    monkeypatch.setattr(candidates_module.candidate_graph, "covered_documents", covered_documents)
+    monkeypatch.setattr(candidates_module.candidate_graph, "edges", stored_edges)
+
+    full = asyncio.run(generate_precomputed_candidates("p", DOCUMENTS, paragraphs, TOP_K))
+    incremental = asyncio.run(
+        generate_precomputed_candidates("p", DOCUMENTS, paragraphs, TOP_K, source_ids=CHANGED)
+    )
+    _assert_incremental_covers_full(full, incremental)
+
+
+def _paragraph(document_id: str, index: int) -> Dict:
+    return {"id": f"{document_id}-{index}", "document_id": document_id, "index": index}
+
+
+def _pair(a: Tuple[str, int], b: Tuple[str, int], score: float) -> CandidatePair:
+    return CandidatePair(source=_paragraph(*a), target=_paragraph(*b), score=score)
+
+
+def _ids(candidates) -> List[Tuple[str, str, float]]:
+    return [(c.source["id"], c.target["id"], c.score) for c in candidates]
+
+
+def test_select_candidates_collapses_mirrored_pairs():
+    selected = select_candidates([
+        _pair(("doc-b", 2), ("doc-a", 5), 0.8),
+        _pair(("doc-a", 5), ("doc-b", 2), 0.9),
+        _pair(("doc-a", 1), ("doc-a", 3), 0.7)
+    ])
+    # Oriented by (document_id, index), keeping the best score of the two directions
+    assert _ids(selected) == [("doc-a-5", "doc-b-2", 0.9), ("doc-a-1", "doc-a-3", 0.7)]
+
+
+def test_select_candidates_threshold_and_ranking():
+    selected = select_candidates([
+        _pair(("doc-a", 2), ("doc-b", 0), 0.6),
+        _pair(("doc-a", 0), ("doc-b", 1), 0.2),
+        _pair(("doc-a", 1), ("doc-b", 0), 0.6),
+        _pair(("doc-a", 3), ("doc-b", 3), 0.9)
+    ], min_score=0.5)
+    # Highest score first; ties by paragraph position
+    assert _ids(selected) == [
+        ("doc-a-3", "doc-b-3", 0.9), ("doc-a-1", "doc-b-0", 0.6), ("doc-a-2", "doc-b-0", 0.6)
+    ]
+
+
+def test_select_candidates_caps_sources_per_target():
+    candidates = [_pair(("doc-a", i), ("doc-b", 0), 0.5 + i / 10) for i in range(4)]
+    candidates.append(_pair(("doc-a", 0), ("doc-b", 1), 0.1))
+    selected = select_candidates(candidates, max_per_target=2)
+    assert _ids(selected) == [
+        ("doc-a-3", "doc-b-0", 0.8), ("doc-a-2", "doc-b-0", 0.7), ("doc-a-0", "doc-b-1", 0.1)
+    ]
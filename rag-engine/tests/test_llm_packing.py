@@ -0,0 +1,65 @@
+import asyncio
+import json
+from typing import List
+
+from src.analysis import llm_service
+from src.analysis.llm_service import PairAnalysisStats, _build_packs, analyze_paragraph_pairs
+
+
+def _pair(i: int) -> dict:
+    return {"paragraph_a_text": f"Clause {i} applies.", "paragraph_b_text": f"Clause {i} does not apply."}
+
+
+def test_build_packs_respects_size_and_token_limit(monkeypatch):
+    monkeypatch.setattr(llm_service.settings, "llm_pack_max_tokens", 1000)
+    items = [(str(i), _pair(i)) for i in range(7)]
+    assert _build_packs(items, 3) == [["0", "1", "2"], ["3", "4", "5"], ["6"]]
+
+    long_pair = {"paragraph_a_text": "x" * 3000, "paragraph_b_text": ""}
+    items = [("a", _pair(0)), ("long", long_pair), ("b", _pair(1))]
+    # A pair over the limit on its own still gets a pack
+    assert _build_packs(items, 5) == [["a"], ["long"], ["b"]]
+
+
+def _fake_completion(monkeypatch, missing: List[int]) -> List[int]:
+    """Answer packed prompts for every pair except missing; returns the pair count of each call"""
+    calls = []
+
+    async def complete(prompt, stats=None, pair_count=1, budget=None):
+        calls.append(pair_count)
+        stats.llm_calls += 1
+        if pair_count == 1:
+            return json.dumps({"is_inconsistent": True, "severity": "LOW"})
+        entries = [
+            {"pair_index": index, "is_inconsistent": index % 2 == 0, "severity": "HIGH"}
+            for index in range(pair_count) if index not in missing
+        ]
+        return json.dumps({"results": entries})
+
+    monkeypatch.setattr(llm_service, "_complete_async", complete)
+    monkeypatch.setattr(llm_service.verdict_cache, "enabled", False)
+    monkeypatch.setattr(llm_service.settings, "duplicate_shortcut_enabled", False)
+    return calls
+
+
+def test_packed_results_map_to_pairs(monkeypatch):
+    calls = _fake_completion(monkeypatch, missing=[])
+    stats = PairAnalysisStats()
+    results = asyncio.run(analyze_paragraph_pairs([_pair(i) for i in range(4)], stats=stats, pack_size=4))
+
+    assert calls == [4]
+    assert [result is not None for result in results] == [True, False, True, False]
+    assert results[0]["severity"] == "HIGH"
+    assert results[0]["source_location"] == {"start_offset": 0, "end_offset": len(_pair(0)["paragraph_a_text"])}
+    assert stats.packed_fallbacks == 0
+
+
+def test_missing_packed_result_is_sent_alone(monkeypatch):
+    calls = _fake_completion(monkeypatch, missing=[1])
+    stats = PairAnalysisStats()
+    results = asyncio.run(analyze_paragraph_pairs([_pair(i) for i in range(3)], stats=stats, pack_size=3))
+
+    assert calls == [3, 1]
+    assert results[1]["severity"] == "LOW"
+    assert stats.packed_fallbacks == 1
+    assert stats.llm_calls == 2
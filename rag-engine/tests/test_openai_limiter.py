@@ -0,0 +1,109 @@
+import asyncio
+
+import pytest
+
+from src.clients import openai_limiter as limiter_module
+from src.clients.openai_limiter import (
+    BULK,
+    INTERACTIVE,
+    OpenAIRateLimiter,
+    RateLimitExceeded,
+    _Bucket,
+    set_priority
+)
+
+MODEL = "test-model"
+
+
+def _limiter(rpm: int = 60, tpm: int = 0) -> OpenAIRateLimiter:
+    limiter = OpenAIRateLimiter()
+    limiter.configure(MODEL, rpm=rpm, tpm=tpm)
+    return limiter
+
+
+async def _ok():
+    return "ok"
+
+
+def test_bucket_refills_per_minute_rate():
+    bucket = _Bucket(60)
+    bucket.level = 0
+    bucket.refill(bucket.updated + 2)
+    assert bucket.level == pytest.approx(2)
+    bucket.refill(bucket.updated + 600)
+    assert bucket.level == 60
+
+
+def test_bucket_wait_keeps_reserve():
+    bucket = _Bucket(60)
+    assert bucket.wait_for(1, 0.0) == 0.0
+    bucket.level = 10
+    # 1 unit plus 20% of 60 kept back: 3 units missing at 1 unit per second
+    assert bucket.wait_for(1, 0.2) == pytest.approx(3.0)
+
+
+def test_unconfigured_model_is_unlimited():
+    limiter = OpenAIRateLimiter()
+    assert asyncio.run(limiter.call_async("other", 10, _ok, 0, 0.1)) == "ok"
+
+
+def test_call_takes_request_and_tokens():
+    limiter = _limiter(rpm=60, tpm=1000)
+    assert limiter.call(MODEL, 100, lambda: "ok", 0, 0.1) == "ok"
+    budget = limiter._budgets[MODEL]
+    assert budget.requests.level == pytest.approx(59, abs=0.1)
+    assert budget.tokens.level == pytest.approx(900, abs=1)
+
+
+def test_bulk_yields_to_waiting_interactive_callers():
+    limiter = _limiter()
+    budget = limiter._budgets[MODEL]
+    budget.interactive_waiting = 1
+    assert limiter._try_acquire(MODEL, 1, BULK, 0.0, False) > 0
+    assert limiter._try_acquire(MODEL, 1, INTERACTIVE, 0.0, False) == 0
+    budget.interactive_waiting = 0
+    assert limiter._try_acquire(MODEL, 1, BULK, 0.0, False) == 0
+
+
+def test_interactive_wait_is_counted_once():
+    limiter = _limiter()
+    budget = limiter._budgets[MODEL]
+    budget.requests.level = 0
+    assert limiter._try_acquire(MODEL, 1, INTERACTIVE, 0.0, False) > 0
+    assert limiter._try_acquire(MODEL, 1, INTERACTIVE, 0.5, True) > 0
+    assert budget.interactive_waiting == 1
+    limiter._finish_wait(MODEL, INTERACTIVE, 1.0, True)
+    assert budget.interactive_waiting == 0
+
+
+def test_interactive_wait_beyond_limit_raises(monkeypatch):
+    monkeypatch.setattr(limiter_module.settings, "openai_rate_limit_max_wait_seconds", 1.0)
+    limiter = _limiter(rpm=1)
+    budget = limiter._budgets[MODEL]
+    budget.requests.level = 0
+    with pytest.raises(RateLimitExceeded):
+        limiter._try_acquire(MODEL, 1, INTERACTIVE, 0.0, False)
+    assert budget.interactive_waiting == 0
+
+
+def test_cancelled_interactive_waiter_does_not_block_bulk():
+    limiter = _limiter()
+    budget = limiter._budgets[MODEL]
+    budget.requests.level = 0
+
+    async def scenario():
+        waiter = asyncio.create_task(limiter.call_async(MODEL, 1, _ok, 0, 0.1))
+        await asyncio.sleep(0.05)
+        assert budget.interactive_waiting == 1
+
+        # Cancelled during its first sleep, like a budget deadline or a client disconnect
+        waiter.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiter
+        assert budget.interactive_waiting == 0
+
+        budget.requests.level = budget.requests.per_minute
+        set_priority(BULK)
+        return await asyncio.wait_for(limiter.call_async(MODEL, 1, _ok, 0, 0.1), timeout=0.5)
+
+    assert asyncio.run(scenario()) == "ok"
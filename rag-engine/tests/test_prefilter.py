@@ -0,0 +1,79 @@
+import pytest
+
+from src.analysis.prefilter import (
+    ELLIPSIS,
+    EXACT,
+    NEAR,
+    duplicate_reason,
+    window_text,
+    _segments
+)
+from src.utils.text import estimate_tokens
+
+MIN_SCORE = 0.97
+
+
+def test_exact_duplicate_ignores_case_and_whitespace():
+    a = "The  contract ends\non 31 March."
+    b = "the contract ends on 31 march."
+    assert duplicate_reason(a, b, None, MIN_SCORE) == EXACT
+
+
+def test_near_duplicate_needs_score_and_same_facts():
+    a = "Invoices must be paid within 30 days by Acme."
+    b = "Invoices must be settled within 30 days by Acme."
+    assert duplicate_reason(a, b, 0.99, MIN_SCORE) == NEAR
+    assert duplicate_reason(a, b, 0.90, MIN_SCORE) is None
+    assert duplicate_reason(a, b, None, MIN_SCORE) is None
+
+
+@pytest.mark.parametrize("b", [
+    "Invoices must be paid within 60 days by Acme.",  # Number
+    "Invoices must be paid within 30 days by Globex.",  # Entity
+    "Invoices must not be paid within 30 days by Acme.",  # Negation
+    "Invoices may be paid within 30 days by Acme.",  # Modal verb
+])
+def test_changed_fact_is_not_a_duplicate(b):
+    a = "Invoices must be paid within 30 days by Acme."
+    assert duplicate_reason(a, b, 0.99, MIN_SCORE) is None
+
+
+def test_short_text_is_not_windowed():
+    text = "Short paragraph."
+    assert window_text(text, "other", 100) == (text, 0)
+    assert window_text(text * 50, "other", 0) == (text * 50, 0)
+
+
+def test_segments_split_sentences_and_long_runs():
+    text = "First sentence. Second one!\nThird " + "word " * 20
+    spans = _segments(text, 30)
+    assert [text[start:end] for start, end in spans[:2]] == ["First sentence.", "Second one!"]
+    assert len(spans) > 3
+    assert all(end - start <= 30 for start, end in spans)
+    assert all(text[start] != " " for start, _ in spans)
+    # Long runs are cut at word boundaries without losing words
+    assert " ".join(text[start:end].strip() for start, end in spans[2:]).split() == ["Third"] + ["word"] * 20
+
+
+def test_window_keeps_region_matching_other_paragraph():
+    filler = " ".join(f"Filler sentence number {i} about nothing." for i in range(20))
+    target = "The warranty period is twelve months from delivery."
+    text = f"{filler} {target} {filler}"
+    window, offset = window_text(text, "Warranty period: twelve months after delivery", 40)
+
+    assert target in window
+    assert window.startswith(f"{ELLIPSIS} ") and window.endswith(f" {ELLIPSIS}")
+    assert estimate_tokens(window) <= 40
+    # Positions in the window map back to the same characters of the full paragraph
+    position = window.index(target)
+    assert text[position + offset:position + offset + len(target)] == target
+
+
+def test_window_at_start_has_no_prefix():
+    target = "Delivery happens within five business days."
+    text = target + " " + " ".join(f"Unrelated sentence {i} here." for i in range(30))
+    window, offset = window_text(text, "delivery within five business days", 30)
+
+    assert window.startswith(target)
+    assert window.endswith(f" {ELLIPSIS}")
+    assert offset == 0
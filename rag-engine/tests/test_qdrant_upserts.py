@@ -0,0 +1,50 @@
+import asyncio
+
+from qdrant_client import AsyncQdrantClient
+
+from src.clients import qdrant_client as qdrant_module
+from src.clients.qdrant_client import QdrantClientWrapper
+
+PROJECT = "project-1"
+
+
+def _paragraphs(count: int):
+    paragraphs = [
+        {"id": f"00000000-0000-0000-0000-{i:012d}", "paragraph_id": f"p-{i}", "index": i}
+        for i in range(count)
+    ]
+    embeddings = [[1.0, float(i), 0.0, 1.0] for i in range(count)]
+    return paragraphs, embeddings
+
+
+def test_upserts_are_batched(monkeypatch):
+    monkeypatch.setattr(qdrant_module.settings, "qdrant_tenancy", "shared")
+
+    async def run():
+        wrapper = QdrantClientWrapper()
+        wrapper.client = AsyncQdrantClient(location=":memory:")
+        wrapper.vector_size = 4
+        await wrapper.init_collection()
+
+        batches = []
+        upsert = wrapper.client.upsert
+
+        async def counting_upsert(**kwargs):
+            batches.append([point.payload["paragraph_index"] for point in kwargs["points"]])
+            return await upsert(**kwargs)
+
+        wrapper.client.upsert = counting_upsert
+        paragraphs, embeddings = _paragraphs(10)
+        sent = await wrapper.upsert_paragraph_embeddings(
+            PROJECT, "doc-a", paragraphs, embeddings, batch_size=4, wait=True, parallel=2
+        )
+        stored = await wrapper.client.count(wrapper.collection_name)
+        point = (await wrapper.client.retrieve(wrapper.collection_name, [paragraphs[7]["id"]]))[0]
+        await wrapper.close()
+        return sent, batches, stored.count, point.payload
+
+    sent, batches, stored, payload = asyncio.run(run())
+    assert sent == 3
+    assert sorted(batches) == [[0, 1, 2, 3], [4, 5, 6, 7], [8, 9]]
+    assert stored == 10
+    assert payload == {"project_id": PROJECT, "document_id": "doc-a", "paragraph_id": "p-7", "paragraph_index": 7}
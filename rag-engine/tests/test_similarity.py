@@ -0,0 +1,126 @@
+import numpy as np
+import pytest
+
+from src.analysis import similarity
+from src.analysis.similarity import (
+    cluster_indices,
+    mutual_nearest_pairs,
+    nearest_centroids,
+    spherical_kmeans,
+    threshold_pairs,
+    to_unit_matrix,
+    top_k_pairs
+)
+
+
+def _matrices(seed: int = 3):
+    rng = np.random.default_rng(seed)
+    return to_unit_matrix(rng.normal(size=(9, 6)).tolist()), to_unit_matrix(rng.normal(size=(7, 6)).tolist())
+
+
+@pytest.fixture(params=[similarity.BLOCK_ROWS, 4], ids=["one-block", "blocked"])
+def block_rows(request, monkeypatch):
+    monkeypatch.setattr(similarity, "BLOCK_ROWS", request.param)
+
+
+def _pairs(rows, cols, scores):
+    return {(int(i), int(j)): float(score) for i, j, score in zip(rows, cols, scores)}
+
+
+def test_to_unit_matrix_normalizes_rows():
+    matrix = to_unit_matrix([[3.0, 4.0], [0.0, 0.0]])
+    assert matrix.dtype == np.float32
+    assert matrix[0].tolist() == pytest.approx([0.6, 0.8])
+    assert matrix[1].tolist() == [0.0, 0.0]
+    assert to_unit_matrix([]).shape == (0, 0)
+
+
+def test_top_k_pairs_matches_brute_force(block_rows):
+    a, b = _matrices()
+    sim = a @ b.T
+    pairs = _pairs(*top_k_pairs(a, b, 3))
+
+    expected = {(i, int(j)) for i in range(len(a)) for j in np.argsort(-sim[i])[:3]}
+    assert set(pairs) == expected
+    assert all(score == pytest.approx(sim[i, j]) for (i, j), score in pairs.items())
+
+
+def test_top_k_pairs_k_at_least_columns_returns_all(block_rows):
+    a, b = _matrices()
+    assert len(_pairs(*top_k_pairs(a, b, 20))) == len(a) * len(b)
+    assert len(top_k_pairs(a, b, 0)[0]) == 0
+    assert len(top_k_pairs(a[:0], b, 2)[0]) == 0
+
+
+def test_mutual_nearest_pairs_matches_brute_force(block_rows):
+    a, b = _matrices()
+    sim = a @ b.T
+    pairs = _pairs(*mutual_nearest_pairs(a, b))
+
+    expected = {
+        (i, j) for i in range(len(a)) for j in range(len(b))
+        if sim[i].argmax() == j and sim[:, j].argmax() == i
+    }
+    assert expected
+    assert set(pairs) == expected
+    assert all(score == pytest.approx(sim[i, j]) for (i, j), score in pairs.items())
+
+
+def test_threshold_pairs_matches_brute_force(block_rows):
+    a, b = _matrices()
+    sim = a @ b.T
+    pairs = _pairs(*threshold_pairs(a, b, 0.2))
+
+    assert set(pairs) == {(int(i), int(j)) for i, j in zip(*np.nonzero(sim >= 0.2))}
+    assert len(threshold_pairs(a, b[:0], 0.2)[0]) == 0
+
+
+def _blobs(centers: int = 4, per_center: int = 10, seed: int = 5):
+    """Tight groups of rows around random directions, and the group of every row"""
+    rng = np.random.default_rng(seed)
+    directions = rng.normal(size=(centers, 16))
+    rows = np.repeat(directions, per_center, axis=0) + rng.normal(scale=0.01, size=(centers * per_center, 16))
+    return to_unit_matrix(rows.tolist()), np.repeat(np.arange(centers), per_center)
+
+
+def test_nearest_centroids_orders_probes():
+    matrix = to_unit_matrix([[1.0, 0.0], [0.0, 1.0]])
+    centroids = to_unit_matrix([[0.0, 1.0], [1.0, 0.1], [1.0, 1.0]])
+    assert nearest_centroids(matrix, centroids).tolist() == [[1], [0]]
+    assert nearest_centroids(matrix, centroids, probes=2).tolist() == [[1, 2], [0, 2]]
+
+
+def test_spherical_kmeans_converges_to_member_means():
+    matrix, _ = _blobs()
+    centroids, labels = spherical_kmeans(matrix, 4, 50, np.random.default_rng(0))
+
+    assert centroids.shape == (4, 16)
+    # Every row is labelled with its nearest centroid, and centroids are their members' mean direction
+    assert labels.tolist() == nearest_centroids(matrix, centroids)[:, 0].tolist()
+    for c in np.unique(labels):
+        assert centroids[c] == pytest.approx(to_unit_matrix([matrix[labels == c].sum(axis=0)])[0], abs=1e-5)
+
+
+def test_cluster_indices_partitions_rows():
+    matrix, groups = _blobs(centers=6)
+    clusters = cluster_indices(matrix, max_size=12, branching=3)
+
+    assert all(len(cluster) <= 12 for cluster in clusters)
+    assert sorted(int(i) for cluster in clusters for i in cluster) == list(range(len(matrix)))
+    # Each group of 10 near-identical rows ends up in a single cluster
+    for group in range(6):
+        assert sum(group in groups[cluster] for cluster in clusters) == 1
+
+
+def test_cluster_indices_probes_overlap_clusters():
+    matrix, _ = _blobs()
+    clusters = cluster_indices(matrix, max_size=10, branching=4, probes=2)
+    memberships = np.bincount(np.concatenate(clusters), minlength=len(matrix))
+    assert memberships.min() >= 1 and memberships.max() <= 2
+    assert memberships.sum() > len(matrix)
+
+
+def test_cluster_indices_stops_on_identical_rows():
+    matrix = to_unit_matrix([[1.0, 2.0]] * 30)
+    clusters = cluster_indices(matrix, max_size=8)
+    assert sorted(int(i) for cluster in clusters for i in cluster) == list(range(30))
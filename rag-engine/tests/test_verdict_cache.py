@@ -0,0 +1,41 @@
+from src.analysis import verdict_cache as cache_module
+from src.analysis.verdict_cache import VerdictCache
+from src.utils.text import estimate_tokens, normalize_text, text_hash
+
+VERSION = "v1"
+
+
+def test_normalize_text_collapses_whitespace_and_compatibility_forms():
+    assert normalize_text("  A  b\n\tc  ") == "A b c"
+    assert normalize_text("ﬁle ①") == "file 1"
+
+
+def test_text_hash_ignores_formatting_only():
+    assert text_hash("Payment  within\n30 days") == text_hash("Payment within 30 days ")
+    assert text_hash("Payment within 30 days") != text_hash("Payment within 60 days")
+    assert len(text_hash("")) == 64
+
+
+def test_estimate_tokens_rounds_up():
+    assert [estimate_tokens("x" * n) for n in (0, 1, 3, 4)] == [0, 1, 1, 2]
+
+
+def test_make_key_is_stable_for_reformatted_text():
+    cache = VerdictCache()
+    key = cache.make_key(VERSION, "Text  A", "Text B", "Doc A", "Doc B")
+    assert key == cache.make_key(VERSION, "Text A\n", "Text B", "Doc A", "Doc B")
+
+
+def test_make_key_separates_everything_else(monkeypatch):
+    cache = VerdictCache()
+    key = cache.make_key(VERSION, "Text A", "Text B", "Doc A", "Doc B")
+    others = {
+        cache.make_key("v2", "Text A", "Text B", "Doc A", "Doc B"),
+        cache.make_key(VERSION, "Text B", "Text A", "Doc A", "Doc B"),  # Pairs are directed
+        cache.make_key(VERSION, "Text A", "Text B", "Doc A", ""),
+        cache.make_key(VERSION, "Text A", "Text B", "Doc A Doc B", "")
+    }
+    monkeypatch.setattr(cache_module.settings, "llm_model", "other-model")
+    others.add(cache.make_key(VERSION, "Text A", "Text B", "Doc A", "Doc B"))
+    assert key not in others
+    assert len(others) == 5